@@ -255,6 +255,53 @@ create table if not exists quiz_history
 alter table quiz_history
     owner to adaptive_learning_db_owner;
 
+create table if not exists document_fingerprints
+(
+    document_id   uuid not null
+        primary key,
+    document_type text not null,
+    user_id       uuid
+        references users
+            on delete cascade,
+    content_hash  text not null,
+    s3_key        text not null,
+    toc_pages     text,
+    created_at    timestamp default now()
+);
+
+alter table document_fingerprints
+    owner to adaptive_learning_db_owner;
+
+create index if not exists idx_document_fingerprints_content_hash
+    on document_fingerprints (content_hash, document_type);
+
+create index if not exists idx_document_fingerprints_s3_key
+    on document_fingerprints (s3_key);
+
+create table if not exists document_chunks
+(
+    doc_id      uuid    not null,
+    chunk_index integer not null,
+    chunk_text  text    not null,
+    primary key (doc_id, chunk_index)
+);
+
+alter table document_chunks
+    owner to adaptive_learning_db_owner;
+
+create table if not exists pdf_optimizations
+(
+    s3_key          text    not null
+        primary key,
+    original_bytes  bigint  not null,
+    stored_bytes    bigint  not null,
+    linearized      boolean not null default false,
+    optimized_at    timestamp default now()
+);
+
+alter table pdf_optimizations
+    owner to adaptive_learning_db_owner;
+
 create or replace function uuid_nil() returns uuid
     immutable
     strict
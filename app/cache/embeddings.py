@@ -0,0 +1,120 @@
+import hashlib
+import logging
+import os
+from array import array
+from collections import OrderedDict
+from threading import Lock
+from typing import List, Optional
+
+from app.cache.redis import redis_binary_client
+from app.services.constants import EMBEDDING_MODEL_NAME
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL") or 30 * 24 * 3600)  # seconds
+EMBEDDING_CACHE_LRU_SIZE = int(os.getenv("EMBEDDING_CACHE_LRU_SIZE") or 20000)  # vectors kept in process
+
+_lru: "OrderedDict[str, bytes]" = OrderedDict()
+_lru_lock = Lock()
+_stats = {"lru_hits": 0, "redis_hits": 0, "misses": 0, "stored": 0}
+_stats_lock = Lock()
+
+
+def embedding_cache_key(text: str, model: str = EMBEDDING_MODEL_NAME) -> str:
+    """ Content-addressed key for the embedding of an already-preprocessed text """
+    digest = hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+    return f"emb:{model}:{digest}"
+
+
+def pack_vector(vector: List[float]) -> bytes:
+    """ float32 bytes (4 bytes per dimension instead of ~20 as JSON) """
+    packed = array("f", vector)
+    if packed.itemsize != 4:
+        raise ValueError("Platform float is not 32-bit")
+    return packed.tobytes()
+
+
+def unpack_vector(payload: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(payload)
+    return vector.tolist()
+
+
+def _lru_get(key: str) -> Optional[bytes]:
+    with _lru_lock:
+        payload = _lru.get(key)
+        if payload is not None:
+            _lru.move_to_end(key)
+        return payload
+
+
+def _lru_put(key: str, payload: bytes) -> None:
+    with _lru_lock:
+        _lru[key] = payload
+        _lru.move_to_end(key)
+        while len(_lru) > EMBEDDING_CACHE_LRU_SIZE:
+            _lru.popitem(last=False)
+
+
+def _record(**counts: int) -> None:
+    with _stats_lock:
+        for name, count in counts.items():
+            _stats[name] += count
+
+
+def get_cached_embeddings(texts: List[str]) -> List[Optional[List[float]]]:
+    """
+    Look up embeddings for preprocessed texts: in-process LRU first, then one Redis MGET
+    for the rest. Returns a vector or None per text, in input order.
+    """
+    keys = [embedding_cache_key(text) for text in texts]
+    results: List[Optional[List[float]]] = [None] * len(texts)
+    missing = []
+
+    for i, key in enumerate(keys):
+        payload = _lru_get(key)
+        if payload is not None:
+            results[i] = unpack_vector(payload)
+        else:
+            missing.append(i)
+
+    lru_hits = len(texts) - len(missing)
+    redis_hits = 0
+
+    if missing:
+        payloads = redis_binary_client.get_many([keys[i] for i in missing])
+        for i, payload in zip(missing, payloads):
+            if payload:
+                results[i] = unpack_vector(payload)
+                _lru_put(keys[i], payload)
+                redis_hits += 1
+
+    _record(lru_hits=lru_hits, redis_hits=redis_hits, misses=len(missing) - redis_hits)
+    return results
+
+
+def cache_embeddings(texts: List[str], vectors: List[List[float]]) -> None:
+    """ Store freshly computed embeddings in both tiers; empty (failed) vectors are skipped """
+    items = {}
+    for text, vector in zip(texts, vectors):
+        if not vector:
+            continue
+        key = embedding_cache_key(text)
+        payload = pack_vector(vector)
+        _lru_put(key, payload)
+        items[key] = payload
+
+    redis_binary_client.set_many(items, ttl=EMBEDDING_CACHE_TTL)
+    _record(stored=len(items))
+
+
+def get_embedding_cache_stats() -> dict:
+    """ Hit/miss counters since process start """
+    with _stats_lock:
+        stats = dict(_stats)
+    with _lru_lock:
+        stats["lru_size"] = len(_lru)
+
+    lookups = stats["lru_hits"] + stats["redis_hits"] + stats["misses"]
+    stats["hit_rate"] = round((stats["lru_hits"] + stats["redis_hits"]) / lookups, 4) if lookups else 0.0
+    return stats
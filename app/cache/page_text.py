@@ -0,0 +1,141 @@
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Optional
+
+from app.cache.redis import redis_client
+from app.services.page_artifact import PageArtifact
+
+logger = logging.getLogger(__name__)
+
+PAGE_TEXT_CACHE_TTL = int(os.getenv("PAGE_TEXT_CACHE_TTL") or 14 * 24 * 3600)  # seconds
+PAGE_TEXT_CACHE_LRU_SIZE = int(os.getenv("PAGE_TEXT_CACHE_LRU_SIZE") or 2000)  # pages kept in process
+
+_lru: "OrderedDict[str, dict]" = OrderedDict()
+_lru_lock = Lock()
+_stats = {"lru_hits": 0, "redis_hits": 0, "misses": 0, "pages_stored": 0, "bytes_avoided": 0, "bytes_downloaded": 0}
+_stats_lock = Lock()
+
+
+def _object_prefix(s3_key: str) -> str:
+    # Keyed by the stored object, so deduplicated uploads sharing it share the pages too
+    return f"page:{hashlib.sha256(s3_key.encode('utf-8')).hexdigest()[:32]}"
+
+
+def page_cache_key(s3_key: str, page_index: int) -> str:
+    """ Key of one page's text; page_index is 0-based """
+    return f"{_object_prefix(s3_key)}:{page_index}"
+
+
+def _count_key(s3_key: str) -> str:
+    return f"{_object_prefix(s3_key)}:count"
+
+
+def _lru_get(key: str) -> Optional[dict]:
+    with _lru_lock:
+        page = _lru.get(key)
+        if page is not None:
+            _lru.move_to_end(key)
+        return page
+
+
+def _lru_put(key: str, page: dict) -> None:
+    with _lru_lock:
+        _lru[key] = page
+        _lru.move_to_end(key)
+        while len(_lru) > PAGE_TEXT_CACHE_LRU_SIZE:
+            _lru.popitem(last=False)
+
+
+def record_page_stats(**counts: int) -> None:
+    with _stats_lock:
+        for name, count in counts.items():
+            _stats[name] += count
+
+
+def get_cached_page(s3_key: str, page_index: int) -> Optional[dict]:
+    """
+    {"text", "image_count", "pdf_bytes"} for one page: in-process LRU first, then Redis.
+    A hit counts the size of the PDF it avoided downloading.
+    """
+    key = page_cache_key(s3_key, page_index)
+    page = _lru_get(key)
+    if page is not None:
+        record_page_stats(lru_hits=1, bytes_avoided=page.get("pdf_bytes", 0))
+        return page
+
+    cached = redis_client.get(key)
+    if cached:
+        try:
+            page = json.loads(cached)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Failed to decode cached page {key}: {e}")
+            page = None
+    if page is None:
+        record_page_stats(misses=1)
+        return None
+
+    _lru_put(key, page)
+    record_page_stats(redis_hits=1, bytes_avoided=page.get("pdf_bytes", 0))
+    return page
+
+
+def artifact_pages(artifact: PageArtifact) -> Dict[int, dict]:
+    return {
+        page_index: {
+            "text": artifact.page_text(page_index),
+            "image_count": artifact.image_count(page_index),
+            "pdf_bytes": artifact.pdf_bytes,
+        }
+        for page_index in range(artifact.page_count)
+    }
+
+
+def cache_pages(s3_key: str, pages: Dict[int, dict]) -> None:
+    """ Stores every page of one object in Redis (one pipelined round trip) """
+    if not pages:
+        return
+    items = {page_cache_key(s3_key, index): json.dumps(page) for index, page in pages.items()}
+    items[_count_key(s3_key)] = str(len(pages))
+    redis_client.set_many(items, ttl=PAGE_TEXT_CACHE_TTL)
+    record_page_stats(pages_stored=len(pages))
+
+
+def warm_page_text_cache(artifact: PageArtifact, s3_key: str) -> int:
+    """ Caches every page of a document from its page artifact; returns the number of pages cached """
+    try:
+        pages = artifact_pages(artifact)
+        cache_pages(s3_key, pages)
+        logger.info(f"Cached text of {len(pages)} pages for {s3_key}")
+        return len(pages)
+    except Exception as e:
+        logger.error(f"Failed to warm page text cache for {s3_key}: {e}")
+        return 0
+
+
+def delete_cached_pages(s3_key: str) -> None:
+    """ Drops the cached pages of an object that is being deleted """
+    try:
+        count = int(redis_client.get(_count_key(s3_key)) or 0)
+        keys = [page_cache_key(s3_key, index) for index in range(count)] + [_count_key(s3_key)]
+        redis_client.client.delete(*keys)
+        with _lru_lock:
+            for key in keys:
+                _lru.pop(key, None)
+    except Exception as e:
+        logger.warning(f"Failed to delete cached pages for {s3_key}: {e}")
+
+
+def get_page_text_cache_stats() -> dict:
+    """ Hit/miss counters and PDF bytes not downloaded since process start """
+    with _stats_lock:
+        stats = dict(_stats)
+    with _lru_lock:
+        stats["lru_size"] = len(_lru)
+
+    lookups = stats["lru_hits"] + stats["redis_hits"] + stats["misses"]
+    stats["hit_rate"] = round((stats["lru_hits"] + stats["redis_hits"]) / lookups, 4) if lookups else 0.0
+    return stats
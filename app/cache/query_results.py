@@ -0,0 +1,183 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+from array import array
+from threading import Lock
+from typing import Any, List, Optional, Tuple
+
+from app.cache.redis import redis_binary_client, redis_client
+
+logger = logging.getLogger(__name__)
+
+QUERY_CACHE_ENABLED = (os.getenv("QUERY_CACHE_ENABLED") or "true").lower() == "true"
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL") or 6 * 3600)  # seconds
+QUERY_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("QUERY_CACHE_SEMANTIC_THRESHOLD") or 0.95)  # cosine, 0 disables
+QUERY_CACHE_SEMANTIC_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_SEMANTIC_MAX_ENTRIES") or 200)  # per user and doc-set version
+# Only semantic reuse reads the query embedding; callers skip embedding the query otherwise
+QUERY_CACHE_USES_EMBEDDING = QUERY_CACHE_ENABLED and QUERY_CACHE_SEMANTIC_THRESHOLD > 0
+
+_WHITESPACE = re.compile(r"\s+")
+_stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "stored": 0}
+_stats_lock = Lock()
+
+
+def normalize_query(query: str) -> str:
+    """ Case, whitespace and trailing punctuation do not change the answer """
+    return _WHITESPACE.sub(" ", (query or "").lower()).strip().rstrip("?!.").strip()
+
+
+def _version_key(user_id: str) -> str:
+    return f"library:{user_id}:version"
+
+
+def get_library_version(user_id: str) -> int:
+    """ The user's doc-set version; read it before searching and pass it to cache_query_result """
+    value = redis_client.get(_version_key(user_id))
+    try:
+        return int(value) if value else 0
+    except ValueError:
+        return 0
+
+
+def bump_library_version(user_id: str) -> None:
+    """ Invalidates every cached result of the user (called whenever their vectors change) """
+    try:
+        redis_client.client.incr(_version_key(user_id))
+    except Exception as e:
+        logger.error(f"Failed to bump library version for {user_id}: {e}")
+
+
+def _digest(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _result_key(kind: str, user_id: str, version: int, scope: str, query: str) -> str:
+    return f"qcache:{kind}:{user_id}:{version}:{_digest(scope, normalize_query(query))}"
+
+
+def _semantic_key(kind: str, user_id: str, version: int, scope: str) -> str:
+    return f"qcache:sem:{kind}:{user_id}:{version}:{scope}"
+
+
+def _unit_vector(vector: List[float]) -> array:
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return array("f", (value / norm for value in vector))
+
+
+def _record(**counts: int) -> None:
+    with _stats_lock:
+        for name, count in counts.items():
+            _stats[name] += count
+
+
+def _load(key: str) -> Optional[Any]:
+    cached = redis_client.get(key)
+    if not cached:
+        return None
+    try:
+        return json.loads(cached)
+    except json.JSONDecodeError as e:
+        logger.warning(f"Failed to decode cached query result {key}: {e}")
+        return None
+
+
+def _semantic_lookup(semantic_key: str, embedding: List[float]) -> Tuple[Optional[str], float]:
+    """ Result key of the most similar cached query, if it clears the threshold """
+    try:
+        entries = redis_binary_client.client.hgetall(semantic_key)
+    except Exception as e:
+        logger.error(f"Semantic cache lookup failed for {semantic_key}: {e}")
+        return None, 0.0
+
+    query = _unit_vector(embedding)
+    best_key, best_score = None, 0.0
+    for result_key, payload in entries.items():
+        cached = array("f")
+        cached.frombytes(payload)
+        if len(cached) != len(query):
+            continue
+        score = sum(a * b for a, b in zip(query, cached))
+        if score > best_score:
+            best_key, best_score = result_key.decode("utf-8"), score
+
+    if best_key is None or best_score < QUERY_CACHE_SEMANTIC_THRESHOLD:
+        return None, best_score
+    return best_key, best_score
+
+
+def get_cached_query_result(
+    kind: str,
+    user_id: str,
+    version: int,
+    query: str,
+    params: dict,
+    embedding: Optional[List[float]] = None,
+) -> Tuple[Optional[Any], dict]:
+    """
+    Exact lookup on the normalized query, then (with an embedding) the nearest cached query
+    with the same user, doc-set version and params. Returns (result or None, cache info).
+    """
+    if not QUERY_CACHE_ENABLED:
+        return None, {"cache": "disabled"}
+
+    scope = _digest(params)
+    result = _load(_result_key(kind, user_id, version, scope, query))
+    if result is not None:
+        _record(exact_hits=1)
+        return result, {"cache": "exact"}
+
+    if embedding and QUERY_CACHE_SEMANTIC_THRESHOLD > 0:
+        result_key, similarity = _semantic_lookup(_semantic_key(kind, user_id, version, scope), embedding)
+        result = _load(result_key) if result_key else None
+        if result is not None:
+            _record(semantic_hits=1)
+            return result, {"cache": "semantic", "similarity": round(similarity, 4)}
+
+    _record(misses=1)
+    return None, {"cache": "miss"}
+
+
+def cache_query_result(
+    kind: str,
+    user_id: str,
+    version: int,
+    query: str,
+    params: dict,
+    result: Any,
+    embedding: Optional[List[float]] = None,
+) -> None:
+    """ Stores a result under the version read before it was computed, plus its embedding for semantic reuse """
+    if not QUERY_CACHE_ENABLED:
+        return
+
+    scope = _digest(params)
+    result_key = _result_key(kind, user_id, version, scope, query)
+    redis_client.set(result_key, result, ttl=QUERY_CACHE_TTL)
+    _record(stored=1)
+
+    if not embedding or QUERY_CACHE_SEMANTIC_THRESHOLD <= 0:
+        return
+    semantic_key = _semantic_key(kind, user_id, version, scope)
+    try:
+        client = redis_binary_client.client
+        if client.hlen(semantic_key) >= QUERY_CACHE_SEMANTIC_MAX_ENTRIES:
+            return
+        pipe = client.pipeline(transaction=False)
+        pipe.hset(semantic_key, result_key, _unit_vector(embedding).tobytes())
+        pipe.expire(semantic_key, QUERY_CACHE_TTL)
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to index {result_key} for semantic reuse: {e}")
+
+
+def get_query_cache_stats() -> dict:
+    """ Hit/miss counters since process start """
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["exact_hits"] + stats["semantic_hits"] + stats["misses"]
+    stats["hit_rate"] = round((stats["exact_hits"] + stats["semantic_hits"]) / lookups, 4) if lookups else 0.0
+    return stats
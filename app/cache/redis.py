@@ -4,7 +4,7 @@ import json
 import redis
 import os
 import logging
-from typing import Optional, Union
+from typing import Dict, List, Optional, Union
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -66,6 +66,29 @@ class RedisClient:
             logger.warning(f"Failed to delete cache key {key}: {e}")
             return 0
 
+    def get_many(self, keys: List[str]) -> List[Optional[Union[str, bytes]]]:
+        """ Fetch several keys in one round trip; missing keys (or errors) come back as None """
+        if not keys:
+            return []
+        try:
+            return self.client.mget(keys)
+        except Exception as e:
+            logger.error(f" Failed to retrieve {len(keys)} keys: {e}")
+            return [None] * len(keys)
+
+    def set_many(self, items: Dict[str, Union[str, bytes]], ttl: int = 3600) -> None:
+        """ Store several raw values with the same TTL in one pipelined round trip """
+        if not items:
+            return
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.set(key, value, ex=ttl)
+            pipe.execute()
+            logger.info(f" Cached {len(items)} keys with TTL {ttl}")
+        except Exception as e:
+            logger.error(f" Failed to cache {len(items)} keys: {e}")
+
     def exists(self, key: str) -> bool:
         try:
             return self.client.exists(key) == 1
@@ -90,3 +113,5 @@ class RedisClient:
 
 
 redis_client = RedisClient()
+# Raw bytes in and out, for binary payloads such as packed embedding vectors
+redis_binary_client = RedisClient(decode_responses=False)
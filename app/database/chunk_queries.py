@@ -0,0 +1,58 @@
+from typing import Dict, List, Tuple
+from psycopg2.extensions import connection as PGConnection
+from psycopg2.extras import execute_values
+
+
+def upsert_document_chunks(conn: PGConnection, rows: List[Tuple[str, int, str]]) -> None:
+    """ Stores (doc_id, chunk_index, chunk_text) rows; re-ingesting a chunk overwrites its text """
+    if not rows:
+        return
+    query = """
+        INSERT INTO document_chunks (doc_id, chunk_index, chunk_text)
+        VALUES %s
+        ON CONFLICT (doc_id, chunk_index) DO UPDATE SET chunk_text = EXCLUDED.chunk_text;
+    """
+    with conn.cursor() as cursor:
+        execute_values(cursor, query, rows, page_size=500)
+    conn.commit()
+
+
+def get_chunk_texts(conn: PGConnection, keys: List[Tuple[str, int]]) -> Dict[Tuple[str, int], str]:
+    """ Texts for the given (doc_id, chunk_index) pairs in one round trip """
+    if not keys:
+        return {}
+    query = """
+        SELECT c.doc_id::text, c.chunk_index, c.chunk_text
+        FROM document_chunks c
+        JOIN unnest(%s::uuid[], %s::int[]) AS k(doc_id, chunk_index)
+          ON c.doc_id = k.doc_id AND c.chunk_index = k.chunk_index;
+    """
+    doc_ids = [doc_id for doc_id, _ in keys]
+    indices = [chunk_index for _, chunk_index in keys]
+    with conn.cursor() as cursor:
+        cursor.execute(query, (doc_ids, indices))
+        return {(doc_id, chunk_index): text for doc_id, chunk_index, text in cursor.fetchall()}
+
+
+def copy_document_chunks(conn: PGConnection, source_doc_id: str, target_doc_id: str) -> int:
+    query = """
+        INSERT INTO document_chunks (doc_id, chunk_index, chunk_text)
+        SELECT %s, chunk_index, chunk_text
+        FROM document_chunks
+        WHERE doc_id = %s
+        ON CONFLICT (doc_id, chunk_index) DO NOTHING;
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(query, (target_doc_id, source_doc_id))
+        copied = cursor.rowcount
+    conn.commit()
+    return copied
+
+
+def delete_document_chunks(conn: PGConnection, doc_id: str) -> int:
+    query = "DELETE FROM document_chunks WHERE doc_id = %s;"
+    with conn.cursor() as cursor:
+        cursor.execute(query, (doc_id,))
+        deleted = cursor.rowcount
+    conn.commit()
+    return deleted
@@ -1,12 +1,167 @@
+import asyncio
 import logging
 import os
+import threading
+import time
 import psycopg2
 from dotenv import load_dotenv
+from psycopg2 import pool as pg_pool
 from psycopg2.extensions import connection as PGConnection
-from typing import Optional
+from typing import Dict, Iterator, Optional
 
 logger = logging.getLogger(__name__)
 
+DB_POOL_ENABLED = (os.getenv("DB_POOL_ENABLED") or "true").lower() == "true"
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE") or 5)  # also the number of idle connections kept open
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE") or 20)
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT") or 10)  # seconds to wait for a free connection
+DB_POOL_HEALTHCHECK_AFTER = float(os.getenv("DB_POOL_HEALTHCHECK_AFTER") or 30)  # idle seconds before SELECT 1
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS") or 30000)
+DB_SSLMODE = os.getenv("DB_SSLMODE") or "require"
+
+
+class PoolTimeoutError(psycopg2.OperationalError):
+    """ Raised when no pooled connection frees up within DB_POOL_TIMEOUT """
+
+
+class PooledConnectionProvider:
+    """
+    Thread-safe psycopg2 connection pool with bounded blocking checkout.
+    Async code checks out with `async with PostgresConnection()`, which waits in a worker thread.
+
+    ThreadedConnectionPool raises as soon as it is exhausted; a semaphore sized to the pool
+    makes callers wait (up to DB_POOL_TIMEOUT) instead. Connections idle for longer than
+    DB_POOL_HEALTHCHECK_AFTER are pinged before being handed out, and every connection
+    carries a server-side statement_timeout.
+    """
+
+    def __init__(self, min_size: int = DB_POOL_MIN_SIZE, max_size: int = DB_POOL_MAX_SIZE) -> None:
+        self._min_size = min_size
+        self._max_size = max_size
+        self._pool: Optional[pg_pool.ThreadedConnectionPool] = None
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._last_used: Dict[int, float] = {}
+        self._metrics = {
+            "checkouts": 0,
+            "in_use": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+        }
+
+    def open(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                return
+            self._pool = pg_pool.ThreadedConnectionPool(
+                self._min_size,
+                self._max_size,
+                user=os.getenv("DB_USER"),
+                password=os.getenv("DB_PASSWORD"),
+                host=os.getenv("DB_HOST"),
+                port=os.getenv("DB_PORT"),
+                database=os.getenv("DB_NAME"),
+                sslmode=DB_SSLMODE,
+                options=f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}",
+            )
+            logger.info(f"Connection pool opened (min={self._min_size}, max={self._max_size}).")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is None:
+                return
+            self._pool.closeall()
+            self._pool = None
+            self._last_used.clear()
+            logger.info("Connection pool closed.")
+
+    def _is_healthy(self, conn: PGConnection) -> bool:
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < DB_POOL_HEALTHCHECK_AFTER:
+            return True  # freshly opened or recently used
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self) -> PGConnection:
+        self.open()
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=DB_POOL_TIMEOUT):
+            with self._lock:
+                self._metrics["timeouts"] += 1
+            raise PoolTimeoutError(f"No database connection available within {DB_POOL_TIMEOUT}s")
+
+        try:
+            conn = self._pool.getconn()
+            while not self._is_healthy(conn):
+                with self._lock:
+                    self._metrics["health_check_failures"] += 1
+                logger.warning("Discarding broken pooled connection.")
+                self._last_used.pop(id(conn), None)
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        waited = time.monotonic() - started
+        with self._lock:
+            self._metrics["checkouts"] += 1
+            self._metrics["in_use"] += 1
+            self._metrics["wait_seconds_total"] += waited
+            self._metrics["wait_seconds_max"] = max(self._metrics["wait_seconds_max"], waited)
+        return conn
+
+    def putconn(self, conn: PGConnection) -> None:
+        try:
+            if self._pool is None:
+                conn.close()
+                return
+            # The pool rolls back any transaction left open, drops broken connections and
+            # closes connections beyond the idle minimum
+            self._pool.putconn(conn, close=conn.closed != 0)
+            if conn.closed:
+                self._last_used.pop(id(conn), None)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+        finally:
+            with self._lock:
+                self._metrics["in_use"] -= 1
+            self._slots.release()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+        checkouts = metrics["checkouts"]
+        metrics["wait_seconds_avg"] = round(metrics["wait_seconds_total"] / checkouts, 6) if checkouts else 0.0
+        metrics["max_size"] = self._max_size
+        return metrics
+
+
+connection_pool = PooledConnectionProvider()
+
+
+def open_connection_pool() -> None:
+    connection_pool.open()
+
+
+def close_connection_pool() -> None:
+    connection_pool.close()
+
+
+def get_pool_metrics() -> dict:
+    """ Checkout count, connections in use, wait times, timeouts and failed health checks """
+    return connection_pool.metrics()
+
+
 class PostgresConnection:
     def __init__(
         self,
@@ -22,6 +177,8 @@ class PostgresConnection:
         self._port = port or os.getenv("DB_PORT")
         self._database = database or os.getenv("DB_NAME")
         self._connection: Optional[PGConnection] = None
+        # Explicit credentials get a dedicated connection, everything else borrows from the pool
+        self._pooled = DB_POOL_ENABLED and not any((user, password, host, port, database))
 
     def __enter__(self) -> PGConnection:
         self.connect()
@@ -30,16 +187,29 @@ class PostgresConnection:
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
         self.close_connection()
 
+    async def __aenter__(self) -> PGConnection:
+        # Waiting for a free pooled connection blocks, so it must not happen on the event loop.
+        # Hold the connection for synchronous work only; never await inside the block.
+        await asyncio.to_thread(self.connect)
+        return self._connection
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close_connection()
+
     def connect(self) -> None:
         if self._connection is None or self._connection.closed:
             try:
+                if self._pooled:
+                    self._connection = connection_pool.getconn()
+                    return
                 self._connection = psycopg2.connect(
                     user=self._user,
                     password=self._password,
                     host=self._host,
                     port=self._port,
                     database=self._database,
-                    sslmode="require",
+                    sslmode=DB_SSLMODE,
+                    options=f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}",
                 )
                 logger.info("Connection established successfully.")
             except psycopg2.Error as e:
@@ -47,10 +217,22 @@ class PostgresConnection:
                 raise
 
     def close_connection(self) -> None:
-        if self._connection and not self._connection.closed:
+        if self._connection is None:
+            return
+        if self._pooled:
+            connection, self._connection = self._connection, None
+            connection_pool.putconn(connection)
+            return
+        if not self._connection.closed:
             try:
                 self._connection.close()
                 logger.info("Connection closed successfully.")
             except psycopg2.Error as e:
                 logger.error(f"Error while closing the connection: {e}")
                 raise
+
+
+def get_db_connection() -> Iterator[PGConnection]:
+    """ FastAPI dependency: a pooled connection for the duration of the request """
+    with PostgresConnection() as conn:
+        yield conn
@@ -0,0 +1,60 @@
+from typing import Optional
+from psycopg2.extensions import connection as PGConnection
+from psycopg2.extras import DictCursor
+
+
+def create_document_fingerprint(
+    conn: PGConnection,
+    document_id: str,
+    document_type: str,
+    user_id: str,
+    content_hash: str,
+    s3_key: str,
+    toc_pages: Optional[str] = None,
+) -> None:
+    query = """
+        INSERT INTO document_fingerprints (
+            document_id, document_type, user_id, content_hash, s3_key, toc_pages
+        )
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON CONFLICT (document_id) DO NOTHING;
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(query, (document_id, document_type, user_id, content_hash, s3_key, toc_pages))
+    conn.commit()
+
+
+def get_document_fingerprint_by_hash(
+    conn: PGConnection, content_hash: str, document_type: str, toc_pages: Optional[str] = None
+) -> Optional[dict]:
+    """ Most recent processed document with these exact bytes, preferring one with the same TOC pages """
+    query = """
+        SELECT document_id, document_type, user_id, content_hash, s3_key, toc_pages, created_at
+        FROM document_fingerprints
+        WHERE content_hash = %s AND document_type = %s
+        ORDER BY (toc_pages IS NOT DISTINCT FROM %s) DESC, created_at DESC
+        LIMIT 1;
+    """
+    with conn.cursor(cursor_factory=DictCursor) as cursor:
+        cursor.execute(query, (content_hash, document_type, toc_pages))
+        result = cursor.fetchone()
+    return dict(result) if result else None
+
+
+def count_other_documents_with_s3_key(conn: PGConnection, s3_key: str, document_id: str) -> int:
+    """ Number of other documents still pointing at the same stored object """
+    query = """
+        SELECT COUNT(*)
+        FROM document_fingerprints
+        WHERE s3_key = %s AND document_id <> %s;
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(query, (s3_key, document_id))
+        return cursor.fetchone()[0]
+
+
+def delete_document_fingerprint(conn: PGConnection, document_id: str) -> None:
+    query = "DELETE FROM document_fingerprints WHERE document_id = %s;"
+    with conn.cursor() as cursor:
+        cursor.execute(query, (document_id,))
+    conn.commit()
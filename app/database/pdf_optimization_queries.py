@@ -0,0 +1,33 @@
+from typing import List, Set
+from psycopg2.extensions import connection as PGConnection
+
+
+def record_pdf_optimization(
+    conn: PGConnection, s3_key: str, original_bytes: int, stored_bytes: int, linearized: bool
+) -> None:
+    """ Size before and after optimizing the stored object (equal when it was kept as uploaded) """
+    query = """
+        INSERT INTO pdf_optimizations (s3_key, original_bytes, stored_bytes, linearized)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (s3_key) DO UPDATE SET
+            stored_bytes = EXCLUDED.stored_bytes,
+            linearized = EXCLUDED.linearized,
+            optimized_at = now();
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(query, (s3_key, original_bytes, stored_bytes, linearized))
+    conn.commit()
+
+
+def get_optimized_s3_keys(conn: PGConnection) -> Set[str]:
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT s3_key FROM pdf_optimizations;")
+        return {row[0] for row in cursor.fetchall()}
+
+
+def get_document_s3_keys(conn: PGConnection, tables: List[str]) -> List[str]:
+    """ Distinct stored objects of the given document tables (books, notes, presentations) """
+    query = " UNION ".join(f"SELECT s3_key FROM {table} WHERE s3_key IS NOT NULL" for table in tables)
+    with conn.cursor() as cursor:
+        cursor.execute(f"{query} ORDER BY 1;")
+        return [row[0] for row in cursor.fetchall()]
@@ -41,7 +41,7 @@ async def auth_callback(request: Request):
         name = user_info.get("name", "")
         picture = user_info.get("picture", "")
 
-        with PostgresConnection() as conn:
+        async with PostgresConnection() as conn:
             user = get_or_create_user(conn, email, name, picture)
 
         sanitized_user = {
@@ -96,7 +96,7 @@ async def validate_token(user_id: str = Depends(get_current_user)):
 async def get_user_info(current_user: str = Depends(get_current_user)):
     """ Get user info """
     try:
-        with PostgresConnection() as conn:
+        async with PostgresConnection() as conn:
             user = get_user_by_id(conn, current_user)
             if not user:
                 raise HTTPException(status_code=404, detail="User not found")
@@ -1,3 +1,4 @@
+import asyncio
 from enum import Enum
 import logging
 import os
@@ -8,14 +9,20 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status
 from app.auth.dependencies import get_current_user
 from app.database.book_queries import get_books_by_user
-from app.database.connection import PostgresConnection
+from app.database.connection import get_db_connection
 from app.database.notes_queries import get_notes_by_user
 from app.database.slides_queries import get_slides_by_user
 from app.routes.constants import NOTE_EXTENSIONS
 from app.services.book_processor import parse_toc_pages
 from app.services.book_upload import process_uploaded_book
 from app.services.delete_file import delete_document_and_assets
+from app.services.document_dedup import (
+    compute_content_hash,
+    register_document_fingerprint,
+    reuse_existing_document,
+)
 from app.services.notes_upload import process_uploaded_notes
+from app.services.page_artifact import remove_local_page_artifact
 from app.services.presentation_upload import process_uploaded_slides
 from app.services.mcq_main import process_mcq_document
 logger = logging.getLogger(__name__)
@@ -36,6 +43,7 @@ async def upload_file(
     current_user: str = Depends(get_current_user),
 ):
     """Handles document upload and delegates to document-specific service."""
+    tmp_path = None
     try:
         ext = file.filename.split(".")[-1].lower()
 
@@ -53,15 +61,45 @@ async def upload_file(
         with open(tmp_path, "wb") as f:
             f.write(file_bytes)
 
-        result = {}
-        doc_id = None
-
         if document_type == "book":
             try:
                 start_page, end_page = await parse_toc_pages(toc_pages)
             except ValueError as ve:
                 raise HTTPException(status_code=400, detail=str(ve))
 
+        content_hash = await asyncio.to_thread(compute_content_hash, file_bytes)
+
+        # Identical bytes already processed: reuse the stored object, TOC and embeddings
+        reused = await reuse_existing_document(
+            content_hash, document_type.value, tmp_path, file.filename, current_user, toc_pages
+        )
+        if reused:
+            storage_result = {"storage_result": reused["storage_result"]}
+            if reused["storage_result"].get("status") != "success":
+                # Embeddings could not be copied, build them from the file instead
+                storage_result = await process_mcq_document(
+                    tmp_path=tmp_path,
+                    filename=file.filename,
+                    user_id=current_user,
+                    doc_id=reused["doc_id"],
+                    doc_type=document_type
+                )
+
+            await asyncio.to_thread(
+                register_document_fingerprint,
+                reused["doc_id"], document_type.value, current_user, content_hash, toc_pages
+            )
+            return {
+                "message": "Upload successful",
+                "deduplicated": True,
+                **reused["result"],
+                **storage_result
+            }
+
+        result = {}
+        doc_id = None
+
+        if document_type == "book":
             result = await process_uploaded_book(tmp_path, file.filename, start_page, end_page, current_user)
             doc_id = result.get("book_metadata", {}).get("book_id")
 
@@ -88,6 +126,12 @@ async def upload_file(
             doc_type=document_type
         )
 
+        if storage_result.get("storage_result", {}).get("status") == "success":
+            await asyncio.to_thread(
+                register_document_fingerprint,
+                str(doc_id), document_type.value, current_user, content_hash, toc_pages
+            )
+
         return {
             "message": "Upload successful",
             **result,
@@ -100,18 +144,20 @@ async def upload_file(
         traceback.print_exc()
         logger.error(f"[Upload] Failed to upload: {str(e)}")
         raise HTTPException(status_code=500, detail="Upload failed.")
+    finally:
+        if tmp_path:
+            remove_local_page_artifact(tmp_path)
 
 
 @router.get("/books")
-async def list_user_books(
+def list_user_books(
     current_user: str = Depends(get_current_user),
+    conn = Depends(get_db_connection),
 ):
     """ List all books for the current user """
     try:
-        with PostgresConnection() as conn:
-
-            books = get_books_by_user(conn, current_user)
-            return {"books": books}
+        books = get_books_by_user(conn, current_user)
+        return {"books": books}
     except Exception as e:
         logger.error(
             f"[List Books] Error retrieving books for user {current_user}: {str(e)}"
@@ -120,12 +166,10 @@ async def list_user_books(
 
 
 @router.get("/slides", status_code=status.HTTP_200_OK)
-async def list_user_slides(current_user: str = Depends(get_current_user)):
+def list_user_slides(current_user: str = Depends(get_current_user), conn = Depends(get_db_connection)):
     """ List all presentations for the current user """
     try:
-        presentations = []
-        with PostgresConnection() as conn:
-            presentations = get_slides_by_user(conn, current_user)
+        presentations = get_slides_by_user(conn, current_user)
 
         return {"presentations": presentations}
     
@@ -163,10 +207,9 @@ def delete_file(
 
 
 @router.get("/notes", status_code=status.HTTP_200_OK)
-def list_user_notes(current_user: str = Depends(get_current_user)):
+def list_user_notes(current_user: str = Depends(get_current_user), conn = Depends(get_db_connection)):
     try:
-        with PostgresConnection() as conn:
-            notes = get_notes_by_user(conn, current_user)
+        notes = get_notes_by_user(conn, current_user)
         return {"notes": notes}
     except Exception as e:
         logging.error(f"[List Notes] Failed to fetch notes: {e}")
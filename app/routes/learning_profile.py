@@ -47,7 +47,7 @@ async def submit_learning_profile(
             submission.ratings, submission.mcqs, avg_scores, primary_style
         )
 
-        with PostgresConnection() as conn:
+        async with PostgresConnection() as conn:
             # TODO - Uncomment the following check after testing
             # exists = has_learning_profile(conn, current_user)
 
@@ -83,7 +83,7 @@ async def submit_learning_profile(
 async def check_learning_profile_status(current_user: str = Depends(get_current_user)):
     """ Check if the user has already submitted a learning profile """
     try:
-        with PostgresConnection() as conn:
+        async with PostgresConnection() as conn:
             exists = has_learning_profile(conn, current_user)
         return {"submitted": exists}
     except Exception as e:
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from typing import List, Dict, Optional
 from app.auth.dependencies import get_current_user
 from app.services.rag_service import perform_library_search
+from app.services.llm_gateway import cancel_on_disconnect
 from app.schemas.library_search import LibrarySearchRequest, LibrarySearchResponse
 from app.database.library_queries import get_user_document_counts
 from app.services.vector_search import get_collection_stats
@@ -15,6 +16,7 @@ router = APIRouter(prefix="/library", tags=["Library Search"])
 @router.post("/search", response_model=LibrarySearchResponse, status_code=status.HTTP_200_OK)
 async def search_library(
     request: LibrarySearchRequest,
+    http_request: Request,
     current_user: str = Depends(get_current_user)
 ):
     """
@@ -29,12 +31,15 @@ async def search_library(
         
         logger.info(f"Library search request from user {current_user}: '{request.query}'")
         
-        result = await perform_library_search(
-            query=request.query.strip(),
-            user_id=current_user,
-            max_chunks=20,
-            document_types=None,
-            min_score=0.10 # Lower threshold for maximum recall
+        result = await cancel_on_disconnect(
+            http_request,
+            perform_library_search(
+                query=request.query.strip(),
+                user_id=current_user,
+                max_chunks=20,
+                document_types=None,
+                min_score=0.10 # Lower threshold for maximum recall
+            ),
         )
         
         logger.info(f"Library search completed for user {current_user}: {len(result.get('references', []))} sources found")
@@ -56,7 +61,7 @@ async def get_library_stats(current_user: str = Depends(get_current_user)):
     Get user's library statistics for search
     """
     try:
-        with PostgresConnection() as conn:
+        async with PostgresConnection() as conn:
             doc_counts = get_user_document_counts(conn, current_user)
             vector_stats = get_collection_stats(current_user)
             
@@ -75,10 +80,10 @@ async def get_library_stats(current_user: str = Depends(get_current_user)):
 async def library_search_health():
     """Health check for library search functionality"""
     try:
-        from app.services.vector_search import client
+        from app.services.qdrant_clients import get_async_qdrant_client
         
         # Test vector DB connection
-        collections = client.get_collections()
+        collections = await get_async_qdrant_client().get_collections()
         
         return {
             "status": "healthy",
@@ -15,7 +15,7 @@ router = APIRouter(prefix="/models", tags=["Models"])
 async def list_models(current_user: str = Depends(get_current_user)):
     """ Retrieve a list of all models available in the system """
     try:
-        with PostgresConnection() as conn:
+        async with PostgresConnection() as conn:
             rows = get_all_models(conn)
     except Exception as e:
         logger.critical(f"Database error when retrieving models: {e}", exc_info=True)
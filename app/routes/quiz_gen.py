@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Form, status, HTTPException
+from fastapi import APIRouter, Depends, Form, Request, status, HTTPException
 from fastapi.responses import StreamingResponse
 from typing import Optional
 import json
@@ -6,6 +6,7 @@ from pydantic import BaseModel
 import io
 from fastapi import Response
 from app.auth.dependencies import get_current_user
+from app.services.llm_gateway import cancel_on_disconnect
 from app.services.mcq_generator import generate_mcq_questions
 from app.services.query_processing import expand_user_query_and_search
 from app.services.constants import DEFAULT_MODEL_ID  # Import default model ID
@@ -20,6 +21,7 @@ router = APIRouter(prefix="/quiz-gen", tags=["Quiz Generation"])
 
 @router.post("/", status_code=status.HTTP_200_OK)
 async def generate_mcqs(
+    http_request: Request,
     user_query: str = Form(...),
     difficulty_level: str = Form(...),
     num_mcqs: int = Form(...),  # TODO make pydantic model for RequestBody @izzat
@@ -35,12 +37,15 @@ async def generate_mcqs(
         # 2. Embedding
         # 3. Vector DB Search
         logger.info(f"[user_query]: {user_query}, model_id: {model_id}, doc_ids: {doc_ids}, doc_type: {file_type}")
-        results = await expand_user_query_and_search(
-            user_query=user_query,
-            user_id=current_user,
-            model_id=model_id,
-            top_k=5,  # or whatever suits if the chunks are less than 5 then what ?
-            doc_ids=doc_ids,  # Pass the document IDs directly
+        results = await cancel_on_disconnect(
+            http_request,
+            expand_user_query_and_search(
+                user_query=user_query,
+                user_id=current_user,
+                model_id=model_id,
+                top_k=5,  # or whatever suits if the chunks are less than 5 then what ?
+                doc_ids=doc_ids,  # Pass the document IDs directly
+            ),
         )
 
         if results is None:
@@ -54,17 +59,20 @@ async def generate_mcqs(
         combined_content = "\n\n".join(chunk_texts)
 
         # Generate MCQs using the retrieved content
-        mcq_questions = await generate_mcq_questions(
-            content=combined_content,
-            difficulty_level=difficulty_level,
-            num_mcqs=num_mcqs,
-            explanation=explanation,
-            model_id=model_id,
+        mcq_questions = await cancel_on_disconnect(
+            http_request,
+            generate_mcq_questions(
+                content=combined_content,
+                difficulty_level=difficulty_level,
+                num_mcqs=num_mcqs,
+                explanation=explanation,
+                model_id=model_id,
+            ),
         )
         logger.info(f"Generated MCQs: {json.dumps(mcq_questions, indent=2)}")
         # Save MCQs to database
         quiz_id = None
-        with PostgresConnection() as conn:
+        async with PostgresConnection() as conn:
             # Parse doc_ids if provided (assuming it might be comma-separated)
             doc_id = doc_ids.split(',')[0] if doc_ids else None
             
@@ -140,7 +148,7 @@ async def download_mcqs(
 ):
     quiz_id = quiz_id.strip() 
     try:
-        with PostgresConnection() as conn:
+        async with PostgresConnection() as conn:
             if quiz_id:
                 quiz_data = get_user_quiz(conn, quiz_id, current_user)
                 if not quiz_data:
@@ -216,7 +224,7 @@ async def save_quiz_history_endpoint(
 
         # Save quiz history to database
         history_id = None
-        with PostgresConnection() as conn:
+        async with PostgresConnection() as conn:
             history_id = save_quiz_history(
                 conn=conn,
                 user_id=current_user,
@@ -264,7 +272,7 @@ async def get_quiz_history_endpoint(
         
         # Retrieve quiz history from database
         quiz_history = None
-        with PostgresConnection() as conn:
+        async with PostgresConnection() as conn:
             quiz_history = get_quiz_history(
                 conn=conn,
                 history_id=history_id
@@ -310,7 +318,7 @@ async def get_user_quiz_history_endpoint(
         
         # Retrieve all quiz history for the user
         user_quiz_history = []
-        with PostgresConnection() as conn:
+        async with PostgresConnection() as conn:
             user_quiz_history = get_user_quiz_history(
                 conn=conn,
                 user_id=current_user
@@ -343,7 +351,7 @@ async def delete_quiz_history_endpoint(
         
         # Delete the quiz history record
         record_deleted = False
-        with PostgresConnection() as conn:
+        async with PostgresConnection() as conn:
             record_deleted = delete_quiz_history(
                 conn=conn,
                 history_id=history_id
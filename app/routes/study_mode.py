@@ -3,8 +3,7 @@ import json
 import logging
 from typing import Optional
 from uuid import UUID, uuid4
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
 from app.auth.dependencies import get_current_user
 from app.cache.metadata import get_cached_doc_metadata
 from app.database.book_queries import get_book_structure_query
@@ -19,7 +18,9 @@ from app.database.study_mode_queries import (
 from app.schemas.chat import ChatMessageCreate, ChatMessageResponse
 from app.schemas.document_progress import DocumentProgressUpdate
 from app.services.constants import ASSISTANT_ROLE
-from app.services.minio_client import MinIOClientContext, get_file_from_minio
+from app.services.llm_gateway import cancel_on_disconnect
+from app.services.document_stream import build_document_response
+from app.services.minio_client import MinIOClientContext
 from app.services.study_mode import handle_chat_message, save_interaction_to_db
 
 logger = logging.getLogger(__name__)
@@ -30,7 +31,7 @@ router = APIRouter(prefix="/study-mode", tags=["Study Mode"])
 async def study_mode_init(document_id: str, document_type: str, current_user: str = Depends(get_current_user)):
     """ Initialize study mode for a specific document """
     try:
-        with PostgresConnection() as conn:
+        async with PostgresConnection() as conn:
             doc = get_cached_doc_metadata(conn, str(document_id), document_type)
             doc.pop("s3_key", None)  # Remove S3 key from the response
             
@@ -54,8 +55,10 @@ async def study_mode_init(document_id: str, document_type: str, current_user: st
 
 
 @router.get("/documents/{document_id}/stream")
-def stream_document(document_id: str, document_type: str, current_user: str = Depends(get_current_user)):
-    """ Stream the document content from S3 bucket """
+def stream_document(
+    document_id: str, document_type: str, request: Request, current_user: str = Depends(get_current_user)
+):
+    """ Stream the document content from S3 bucket (supports Range, If-None-Match and presigned redirects) """
     try:
         with PostgresConnection() as conn:
             metadata = get_cached_doc_metadata(conn, document_id, document_type)
@@ -65,10 +68,10 @@ def stream_document(document_id: str, document_type: str, current_user: str = De
 
         s3_key = metadata["s3_key"]
         with MinIOClientContext() as s3:
-            file_stream = get_file_from_minio(s3, s3_key)
-
-        return StreamingResponse(file_stream, media_type="application/pdf")
+            return build_document_response(request, s3, s3_key)
 
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback; traceback.print_exc();
         raise HTTPException(status_code=500, detail=f"Error streaming document: {str(e)}")
@@ -107,11 +110,14 @@ def update_last_position(
 async def create_chat_message(
     request: ChatMessageCreate,
     background_tasks: BackgroundTasks,
+    http_request: Request,
     current_user: str = Depends(get_current_user),
 ):
     """ Handle a chat message from the user and get a reply from the model """
     try:
-        llm_reply = await handle_chat_message(request, current_user)
+        llm_reply = await cancel_on_disconnect(
+            http_request, handle_chat_message(request, current_user)
+        )
         tool_response_id = None
         if llm_reply.get("tool_name"):
             tool_response_id = uuid4()
@@ -142,6 +148,8 @@ async def create_chat_message(
 
         return response
 
+    except HTTPException:
+        raise  # e.g. 499 from cancel_on_disconnect
     except Exception as e:
         import traceback; traceback.print_exc();
         logger.error(f"[Create Chat Message] Failed to create chat message: {str(e)}", exc_info=True)
@@ -157,7 +165,7 @@ async def get_chat_history_endpoint(
     Get full chat history for a given session ID, optionally limit the number of messages.
     """
     try:
-        with PostgresConnection() as conn:
+        async with PostgresConnection() as conn:
             messages = get_chat_history(conn, chat_session_id)
         return {"chat_session_id": chat_session_id, "messages": messages}
     except Exception as e:
@@ -175,7 +183,7 @@ async def get_tool_response(
     Get the tool response by its ID.
     """
     try:
-        with PostgresConnection() as conn:
+        async with PostgresConnection() as conn:
             response = get_tool_response_by_id(conn, tool_response_id)
             response["response_text"] = None
             return response
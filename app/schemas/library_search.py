@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 class LibrarySearchRequest(BaseModel):
     query: str = Field(..., min_length=3, max_length=500, description="Search query")
@@ -14,3 +14,4 @@ class LibrarySearchResponse(BaseModel):
     answer: str
     sources: List[str]
     references: List[DocumentReference]
+    debug: Optional[Dict[str, Any]] = None  # per-strategy search timings
@@ -8,7 +8,8 @@ from app.database.connection import PostgresConnection
 import logging
 import base64
 from app.services.constants import LLAMA_3_70b
-from app.services.models import get_client_for_service
+from app.services.llm_gateway import chat_completion
+from app.services.page_artifact import read_local_page_range
 from app.services.prompts import TOC_EXTRACTION_PROMPT
 
 
@@ -59,8 +60,12 @@ async def prepare_toc_images(
 
 
 def extract_text_from_pdf(pdf_path: str, start_page: int, end_page: int) -> str:
-    """Extracts raw text from selected PDF pages."""
+    """Extracts raw text from selected PDF pages (from the upload's page artifact when it has one)."""
     try:
+        text = read_local_page_range(pdf_path, start_page - 1, end_page)
+        if text is not None:
+            return text
+
         text = ""
         with fitz.open(pdf_path) as doc:
             for page_num in range(start_page - 1, end_page):
@@ -93,9 +98,9 @@ async def process_toc_with_llm(text: str) -> dict:
         #     } for img in images
         # ]
 
-        client = get_client_for_service("groq") # TODO add the image model form huggingface for toc and fallback if wrong toc given
-
-        response = client.chat.completions.create(
+        # TODO add the image model form huggingface for toc and fallback if wrong toc given
+        raw_content = await chat_completion(
+            "groq",
             model=LLAMA_3_70b,
             messages=[
                 {"role": "system", "content": TOC_EXTRACTION_PROMPT},
@@ -104,8 +109,6 @@ async def process_toc_with_llm(text: str) -> dict:
             temperature=0.2,
         )
 
-        raw_content = response.choices[0].message.content
-
         cleaned = clean_llm_json_output(raw_content)
         toc_structure = json.loads(cleaned)
 
@@ -130,7 +133,7 @@ async def process_toc_pages(
         text = extract_text_from_pdf(pdf_path, start_page, end_page)
         toc_structure = await process_toc_with_llm(text)
 
-        with PostgresConnection() as conn:
+        async with PostgresConnection() as conn:
             result = create_book_structure(
                 conn=conn, book_id=book_id, toc_structure=toc_structure, s3_key=s3_key
             )
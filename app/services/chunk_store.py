@@ -0,0 +1,90 @@
+"""
+Chunk texts live in Postgres (document_chunks, keyed by doc_id and chunk_index) instead of
+the Qdrant payload. Points only carry ids, which keeps Qdrant RAM and search responses
+small. Texts are fetched in one query for the chunks that survive ranking and filtering.
+
+Points written before the move still have chunk_text in their payload; those are used as-is
+and only chunks without text are looked up here.
+"""
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+from app.database.chunk_queries import (
+    copy_document_chunks,
+    delete_document_chunks,
+    get_chunk_texts,
+    upsert_document_chunks,
+)
+from app.database.connection import PostgresConnection
+
+logger = logging.getLogger(__name__)
+
+# Keep writing chunk_text into Qdrant payloads too (rollback switch while migrating)
+CHUNK_TEXT_IN_PAYLOAD = (os.getenv("CHUNK_TEXT_IN_PAYLOAD") or "false").lower() == "true"
+
+
+def chunk_key(chunk: Dict) -> Optional[Tuple[str, int]]:
+    doc_id, chunk_index = chunk.get("doc_id"), chunk.get("chunk_index")
+    if doc_id is None or chunk_index is None:
+        return None
+    return str(doc_id), int(chunk_index)
+
+
+def save_document_chunks(embedded_data: List[Dict]) -> int:
+    """ Stores the texts of embedded chunks (the output of embed_texts) before their vectors are upserted """
+    rows = [
+        (str(item["metadata"]["doc_id"]), int(item["metadata"]["chunk_index"]), item["metadata"]["chunk_text"])
+        for item in embedded_data
+        if item["metadata"].get("chunk_text")
+    ]
+    with PostgresConnection() as conn:
+        upsert_document_chunks(conn, rows)
+    return len(rows)
+
+
+def fetch_chunk_texts(keys: List[Tuple[str, int]], conn=None) -> Dict[Tuple[str, int], str]:
+    if not keys:
+        return {}
+    if conn is not None:
+        return get_chunk_texts(conn, keys)
+    with PostgresConnection() as conn:
+        return get_chunk_texts(conn, keys)
+
+
+def hydrate_chunk_texts(chunks: List[Dict], conn=None) -> List[Dict]:
+    """
+    Fills in "text" for search results that came back without it, in one query, and drops
+    chunks whose text cannot be found. Pass `conn` to reuse an open connection.
+    """
+    missing = list({key for key in map(chunk_key, (c for c in chunks if not c.get("text"))) if key})
+    if not missing:
+        return [chunk for chunk in chunks if chunk.get("text")]
+
+    try:
+        texts = fetch_chunk_texts(missing, conn)
+    except Exception as e:
+        logger.error(f"[Chunk Store] Failed to fetch {len(missing)} chunk texts: {e}")
+        texts = {}
+
+    hydrated = []
+    for chunk in chunks:
+        if not chunk.get("text"):
+            text = texts.get(chunk_key(chunk), "").strip() if chunk_key(chunk) else ""
+            if not text:
+                logger.warning(f"[Chunk Store] No text for chunk {chunk.get('doc_id')}:{chunk.get('chunk_index')}")
+                continue
+            chunk["text"] = text
+        hydrated.append(chunk)
+
+    logger.info(f"[Chunk Store] Hydrated {len(texts)}/{len(missing)} chunk texts")
+    return hydrated
+
+
+def copy_chunks(source_doc_id: str, target_doc_id: str) -> int:
+    with PostgresConnection() as conn:
+        return copy_document_chunks(conn, source_doc_id, target_doc_id)
+
+
+def delete_chunks(doc_id: str) -> int:
+    with PostgresConnection() as conn:
+        return delete_document_chunks(conn, doc_id)
@@ -1,5 +1,6 @@
+import asyncio
 import re
-from typing import List
+from typing import AsyncIterable, AsyncIterator, List
 
 
 def chunk_text(
@@ -75,12 +76,47 @@ def chunk_text(
         start = next_start
         count += 1
 
-    if start < text_len:
+    if count >= max_chunks and start < text_len:
         print(f"⚠️ Warning: Reached max_chunks limit ({max_chunks}). Some content may be left unprocessed.")
 
     return chunks
 
 
+async def chunk_text_stream_async(
+    text_batches: AsyncIterable[str],
+    chunk_size: int = 1500,
+    chunk_overlap: int = 300,
+    max_chunks: int = 2000
+) -> AsyncIterator[List[str]]:
+    """
+    Chunks a stream of text batches incrementally, yielding one list of chunks per batch.
+    The trailing chunk of every batch is carried into the next one, so chunks still span
+    batch boundaries instead of being cut at them. Chunking runs in a worker thread.
+    """
+    carry = ""
+    emitted = 0
+
+    async for batch in text_batches:
+        if emitted >= max_chunks:
+            print(f"⚠️ Warning: Reached max_chunks limit ({max_chunks}). Some content may be left unprocessed.")
+            return
+
+        text = f"{carry} {batch}" if carry else batch
+        if not text.strip():
+            continue
+
+        # One extra chunk is requested because the last one is held back as carry
+        chunks = await asyncio.to_thread(chunk_text, text, chunk_size, chunk_overlap, max_chunks - emitted + 1)
+        carry = chunks.pop()
+
+        if chunks:
+            emitted += len(chunks)
+            yield chunks
+
+    if carry and emitted < max_chunks:
+        yield [carry]
+
+
 def _find_best_split_point(text: str, start: int, ideal_end: int, overlap: int) -> int:
     """
     Find the best place to split text, prioritizing sentence boundaries.
@@ -13,8 +13,14 @@ KIMI_K2_INSTRUCT_ID ="0068ad8d-ff21-4633-8c8e-6bb0282e0d82" # Kimi-K2-Instruct
 WINDOWS_SOFFICE_PATH = r"C:\Program Files\LibreOffice\program\soffice.com"
 LINUX_SOFFICE_PATH = "/usr/lib/libreoffice/program/soffice.bin"
 
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 HUGGINGFACE_API_URL = "https://router.huggingface.co/hf-inference/models/sentence-transformers/all-MiniLM-L6-v2/pipeline/feature-extraction"
 
+# Batched embedding requests (the feature-extraction endpoint accepts a list of inputs)
+EMBEDDING_BATCH_MAX_ITEMS = 64  # Max chunks packed into one request
+EMBEDDING_BATCH_MAX_TOKENS = 8192  # Max estimated tokens per request (1 token ≈ 4 chars)
+EMBEDDING_BATCH_CONCURRENCY = 4  # Batch requests in flight per embed_texts call
+
 
 SERVICE_CONFIG = {
     "groq": {
@@ -1,10 +1,14 @@
 from app.cache.metadata import delete_cached_doc_metadata
+from app.cache.page_text import delete_cached_pages
 from app.database.book_queries import delete_book_by_id, get_book_by_id
+from app.database.chunk_queries import delete_document_chunks
 from app.database.connection import PostgresConnection
+from app.database.fingerprint_queries import count_other_documents_with_s3_key, delete_document_fingerprint
 from app.database.notes_queries import delete_note_by_id, get_note_by_id
 from app.database.slides_queries import delete_slide_by_id, get_slide_by_id
 from app.database.study_mode_queries import delete_all_document_data
-from app.services.minio_client import MinIOClientContext
+from app.services.minio_client import MinIOClientContext, evict_cached_object
+from app.services.page_artifact import delete_page_artifact
 from app.services.vector_storage import delete_document_embeddings  # Adjust path as needed
 import os
 import logging
@@ -12,6 +16,30 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def delete_unshared_object(conn, s3, bucket: str, document_id: str, s3_key: str) -> None:
+    """ Deletes the document's fingerprint and its S3 object, unless a deduplicated copy still uses the object """
+    shared_by = count_other_documents_with_s3_key(conn, s3_key, document_id)
+    delete_document_fingerprint(conn, document_id)
+
+    if shared_by:
+        logger.info(f"Keeping S3 object {s3_key}, still used by {shared_by} other document(s)")
+        return
+    s3.delete_object(Bucket=bucket, Key=s3_key)
+    evict_cached_object(s3_key)
+    delete_page_artifact(s3, s3_key)
+    delete_cached_pages(s3_key)
+
+
+def delete_chunk_texts(conn, document_id: str) -> None:
+    """ Chunk rows carry no user_id, so this only runs once the caller's ownership is confirmed """
+    try:
+        deleted_chunks = delete_document_chunks(conn, document_id)
+        logger.info(f"Deleted {deleted_chunks} chunk texts for {document_id}")
+    except Exception as e:
+        conn.rollback()
+        logger.warning(f"Failed to delete chunk texts for {document_id}: {e}")
+
+
 def delete_document_and_assets(document_type: str, document_id: str, user_id: str) -> bool:
     try:
         with PostgresConnection() as conn, MinIOClientContext() as s3:
@@ -53,7 +81,8 @@ def delete_document_and_assets(document_type: str, document_id: str, user_id: st
                     return False
                 
                 delete_book_by_id(conn, document_id, user_id)
-                s3.delete_object(Bucket=bucket, Key=book["s3_key"])
+                delete_chunk_texts(conn, document_id)
+                delete_unshared_object(conn, s3, bucket, document_id, book["s3_key"])
                 return True
             
             elif document_type == "presentation":
@@ -62,7 +91,8 @@ def delete_document_and_assets(document_type: str, document_id: str, user_id: st
                     return False
                 
                 delete_slide_by_id(conn, document_id, user_id)
-                s3.delete_object(Bucket=bucket, Key=slide["s3_key"])
+                delete_chunk_texts(conn, document_id)
+                delete_unshared_object(conn, s3, bucket, document_id, slide["s3_key"])
                 return True
             
             elif document_type == "notes":
@@ -70,7 +100,8 @@ def delete_document_and_assets(document_type: str, document_id: str, user_id: st
                 if not note:
                     return False
                 delete_note_by_id(conn, document_id, user_id)
-                s3.delete_object(Bucket=bucket, Key=note["s3_key"])
+                delete_chunk_texts(conn, document_id)
+                delete_unshared_object(conn, s3, bucket, document_id, note["s3_key"])
                 
                 return True
             
@@ -1,7 +1,7 @@
 import re
 import logging
 from app.services.constants import KIMI_K2_INSTRUCT
-from app.services.models import get_client_for_service
+from app.services.llm_gateway import chat_completion
 from app.services.prompts import DIAGRAM_GENERATION_PROMPT
 
 logger = logging.getLogger(__name__)
@@ -38,9 +38,9 @@ async def generate_diagrams(content: str, title: str, chapter_name: str, section
     )
 
     try:
-        client = get_client_for_service("groq")
         logger.info(f"[Diagrams] Generating diagrams for: {title}")
-        response = client.chat.completions.create(
+        raw_content = await chat_completion(
+            "groq",
             model= KIMI_K2_INSTRUCT,
             messages=[
                 {"role": "system", "content": "You are an expert at creating educational Mermaid flowcharts. Generate clear, meaningful diagrams that help users understand and remember concepts. Always return only Mermaid syntax with no additional text."},
@@ -49,7 +49,6 @@ async def generate_diagrams(content: str, title: str, chapter_name: str, section
             temperature=0.4
         )
 
-        raw_content = response.choices[0].message.content
         diagrams = extract_mermaid_diagrams(raw_content)
         return [post_process_mermaid(d) for d in diagrams]
 
@@ -0,0 +1,198 @@
+import asyncio
+import hashlib
+import logging
+import uuid
+from typing import Optional
+from app.database.book_queries import (
+    create_book_query,
+    create_book_structure,
+    get_book_metadata,
+    get_book_structure_query,
+)
+from app.database.connection import PostgresConnection
+from app.database.fingerprint_queries import (
+    create_document_fingerprint,
+    get_document_fingerprint_by_hash,
+)
+from app.database.notes_queries import create_note_query, get_note_metadata
+from app.database.slides_queries import create_slide_query, get_slide_by_id, get_slide_metadata
+from app.services.book_processor import parse_toc_pages, process_toc_pages
+from app.services.chunk_store import copy_chunks
+from app.services.vector_storage import copy_document_embeddings
+
+logger = logging.getLogger(__name__)
+
+
+def compute_content_hash(file_bytes: bytes) -> str:
+    """ SHA-256 of the uploaded file bytes """
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def register_document_fingerprint(
+    document_id: str,
+    document_type: str,
+    user_id: str,
+    content_hash: str,
+    toc_pages: Optional[str] = None,
+) -> None:
+    """ Record a fully processed upload so later identical uploads can reuse its assets """
+    try:
+        with PostgresConnection() as conn:
+            if document_type == "book":
+                metadata = get_book_metadata(conn, document_id)
+            elif document_type in ["slides", "presentation"]:
+                metadata = get_slide_metadata(conn, document_id)
+            else:
+                metadata = get_note_metadata(conn, document_id)
+
+            if not metadata:
+                logger.warning(f"[Dedup] No {document_type} {document_id} found to fingerprint")
+                return
+
+            create_document_fingerprint(
+                conn, document_id, document_type, user_id, content_hash, metadata["s3_key"], toc_pages
+            )
+    except Exception as e:
+        logger.error(f"[Dedup] Failed to register fingerprint for {document_id}: {e}")
+
+
+def _toc_structure_from_book(structure: dict) -> dict:
+    """ Converts get_book_structure_query output back into the TOC shape create_book_structure takes """
+    chapters = []
+    for chapter in structure.get("chapters") or []:
+        chapters.append(
+            {
+                "title": chapter.get("title"),
+                "sections": [
+                    {"title": section.get("title"), "page": section.get("page")}
+                    for section in chapter.get("sections") or []
+                ],
+            }
+        )
+    return {"chapters": chapters}
+
+
+async def _reuse_book(source: dict, tmp_path: str, filename: str, user_id: str, toc_pages: str) -> dict:
+    book_id = str(uuid.uuid4())
+    s3_key = source["s3_key"]
+
+    async with PostgresConnection() as conn:
+        create_book_query(conn, user_id, book_id, filename, filename, s3_key)
+        structure = (
+            get_book_structure_query(conn, source["document_id"])
+            if source["toc_pages"] == toc_pages
+            else None
+        )
+        if structure:
+            create_book_structure(conn, book_id, _toc_structure_from_book(structure), s3_key)
+
+    if not structure:
+        # Same bytes but a different TOC range (or no stored structure): extract the TOC again
+        start_page, end_page = await parse_toc_pages(toc_pages)
+        await process_toc_pages(
+            pdf_path=tmp_path, start_page=start_page, end_page=end_page, book_id=book_id, s3_key=s3_key
+        )
+
+    return {
+        "book_metadata": {"book_id": book_id, "type": "book", "title": filename},
+        "presentation_metadata": None,
+        "note_metadata": None,
+    }
+
+
+def _reuse_slides(source: dict, filename: str, user_id: str) -> dict:
+    with PostgresConnection() as conn:
+        source_slides = get_slide_by_id(conn, source["document_id"], source["user_id"])
+        if not source_slides:
+            return {}
+
+        presentation_id = create_slide_query(
+            conn, user_id, filename, filename, source["s3_key"],
+            total_slides=source_slides["total_slides"],
+            has_speaker_notes=source_slides["has_speaker_notes"],
+        )
+
+    return {
+        "book_metadata": None,
+        "presentation_metadata": {
+            "type": "presentation",
+            "presentation_id": presentation_id,
+            "title": filename,
+            "slides": source_slides["total_slides"],
+            "has_notes": source_slides["has_speaker_notes"],
+        },
+        "note_metadata": None,
+    }
+
+
+def _reuse_notes(source: dict, filename: str, user_id: str) -> dict:
+    with PostgresConnection() as conn:
+        note_id = create_note_query(
+            conn=conn, user_id=user_id, title=filename, filename=filename, s3_key=source["s3_key"]
+        )
+
+    return {
+        "book_metadata": None,
+        "presentation_metadata": None,
+        "note_metadata": {"type": "notes", "note_id": note_id, "title": filename},
+    }
+
+
+async def reuse_existing_document(
+    content_hash: str,
+    document_type: str,
+    tmp_path: str,
+    filename: str,
+    user_id: str,
+    toc_pages: Optional[str] = None,
+) -> Optional[dict]:
+    """
+    If these exact bytes were already processed (by any user), create the new user's document
+    on top of the existing S3 object, TOC structure and embeddings instead of reprocessing.
+    Returns {"result", "doc_id", "storage_result"} or None when there is nothing to reuse.
+    """
+    try:
+        async with PostgresConnection() as conn:
+            source = get_document_fingerprint_by_hash(conn, content_hash, document_type, toc_pages)
+    except Exception as e:
+        logger.error(f"[Dedup] Fingerprint lookup failed: {e}")
+        return None
+
+    if not source:
+        return None
+
+    logger.info(f"[Dedup] {filename} matches {document_type} {source['document_id']}, reusing its assets")
+
+    if document_type == "book":
+        result = await _reuse_book(source, tmp_path, filename, user_id, toc_pages)
+        doc_id = result["book_metadata"]["book_id"]
+    elif document_type in ["slides", "presentation"]:
+        result = await asyncio.to_thread(_reuse_slides, source, filename, user_id)
+        if not result:
+            return None
+        doc_id = result["presentation_metadata"]["presentation_id"]
+    else:
+        result = await asyncio.to_thread(_reuse_notes, source, filename, user_id)
+        doc_id = result["note_metadata"]["note_id"]
+
+    # Chunk texts first: copied points without their texts would be dropped from every search
+    try:
+        copied_chunks = await asyncio.to_thread(copy_chunks, str(source["document_id"]), str(doc_id))
+        logger.info(f"[Dedup] Copied {copied_chunks} chunk texts to {doc_id}")
+    except Exception as e:
+        logger.error(f"[Dedup] Failed to copy chunk texts to {doc_id}: {e}")
+        storage_result = {"status": "error", "message": f"Failed to copy chunk texts: {e}"}
+    else:
+        storage_result = await asyncio.to_thread(
+            copy_document_embeddings,
+            source_user_id=str(source["user_id"]),
+            source_doc_id=str(source["document_id"]),
+            target_user_id=user_id,
+            target_doc_id=str(doc_id),
+        )
+
+    return {
+        "result": result,
+        "doc_id": str(doc_id),
+        "storage_result": storage_result,
+    }
@@ -0,0 +1,122 @@
+"""
+HTTP semantics for streaming stored documents to PDF viewers.
+
+PDF.js opens large files with Range requests and revalidates with If-None-Match, so the
+stream endpoint answers with Accept-Ranges/Content-Length/ETag/Last-Modified, 206 partial
+responses (served from the local disk cache or proxied to MinIO ranged GETs), 304s for
+unchanged documents and 416 for unsatisfiable ranges. In "redirect" mode it instead sends
+the viewer to a short-lived presigned MinIO URL, and MinIO handles all of the above.
+"""
+import logging
+import os
+import re
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+
+from app.services.minio_client import get_file_from_minio, get_object_info, get_presigned_url
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_STREAM_MODE = (os.getenv("DOCUMENT_STREAM_MODE") or "proxy").lower()  # "proxy" or "redirect"
+DOCUMENT_PRESIGNED_URL_TTL = int(os.getenv("DOCUMENT_PRESIGNED_URL_TTL") or 300)  # seconds
+# Per-user documents: browsers may keep them but must revalidate (cheap with the ETag)
+DOCUMENT_CACHE_CONTROL = "private, no-cache"
+
+_RANGE = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$", re.IGNORECASE)
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    (start, end) inclusive for a single-range "bytes=" header, None to serve the whole
+    document (no header, multiple ranges or a syntax we ignore, as RFC 9110 allows).
+    Raises RangeNotSatisfiable when the range starts past the end of the document.
+    """
+    if not header:
+        return None
+    match = _RANGE.match(header)
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:  # suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - length), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Weak comparison, as If-None-Match requires
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+def _not_modified(request: Request, etag: str, last_modified) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return last_modified.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _range_applies(request: Request, etag: str) -> bool:
+    """ If-Range: only honour the Range header while the viewer's copy is still current """
+    if_range = request.headers.get("if-range")
+    return not if_range or if_range.strip() == etag
+
+
+def build_document_response(
+    request: Request, s3, s3_key: str, media_type: str = "application/pdf"
+) -> Response:
+    """ Full, partial, 304 or redirect response for a stored document """
+    if DOCUMENT_STREAM_MODE == "redirect":
+        url = get_presigned_url(s3, s3_key, DOCUMENT_PRESIGNED_URL_TTL, content_type=media_type)
+        return RedirectResponse(url, status_code=307, headers={"Cache-Control": "no-store"})
+
+    info = get_object_info(s3, s3_key)
+    etag, size = info["etag"], info["size"]
+    headers = {"Accept-Ranges": "bytes", "ETag": etag, "Cache-Control": DOCUMENT_CACHE_CONTROL}
+    if info["last_modified"]:
+        headers["Last-Modified"] = format_datetime(info["last_modified"], usegmt=True)
+
+    if _not_modified(request, etag, info["last_modified"]):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if _range_applies(request, etag):
+        try:
+            byte_range = parse_byte_range(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        body = get_file_from_minio(s3, s3_key, etag=etag)
+        return StreamingResponse(body, media_type=media_type, headers={**headers, "Content-Length": str(size)})
+
+    start, end = byte_range
+    body = get_file_from_minio(s3, s3_key, byte_range=byte_range, etag=etag)
+    headers.update({"Content-Range": f"bytes {start}-{end}/{size}", "Content-Length": str(end - start + 1)})
+    return StreamingResponse(body, status_code=206, media_type=media_type, headers=headers)
@@ -2,9 +2,16 @@ import logging
 import httpx
 import os
 import asyncio
-from typing import List, Dict
-from app.services.constants import HUGGINGFACE_API_URL
+from typing import List, Dict, Optional
+from app.services.constants import (
+    EMBEDDING_BATCH_CONCURRENCY,
+    EMBEDDING_BATCH_MAX_ITEMS,
+    EMBEDDING_BATCH_MAX_TOKENS,
+    HUGGINGFACE_API_URL,
+)
 from app.services.models import get_next_api_key
+from app.cache.embeddings import cache_embeddings, get_cached_embeddings
+from app.services.http_clients import get_async_http_client
 
 
 logger = logging.getLogger(__name__)
@@ -37,6 +44,119 @@ def preprocess_chunk(chunk: str, max_length: int = 512) -> str:
     return chunk
 
 
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (1 token ≈ 4 characters for English)"""
+    return max(1, len(text) // 4)
+
+
+def plan_embedding_batches(
+    texts: List[str],
+    max_items: int = EMBEDDING_BATCH_MAX_ITEMS,
+    max_tokens: int = EMBEDDING_BATCH_MAX_TOKENS,
+) -> List[List[int]]:
+    """
+    Group text indices into request batches bounded by item count and estimated tokens.
+    Short chunks are packed densely, long chunks get smaller batches.
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+
+    for index, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(index)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _is_valid_vector(value) -> bool:
+    return isinstance(value, list) and bool(value) and all(
+        isinstance(val, (int, float)) for val in value
+    )
+
+
+async def embed_batch(
+    client: httpx.AsyncClient, texts: List[str], max_retries: int = 3
+) -> Optional[List[List[float]]]:
+    """
+    Embed already-preprocessed texts in a single request.
+    Returns one vector per text in input order, or None if the batch failed.
+    """
+    headers = get_huggingface_headers()
+    for attempt in range(max_retries):
+        try:
+            response = await client.post(
+                HUGGINGFACE_API_URL,
+                json={"inputs": texts},
+                headers=headers,
+                timeout=120,
+            )
+            response.raise_for_status()
+
+            data = response.json()
+
+            # Hugging Face returns one vector per input
+            if (
+                isinstance(data, list)
+                and len(data) == len(texts)
+                and all(_is_valid_vector(vector) for vector in data)
+            ):
+                return data
+            else:
+                print(f"Unexpected batch response format on attempt {attempt + 1} ({len(texts)} inputs)")
+
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 429:  # Rate limit
+                wait_time = 2**attempt  # Exponential backoff
+                print(f"Rate limited, waiting {wait_time}s before batch retry {attempt + 1}")
+                await asyncio.sleep(wait_time)
+            elif e.response.status_code >= 500:  # Server error
+                wait_time = 1 * attempt
+                print(f"Server error, waiting {wait_time}s before batch retry {attempt + 1}")
+                await asyncio.sleep(wait_time)
+            else:
+                # e.g. 413 payload too large: let the caller split the batch
+                print(f"HTTP error on batch attempt {attempt + 1}: {e}")
+                break
+        except Exception as e:
+            print(f"Batch embedding failed on attempt {attempt + 1}: {e}")
+            if attempt < max_retries - 1:
+                await asyncio.sleep(1)
+
+    return None
+
+
+async def embed_batch_with_split(
+    client: httpx.AsyncClient, texts: List[str], max_retries: int = 3
+) -> List[List[float]]:
+    """
+    Embed a batch, splitting it in half and retrying each half when the whole batch fails.
+    A single text that still fails goes through embed_single_chunk.
+    Returns one vector per text (an empty list for texts that could not be embedded).
+    """
+    if len(texts) == 1:
+        return [await embed_single_chunk(client, texts[0], max_retries)]
+
+    vectors = await embed_batch(client, texts, max_retries)
+    if vectors is not None:
+        return vectors
+
+    middle = len(texts) // 2
+    print(f"Splitting failed batch of {len(texts)} into {middle} + {len(texts) - middle}")
+    left, right = await asyncio.gather(
+        embed_batch_with_split(client, texts[:middle], max_retries),
+        embed_batch_with_split(client, texts[middle:], max_retries),
+    )
+    return left + right
+
+
 async def embed_single_chunk(
     client: httpx.AsyncClient, chunk: str, max_retries: int = 3
 ) -> List[float]:
@@ -84,11 +204,22 @@ async def embed_single_chunk(
 
 
 async def embed_texts(
-    chunks: List[str], user_id: str, doc_id: str, doc_type: str, max_concurrent: int = 5
+    chunks: List[str],
+    user_id: str,
+    doc_id: str,
+    doc_type: str,
+    max_concurrent: int = EMBEDDING_BATCH_CONCURRENCY,
+    start_index: int = 0,
+    batched: bool = True,
+    use_cache: bool = True,
 ) -> List[Dict]:
     """
     Generate embeddings for chunks with rate limiting and error handling.
     Returns list of dicts containing embeddings and metadata.
+    `start_index` offsets chunk_index when a document is embedded in several batches.
+    With `batched`, chunks are packed into multi-input requests sized by token estimate;
+    otherwise each chunk is sent on its own (max_concurrent requests in flight either way).
+    With `use_cache`, vectors are looked up in / written to the embedding cache first.
     """
     if not chunks:
         print("No chunks provided")
@@ -96,24 +227,66 @@ async def embed_texts(
 
     print(f"Generating embeddings for {len(chunks)} chunks...")
 
-    # Rate limiting with semaphore
-    semaphore = asyncio.Semaphore(max_concurrent)
+    processed = [preprocess_chunk(chunk) for chunk in chunks]
+    vectors: List[List[float]] = [[] for _ in chunks]
+
+    # Re-uploaded books and repeated chunks skip the remote call entirely
+    if use_cache:
+        cached = await asyncio.to_thread(get_cached_embeddings, processed)
+        for i, vector in enumerate(cached):
+            if vector is not None:
+                vectors[i] = vector
+    pending = [i for i, vector in enumerate(vectors) if not vector]
+    if use_cache:
+        print(f"Embedding cache: {len(chunks) - len(pending)}/{len(chunks)} chunks cached")
+
+    if pending:
+        # Rate limiting with semaphore
+        semaphore = asyncio.Semaphore(max_concurrent)
+
+        client = get_async_http_client()
+        if batched:
+            pending_texts = [processed[i] for i in pending]
+            batches = [
+                [pending[j] for j in batch]
+                for batch in plan_embedding_batches(pending_texts)
+            ]
+            print(f"Packing {len(pending)} chunks into {len(batches)} embedding requests")
+
+            async def embed_batch_with_semaphore(indices: List[int]):
+                async with semaphore:
+                    batch_vectors = await embed_batch_with_split(
+                        client, [processed[i] for i in indices]
+                    )
+                    return list(zip(indices, batch_vectors))
 
-    async def embed_with_semaphore(client: httpx.AsyncClient, chunk: str, index: int):
-        async with semaphore:
-            embedding = await embed_single_chunk(client, chunk)
-            return index, embedding
+            batch_results = await asyncio.gather(
+                *(embed_batch_with_semaphore(indices) for indices in batches)
+            )
+            results = [pair for pairs in batch_results for pair in pairs]
+        else:
+            async def embed_with_semaphore(chunk: str, index: int):
+                async with semaphore:
+                    embedding = await embed_single_chunk(client, chunk)
+                    return index, embedding
+
+            tasks = [embed_with_semaphore(chunks[i], i) for i in pending]
+            results = await asyncio.gather(*tasks)
 
-    async with httpx.AsyncClient() as client:
-        tasks = [
-            embed_with_semaphore(client, chunk, i) for i, chunk in enumerate(chunks)
-        ]
-        results = await asyncio.gather(*tasks)
+        for index, emb in results:
+            vectors[index] = emb
+
+        if use_cache:
+            await asyncio.to_thread(
+                cache_embeddings,
+                [processed[i] for i in pending],
+                [vectors[i] for i in pending],
+            )
 
     embedded_docs = []
     failed_count = 0
 
-    for index, emb in results:
+    for index, emb in enumerate(vectors):
         if emb:  # Only add successful embeddings
             embedded_docs.append(
                 {
@@ -122,7 +295,7 @@ async def embed_texts(
                         "user_id": user_id,
                         "doc_id": doc_id,
                         "doc_type": doc_type,
-                        "chunk_index": index,
+                        "chunk_index": start_index + index,
                         "chunk_text": chunks[index],
                         "chunk_length": len(chunks[index]),
                         "embedding_dim": len(emb),
@@ -144,10 +317,51 @@ async def embed_texts(
 
 
 async def embed_single_text(text: str) -> List[float]:
-    """Generate embedding for a single text string"""
+    """Generate embedding for a single text string, served from the embedding cache when possible"""
     try:
-        async with httpx.AsyncClient() as client:
-            return await embed_single_chunk(client, text)
+        processed = preprocess_chunk(text)
+        cached = await asyncio.to_thread(get_cached_embeddings, [processed])
+        if cached[0] is not None:
+            return cached[0]
+
+        embedding = await embed_single_chunk(get_async_http_client(), processed)
+
+        if embedding:
+            await asyncio.to_thread(cache_embeddings, [processed], [embedding])
+        return embedding
     except Exception as e:
         print(f"Single text embedding failed: {e}")
         return []
+
+
+async def embed_query_texts(texts: List[str]) -> List[List[float]]:
+    """
+    Embed several short query texts together: cache hits are served locally and all misses
+    go out as one batched request. Returns one vector per text ([] where embedding failed).
+    """
+    if not texts:
+        return []
+
+    processed = [preprocess_chunk(text) for text in texts]
+    unique = list(dict.fromkeys(processed))
+    vectors: Dict[str, List[float]] = {}
+
+    try:
+        cached = await asyncio.to_thread(get_cached_embeddings, unique)
+        for text, vector in zip(unique, cached):
+            if vector is not None:
+                vectors[text] = vector
+
+        missing = [text for text in unique if text not in vectors]
+        if missing:
+            embedded = await embed_batch_with_split(get_async_http_client(), missing)
+            hits = [(text, vector) for text, vector in zip(missing, embedded) if vector]
+            vectors.update(hits)
+            if hits:
+                await asyncio.to_thread(
+                    cache_embeddings, [text for text, _ in hits], [vector for _, vector in hits]
+                )
+    except Exception as e:
+        print(f"Query embedding failed: {e}")
+
+    return [vectors.get(text, []) for text in processed]
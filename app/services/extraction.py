@@ -1,33 +1,26 @@
+import asyncio
+import logging
+import multiprocessing
 import os
 import fitz  # PyMuPDF
 import unicodedata
 import re
-from collections import Counter
-import nltk
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from typing import AsyncIterator, List, Optional, Tuple
+from app.services import text_normalizer
+from app.services.nlp_resources import get_extended_stopwords, sent_tokenize, word_tokenize
+from app.services.page_artifact import read_local_page_count, read_local_page_range
 
+logger = logging.getLogger(__name__)
 
-def download_nltk_resources():
-    """Download required NLTK resources."""
-    try:
-        # Try to find the resources first
-        nltk.data.find("tokenizers/punkt")
-        nltk.data.find("tokenizers/punkt_tab")
-        nltk.data.find("corpora/stopwords")
-    except LookupError:
-        # Download if not found
-        print("Downloading NLTK resources...")
-        nltk.download("punkt", quiet=True)
-        nltk.download("punkt_tab", quiet=True)
-
-        nltk.download("stopwords", quiet=True)
-        print("NLTK resources downloaded successfully.")
-
-
-download_nltk_resources()
-
+# Worker processes used for CPU-bound PDF extraction and preprocessing
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS") or max(1, (os.cpu_count() or 2) - 1))
+EXTRACTION_PAGES_PER_SHARD = int(os.getenv("EXTRACTION_PAGES_PER_SHARD") or 25)
 
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize, sent_tokenize
+_extraction_pool: Optional[ProcessPoolExecutor] = None
+_extraction_pool_lock = Lock()
 
 
 def normalize_unicode(text: str) -> str:
@@ -247,102 +240,6 @@ def filter_content_for_mcq(text: str) -> str:
     return "\n".join(filtered_lines)
 
 
-def download_nltk_resources():
-    """Download required NLTK resources."""
-    try:
-        # Try to find the resources first
-        nltk.data.find("tokenizers/punkt")
-        nltk.data.find("corpora/stopwords")
-    except LookupError:
-        # Download if not found
-        print("Downloading NLTK resources...")
-        nltk.download("punkt", quiet=True)
-        nltk.download("punkt_tab", quiet=True)  # For newer NLTK versions
-        nltk.download("stopwords", quiet=True)
-        print("NLTK resources downloaded successfully.")
-
-
-def get_extended_stopwords() -> set:
-    """Get comprehensive stopword list using NLTK and additional academic terms."""
-    # NLTK resources are already downloaded at module import
-
-    # Get NLTK English stopwords
-    nltk_stopwords = set(stopwords.words("english"))
-
-    # Additional academic and technical stopwords
-    academic_stopwords = {
-        "however",
-        "therefore",
-        "furthermore",
-        "moreover",
-        "nevertheless",
-        "consequently",
-        "subsequently",
-        "accordingly",
-        "hence",
-        "thus",
-        "particularly",
-        "specifically",
-        "generally",
-        "typically",
-        "usually",
-        "often",
-        "sometimes",
-        "always",
-        "never",
-        "also",
-        "additionally",
-        "besides",
-        "likewise",
-        "similarly",
-        "conversely",
-        "instead",
-        "although",
-        "though",
-        "whereas",
-        "since",
-        "due",
-        "regarding",
-        "concerning",
-        "according",
-        "based",
-        "given",
-        "shown",
-        "described",
-        "presented",
-        "discussed",
-        "mentioned",
-        "noted",
-        "observed",
-        "found",
-        "seen",
-        "used",
-        "applied",
-        "following",
-        "previous",
-        "next",
-        "various",
-        "different",
-        "several",
-        "many",
-        "numerous",
-        "multiple",
-        "certain",
-        "particular",
-        "important",
-        "significant",
-        "possible",
-        "likely",
-        "probably",
-        "perhaps",
-        "maybe",
-        "clearly",
-        "obviously",
-    }
-
-    return nltk_stopwords | academic_stopwords
-
-
 def remove_stopwords_from_text(text: str) -> str:
     """Remove stopwords using NLTK while preserving meaningful content and structure."""
 
@@ -409,6 +306,8 @@ def extract_technical_terms(text: str) -> set:
 def enhance_meaningful_content(text: str) -> str:
     """Enhanced content extraction focusing on meaningful academic/technical content."""
 
+    stop_words = get_extended_stopwords()
+
     # Remove very short paragraphs (likely fragments)
     paragraphs = text.split("\n\n")
     meaningful_paragraphs = []
@@ -424,7 +323,6 @@ def enhance_meaningful_content(text: str) -> str:
 
         # Calculate word density (meaningful words vs total words)
         words = word_tokenize(paragraph.lower())
-        stop_words = get_extended_stopwords()
         meaningful_word_count = sum(
             1 for word in words if word not in stop_words and len(word) > 2
         )
@@ -473,51 +371,105 @@ def extract_key_concepts(text: str) -> list:
 
 def preprocess_text_for_vector_store(text: str) -> str:
     """Specialized preprocessing for vector store with enhanced stopword removal."""
-    # Basic cleaning
-    text = normalize_unicode(text)
-    text = remove_control_characters(text)
-    text = clean_latex_remnants(text)
-    text = fix_common_ocr_errors(text)
-    text = remove_noise_patterns(text)
-    text = clean_table_of_contents(text)
-    text = remove_repeated_lines(text)
-    text = merge_broken_lines(text)
+    # Basic cleaning (compiled equivalent of normalize_unicode ... merge_broken_lines)
+    text = text_normalizer.normalize_text_for_vector_store(text)
 
     # Enhanced processing for vector storage
     text = enhance_meaningful_content(text)
     text = remove_stopwords_from_text(text)
-    text = normalize_whitespace(text)
+    text = text_normalizer.normalize_whitespace(text)
 
     return text
 
 
 def preprocess_text_for_rag(text: str) -> str:
     """Run full preprocessing pipeline optimized for RAG-based MCQ generation."""
-    text = normalize_unicode(text)
-    text = remove_control_characters(text)
-    text = clean_latex_remnants(text)
-    text = fix_common_ocr_errors(text)
-    text = remove_noise_patterns(text)
-    text = clean_table_of_contents(text)
-    text = remove_repeated_lines(text)
-    text = merge_broken_lines(text)
-    text = split_into_semantic_chunks(text)
-    text = normalize_whitespace(text)
-    text = filter_content_for_mcq(text)
+    # Compiled equivalent of normalize_unicode ... filter_content_for_mcq
+    text = text_normalizer.normalize_text_for_rag(text)
     text = enhance_meaningful_content(text)  # Enhanced content filtering
     text = remove_stopwords_from_text(text)  # Remove stopwords using NLTK
     return text
 
 
-async def extract_and_preprocess_text(file_path: str, extension: str) -> str:
-    """Extract and clean text from supported file types for RAG MCQ generation."""
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """Return the shared extraction process pool, creating it on first use."""
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is None:
+            # spawn avoids forking a multi-threaded server process
+            _extraction_pool = ProcessPoolExecutor(
+                max_workers=EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"[Extraction] Started process pool with {EXTRACTION_WORKERS} workers")
+        return _extraction_pool
+
+
+def shutdown_extraction_pool() -> None:
+    """Stop the extraction process pool, if it was started."""
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is not None:
+            _extraction_pool.shutdown(wait=False, cancel_futures=True)
+            _extraction_pool = None
+            logger.info("[Extraction] Process pool shut down")
+
+
+def get_pdf_page_count(file_path: str) -> int:
+    """Return the number of pages in a PDF (from the upload's page artifact when it has one)."""
+    page_count = read_local_page_count(file_path)
+    if page_count is not None:
+        return page_count
+    with fitz.open(file_path) as doc:
+        return len(doc)
+
+
+def plan_page_shards(page_count: int, pages_per_shard: int = EXTRACTION_PAGES_PER_SHARD) -> List[Tuple[int, int]]:
+    """Split [0, page_count) into consecutive (start, end) page ranges."""
+    if pages_per_shard <= 0:
+        raise ValueError("pages_per_shard must be a positive integer.")
+    return [
+        (start, min(start + pages_per_shard, page_count))
+        for start in range(0, page_count, pages_per_shard)
+    ]
+
+
+def extract_and_preprocess_page_range(file_path: str, start: int, end: int) -> str:
+    """
+    Extract and preprocess pages [start, end). Runs inside an extraction worker process.
+    Reads only those pages from the upload's page artifact when it has one.
+    """
+    raw_text = read_local_page_range(file_path, start, end)
+    if raw_text is None:
+        with fitz.open(file_path) as doc:
+            raw_text = "".join(doc.load_page(page_num).get_text() for page_num in range(start, end))
+    return preprocess_text_for_rag(raw_text)
+
+
+async def iter_preprocessed_page_batches_async(
+    file_path: str,
+    pages_per_shard: int = EXTRACTION_PAGES_PER_SHARD,
+    max_in_flight: Optional[int] = None,
+) -> AsyncIterator[str]:
+    """
+    Yield preprocessed text shard by shard, in page order, while the process pool works
+    ahead on up to `max_in_flight` shards. Results are awaited, never blocked on, so the
+    event loop stays free. Shards not yet consumed are cancelled when the consumer stops
+    early (aclose, cancellation or error).
+    """
+    pool = get_extraction_pool()
+    max_in_flight = max_in_flight or EXTRACTION_WORKERS
+    in_flight = deque()
+    page_count = await asyncio.to_thread(get_pdf_page_count, file_path)
+
     try:
-        doc = fitz.open(file_path)
-        raw_text = "".join(page.get_text() for page in doc)
-        clean_text = preprocess_text_for_rag(raw_text)
-        return clean_text
-    except Exception as e:
-        raise RuntimeError(f"Text extraction failed: {str(e)}")
+        for start, end in plan_page_shards(page_count, pages_per_shard):
+            in_flight.append(pool.submit(extract_and_preprocess_page_range, file_path, start, end))
+            if len(in_flight) >= max_in_flight:
+                yield await asyncio.wrap_future(in_flight.popleft())
+
+        while in_flight:
+            yield await asyncio.wrap_future(in_flight.popleft())
     finally:
-        if "doc" in locals():
-            doc.close()
+        for future in in_flight:
+            future.cancel()
@@ -4,7 +4,7 @@ from typing import List
 from pydantic import ValidationError
 from app.schemas.flashcard import Flashcard
 from app.services.constants import KIMI_K2_INSTRUCT
-from app.services.models import get_client_for_service
+from app.services.llm_gateway import chat_completion
 from app.services.prompts import FLASH_CARD_GENERATION_PROMPT, FLASHCARD_SYSTEM_PROMPT
 
 logger = logging.getLogger(__name__)
@@ -65,10 +65,9 @@ async def generate_flashcards(
         content=content
     )
     
-    client = get_client_for_service("groq")
-   
     try:
-        response = client.chat.completions.create(
+        raw_content = await chat_completion(
+            "groq",
             model= KIMI_K2_INSTRUCT,
             messages=[
                 {"role": "system", "content": FLASHCARD_SYSTEM_PROMPT},
@@ -78,7 +77,6 @@ async def generate_flashcards(
         )
         
         # Clean the response content
-        raw_content = response.choices[0].message.content
         cleaned_content = clean_response_content(raw_content)
         
         # Parse JSON safely
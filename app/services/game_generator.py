@@ -2,7 +2,7 @@ import re
 from fastapi import HTTPException
 import logging
 from app.services.constants import LLAMA_3_70b, QWEN_CODER_32b
-from app.services.models import get_client_for_service
+from app.services.llm_gateway import chat_completion
 from app.services.prompts import GAME_CODE_PROMPT, GAME_CODE_PROMPT_OLD, GAME_GEN_SYSTEM_PROMPT, GAME_IDEA_PROMPT
 from app.services.utils import get_openai_client
 
@@ -24,8 +24,8 @@ async def generate_game_idea(content: str, learning_profile: str,):
             learning_profile=learning_profile
         )
         
-        client = get_client_for_service() # TODO ADD service var when implemented
-        response = client.chat.completions.create(
+        reply = await chat_completion(
+            "groq", # TODO ADD service var when implemented
             model= "llama-3.1-8b-instant",
             messages=[
                 {"role": "system", "content": "You are an expert educational game designer. Your task is to generate a game idea based on the given content and learning profile. The game idea should be concise, engaging, and suitable for the target audience. Please ensure that the game idea is unique and not similar to any existing games. You should also provide a brief explanation of the game concept and mechanics. Yor game will idea be used to generate a game code, so it should be detailed enough to allow for code generation."},
@@ -34,7 +34,7 @@ async def generate_game_idea(content: str, learning_profile: str,):
             temperature=0.7
         )
         
-        return response.choices[0].message.content.strip()
+        return reply.strip()
 
     except Exception as e:
         logger.error(f"Error generating game idea: {str(e)}")
@@ -47,8 +47,8 @@ async def generate_game_code(game_idea: str):
             game_idea=game_idea
         )
         
-        client = get_client_for_service("huggingface_hyberbolic")
-        response = client.chat.completions.create(
+        reply = await chat_completion(
+            "huggingface_hyberbolic",
             model=QWEN_CODER_32b,
             messages=[
                 {"role": "system", "content": GAME_GEN_SYSTEM_PROMPT},
@@ -57,7 +57,7 @@ async def generate_game_code(game_idea: str):
             temperature=0.7
         )
         
-        return response.choices[0].message.content.strip()
+        return reply.strip()
         
     except Exception as e:
         import traceback; traceback.print_exc();
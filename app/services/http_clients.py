@@ -0,0 +1,191 @@
+"""
+Application-lifetime HTTP client registry.
+
+Embedding and LLM calls reuse keep-alive (HTTP/2 where available) connection pools
+instead of paying TCP/TLS setup per request. Pools are keyed per service, OpenAI
+clients per (service, api_key) on top of the service's pool. Clients are created
+lazily (or on startup via open_http_clients) and closed on application shutdown.
+"""
+import logging
+import os
+from collections import defaultdict
+from threading import Lock
+from typing import Dict, Tuple
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+logger = logging.getLogger(__name__)
+
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS") or 100)
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE") or 20)
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY") or 60)  # seconds
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT") or 120)  # seconds
+HTTP2_ENABLED = (os.getenv("HTTP2_ENABLED") or "true").lower() == "true"
+
+try:
+    import h2  # noqa: F401  (httpx only speaks HTTP/2 when h2 is installed)
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+# Services whose pools are opened on startup
+EMBEDDING_SERVICE = "huggingface_embeddings"
+
+_async_clients: Dict[str, httpx.AsyncClient] = {}
+_sync_clients: Dict[str, httpx.Client] = {}
+_openai_clients: Dict[Tuple[str, str], OpenAI] = {}
+_async_openai_clients: Dict[Tuple[str, str], AsyncOpenAI] = {}
+_registry_lock = Lock()
+
+_metrics = defaultdict(lambda: {"requests": 0, "new_connections": 0})
+_metrics_lock = Lock()
+
+
+def _use_http2() -> bool:
+    if HTTP2_ENABLED and not _HTTP2_AVAILABLE:
+        logger.warning("[HTTP] HTTP2_ENABLED but the h2 package is not installed, using HTTP/1.1")
+    return HTTP2_ENABLED and _HTTP2_AVAILABLE
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def _record(service: str, name: str) -> None:
+    with _metrics_lock:
+        _metrics[service][name] += 1
+
+
+def _sync_tracer(service: str):
+    """ httpcore trace callback: counts requests and newly opened TCP connections """
+    def trace(event: str, info: dict) -> None:
+        if event.endswith("connect_tcp.complete"):
+            _record(service, "new_connections")
+
+    def on_request(request: httpx.Request) -> None:
+        _record(service, "requests")
+        request.extensions["trace"] = trace
+
+    return on_request
+
+
+def _async_tracer(service: str):
+    async def trace(event: str, info: dict) -> None:
+        if event.endswith("connect_tcp.complete"):
+            _record(service, "new_connections")
+
+    async def on_request(request: httpx.Request) -> None:
+        _record(service, "requests")
+        request.extensions["trace"] = trace
+
+    return on_request
+
+
+def get_async_http_client(service: str = EMBEDDING_SERVICE) -> httpx.AsyncClient:
+    """ Shared async client (one connection pool) for a service """
+    with _registry_lock:
+        client = _async_clients.get(service)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                http2=_use_http2(),
+                limits=_limits(),
+                timeout=HTTP_TIMEOUT,
+                event_hooks={"request": [_async_tracer(service)]},
+            )
+            _async_clients[service] = client
+            logger.info(f"[HTTP] Opened async connection pool for {service}")
+        return client
+
+
+def get_sync_http_client(service: str) -> httpx.Client:
+    """ Shared sync client (one connection pool) for a service """
+    with _registry_lock:
+        client = _sync_clients.get(service)
+        if client is None or client.is_closed:
+            client = httpx.Client(
+                http2=_use_http2(),
+                limits=_limits(),
+                timeout=HTTP_TIMEOUT,
+                event_hooks={"request": [_sync_tracer(service)]},
+            )
+            _sync_clients[service] = client
+            logger.info(f"[HTTP] Opened connection pool for {service}")
+        return client
+
+
+def get_openai_client(service: str, api_key: str, base_url: str) -> OpenAI:
+    """ Cached OpenAI-compatible client per (service, api_key), sharing the service's pool """
+    key = (service, api_key)
+    client = _openai_clients.get(key)
+    if client is not None:
+        return client
+
+    http_client = get_sync_http_client(service)
+    with _registry_lock:
+        client = _openai_clients.get(key)
+        if client is None:
+            client = OpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+            _openai_clients[key] = client
+        return client
+
+
+def get_async_openai_client(service: str, api_key: str, base_url: str) -> AsyncOpenAI:
+    """ Cached AsyncOpenAI-compatible client per (service, api_key), sharing the service's async pool """
+    key = (service, api_key)
+    client = _async_openai_clients.get(key)
+    if client is not None:
+        return client
+
+    http_client = get_async_http_client(service)
+    with _registry_lock:
+        client = _async_openai_clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+            _async_openai_clients[key] = client
+        return client
+
+
+def get_http_client_metrics() -> dict:
+    """ Per-service request count, new connections and connection reuse ratio """
+    with _metrics_lock:
+        snapshot = {service: dict(counts) for service, counts in _metrics.items()}
+
+    for counts in snapshot.values():
+        requests = counts["requests"]
+        counts["reuse_ratio"] = (
+            round(1 - counts["new_connections"] / requests, 4) if requests else 0.0
+        )
+    return snapshot
+
+
+async def open_http_clients() -> None:
+    """ Opens the pools used on the hot path so the first requests don't pay for it """
+    get_async_http_client(EMBEDDING_SERVICE)
+
+
+async def close_http_clients() -> None:
+    """ Closes every pooled client; later calls transparently open new ones """
+    with _registry_lock:
+        async_clients = list(_async_clients.values())
+        sync_clients = list(_sync_clients.values())
+        _async_clients.clear()
+        _sync_clients.clear()
+        _openai_clients.clear()
+        _async_openai_clients.clear()
+
+    for client in async_clients:
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"[HTTP] Failed to close async client: {e}")
+    for client in sync_clients:
+        try:
+            client.close()
+        except Exception as e:
+            logger.warning(f"[HTTP] Failed to close client: {e}")
+
+    logger.info(f"[HTTP] Closed connection pools, metrics: {get_http_client_metrics()}")
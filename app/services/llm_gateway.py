@@ -0,0 +1,135 @@
+"""
+Async gateway for every LLM chat completion in the app.
+
+Completions go through AsyncOpenAI on the shared connection pools, so a request
+waiting on a model no longer blocks the event loop. Each service has its own
+concurrency limit (requests beyond it wait their turn instead of piling onto the
+provider's rate limit), every call has a timeout, and route handlers can cancel the
+in-flight completion when the HTTP client disconnects.
+"""
+import asyncio
+import logging
+import os
+from typing import Awaitable, Dict, Optional, TypeVar
+from fastapi import HTTPException, Request
+from app.cache.models import get_active_model_by_id_cached
+from app.database.connection import PostgresConnection
+from app.services.http_clients import get_async_openai_client
+from app.services.models import get_service_credentials
+
+logger = logging.getLogger(__name__)
+
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT") or 90)  # seconds per completion
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY") or 8)  # per service, override with LLM_MAX_CONCURRENCY_<SERVICE>
+DISCONNECT_POLL_INTERVAL = 0.5  # seconds
+
+T = TypeVar("T")
+
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def _get_semaphore(service: str) -> asyncio.Semaphore:
+    semaphore = _semaphores.get(service)
+    if semaphore is None:
+        limit = int(os.getenv(f"LLM_MAX_CONCURRENCY_{service.upper()}") or LLM_MAX_CONCURRENCY)
+        semaphore = asyncio.Semaphore(limit)
+        _semaphores[service] = semaphore
+    return semaphore
+
+
+async def chat_completion(
+    service: str,
+    model: str,
+    messages: list,
+    timeout: Optional[float] = None,
+    **params,
+) -> str:
+    """
+    Run one chat completion against `service` and return the reply text.
+    Raises asyncio.TimeoutError if the call (including waiting for a slot) exceeds `timeout`.
+    """
+    service = service.lower()
+    timeout = timeout or LLM_TIMEOUT
+    api_key, base_url = get_service_credentials(service)
+    client = get_async_openai_client(service, api_key, base_url)
+
+    async def _call():
+        async with _get_semaphore(service):
+            return await client.chat.completions.create(model=model, messages=messages, **params)
+
+    try:
+        response = await asyncio.wait_for(_call(), timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.error(f"[LLM] {service}/{model} timed out after {timeout}s")
+        raise
+
+    # Validate response structure before accessing
+    if not response.choices or not response.choices[0].message:
+        raise ValueError("Incomplete response received from LLM service.")
+
+    return response.choices[0].message.content
+
+
+def _lookup_model(model_id: str) -> dict:
+    with PostgresConnection() as conn:
+        return get_active_model_by_id_cached(conn, model_id)
+
+
+async def get_reply_from_model(model_id: str, chat: list[dict]) -> str:
+    """
+    Main entrypoint to retrieve a reply from the specified model.
+
+    Args:
+        model_id (str): The ID of the model to use.
+        chat (list[dict]): The chat history to use.
+        Example :
+            [
+                {"role": "system", "content": full_system_prompt},
+                {"role": "user", "content": user_message},
+            ]
+
+    Returns:
+        str: The raw reply from the model.
+    """
+    try:
+        model_data = await asyncio.to_thread(_lookup_model, model_id)
+        service = model_data["service"]
+        model_name = model_data["model_name"]
+        logger.info(
+            f"Retrieved model info: model_name={model_name}, service={service}"
+        )
+    except Exception as e:
+        logger.error(
+            f"Database error or model lookup failure for model_id {model_id}: {e}",
+            exc_info=True,
+        )
+        raise
+
+    try:
+        return await chat_completion(service, model_name, chat)
+    except Exception as e:
+        logger.error(
+            f"Error during chat completion call for model {model_name}: {e}",
+            exc_info=True,
+        )
+        raise
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    Await `awaitable` while watching the HTTP connection; if the client goes away first,
+    the work (and any in-flight completion inside it) is cancelled.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info(f"[LLM] Client disconnected from {request.url.path}, cancelling work")
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client closed request.")
+    finally:
+        if not task.done():
+            task.cancel()
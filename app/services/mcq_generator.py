@@ -10,7 +10,7 @@ from app.services.prompts import (
     MCQ_GEN_USER_PROMPT,
 )
 import json
-from app.services.models import get_reply_from_model
+from app.services.llm_gateway import get_reply_from_model
 from app.services.quiz_generator import clean_response_content
 from typing import List
 
@@ -64,7 +64,7 @@ async def generate_mcq_questions(
     )
 
     try:
-        raw_response = get_reply_from_model(
+        raw_response = await get_reply_from_model(
             model_id=model_id,
             chat=[
                 {"role": "system", "content": system_prompt},
@@ -1,8 +1,38 @@
-import os
-from app.services.extraction import extract_and_preprocess_text
-from app.services.chunking import chunk_text
+import asyncio
+import logging
+from app.services.extraction import iter_preprocessed_page_batches_async
+from app.services.chunking import chunk_text_stream_async
+from app.services.chunk_store import save_document_chunks
 from app.services.embeddings import embed_texts
-from app.services.vector_storage import store_embeddings_to_qdrant  # <-- new import
+from app.services.vector_storage import store_embeddings_to_qdrant
+
+logger = logging.getLogger(__name__)
+
+PAGES_PER_BATCH = 25  # Pages extracted and preprocessed together by one worker process
+MAX_BATCHES_IN_FLIGHT = 2  # Chunk batches buffered between extraction and embedding
+
+_END_OF_STREAM = object()
+
+
+async def _produce_chunk_batches(file_path: str, queue: asyncio.Queue) -> None:
+    """ Pages -> preprocessed text -> chunks, fed to the queue one bounded batch at a time """
+    preprocessed_batches = iter_preprocessed_page_batches_async(file_path, PAGES_PER_BATCH)
+    try:
+        chunk_batches = chunk_text_stream_async(
+            preprocessed_batches,
+            chunk_size=1500,
+            chunk_overlap=300,
+            max_chunks=2000
+        )
+        async for chunks in chunk_batches:
+            await queue.put(chunks)
+        await queue.put(_END_OF_STREAM)
+    except Exception as e:
+        await queue.put(e)
+    finally:
+        # Cancels the shards still queued in the extraction pool when the pipeline stops early
+        await preprocessed_batches.aclose()
+
 
 async def process_mcq_document(
     tmp_path: str,
@@ -11,13 +41,52 @@ async def process_mcq_document(
     doc_id: str,
     doc_type: str
 ) -> dict:
+    """
+    Streams a document through extraction, preprocessing, chunking, embedding and storage.
+    Extraction of the next page batch overlaps with embedding and upserting the current one,
+    so peak memory is bounded by the batch size rather than the size of the book.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=MAX_BATCHES_IN_FLIGHT)
+    producer = asyncio.create_task(_produce_chunk_batches(tmp_path, queue))
+
     try:
-        extension = os.path.splitext(filename)[1].lower()
+        total_chunks = 0
+        total_stored = 0
+        storage_result = None
 
-        # Step 1: Extract text from document
-        extracted_text = await extract_and_preprocess_text(tmp_path, extension)
+        while True:
+            chunks = await queue.get()
+            if chunks is _END_OF_STREAM:
+                break
+            if isinstance(chunks, Exception):
+                raise chunks
 
-        if not extracted_text or not extracted_text.strip():
+            # Step 1: Generate embeddings for this batch
+            embedded_data = await embed_texts(
+                chunks=chunks,
+                user_id=user_id,
+                doc_id=doc_id,
+                doc_type=doc_type,
+                start_index=total_chunks,
+            )
+            total_chunks += len(chunks)
+
+            if not embedded_data:
+                logger.warning(f"[MCQ Pipeline] No embeddings returned for batch ending at chunk {total_chunks} of {filename}")
+                continue
+
+            # Step 2: Store the chunk texts, then the vectors (a searchable point always has its text)
+            await asyncio.to_thread(save_document_chunks, embedded_data)
+
+            # Step 3: Store this batch in Qdrant
+            batch_result = await store_embeddings_to_qdrant(embedded_data)
+            if batch_result.get("status") != "success":
+                return {"storage_result": batch_result}
+
+            total_stored += batch_result["total_chunks_stored"]
+            storage_result = {**batch_result, "total_chunks_stored": total_stored}
+
+        if total_chunks == 0:
             return {
                 "extracted_text": None,
                 "chunks": [],
@@ -26,35 +95,18 @@ async def process_mcq_document(
                 "error": "No extractable text found. This PDF may be scanned or image-based. Consider OCR."
             }
 
-        # Step 2: Chunk the text
-        chunks = chunk_text(
-            extracted_text,
-            chunk_size=1500,
-            chunk_overlap=300,
-            max_chunks=2000
-        )
-
-        # Step 3: Generate embeddings
-        embedded_data = await embed_texts(
-            chunks=chunks,
-            user_id=user_id,
-            doc_id=doc_id,
-            doc_type=doc_type
-        )
-        if not embedded_data:
+        if not storage_result:
             return {
                 "error": "Embedding failed. No embeddings were returned."
             }
 
-        # Step 4: Store embeddings in Qdrant
-        storage_result = store_embeddings_to_qdrant(embedded_data)
-
-        # Step 5: Return useful info
-      # Step 5: Return storage result only, wrapped under key
+        # Step 4: Return storage result only, wrapped under key
         return {
             "storage_result": storage_result
         }
 
-
     except Exception as e:
         raise RuntimeError(f"[MCQ Pipeline] Failed: {str(e)}")
+    finally:
+        if not producer.done():
+            producer.cancel()
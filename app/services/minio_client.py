@@ -1,22 +1,76 @@
-from io import BytesIO
+"""
+MinIO access: one shared boto3 client and a local read-through disk cache.
+
+The boto3 client (thread-safe, with its own connection pool) is created once per process;
+MinIOClientContext hands out that client instead of building a new one on every use.
+
+Objects read through the cache are downloaded once into MINIO_CACHE_DIR, named after the
+s3_key and the object's ETag, so a changed object is never served stale. The directory is a
+size-bounded LRU (MINIO_CACHE_MAX_BYTES for the whole directory, shared by every worker
+process using it; 0 disables it). Reads verify the ETag with a HEAD,
+PyMuPDF opens cached PDFs from a memory map, and byte ranges of uncached objects are fetched
+with HTTP Range requests instead of downloading the whole object.
+"""
+import hashlib
 import logging
-import boto3
+import mmap
 import os
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from io import BytesIO
+from threading import Lock
+from typing import BinaryIO, Iterator, Optional, Tuple
 
-class MinIOClientContext:
-    def __init__(self):
-        self.endpoint = os.getenv("MINIO_ENDPOINT")
-        self.access_key = os.getenv("MINIO_ACCESS_KEY")
-        self.secret_key = os.getenv("MINIO_SECRET_KEY")
+import boto3
+import fitz
+from botocore.config import Config
+
+logger = logging.getLogger(__name__)
+
+MINIO_MAX_POOL_CONNECTIONS = int(os.getenv("MINIO_MAX_POOL_CONNECTIONS") or 32)
+MINIO_CONNECT_TIMEOUT = float(os.getenv("MINIO_CONNECT_TIMEOUT") or 5)  # seconds
+MINIO_READ_TIMEOUT = float(os.getenv("MINIO_READ_TIMEOUT") or 60)  # seconds
+MINIO_MAX_ATTEMPTS = int(os.getenv("MINIO_MAX_ATTEMPTS") or 3)
+MINIO_CACHE_DIR = os.getenv("MINIO_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "minio-cache")
+MINIO_CACHE_MAX_BYTES = int(os.getenv("MINIO_CACHE_MAX_BYTES") or 2 * 1024 ** 3)  # 0 disables the disk cache
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+# Temp files untouched for this long are left over from a crashed download, not in flight
+STALE_DOWNLOAD_SECONDS = 3600
 
+_client = None
+_client_lock = Lock()
+
+
+def get_minio_client():
+    """ The process-wide boto3 S3 client for MinIO, created on first use """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = boto3.session.Session().client(
+                    "s3",
+                    endpoint_url=os.getenv("MINIO_ENDPOINT"),
+                    aws_access_key_id=os.getenv("MINIO_ACCESS_KEY"),
+                    aws_secret_access_key=os.getenv("MINIO_SECRET_KEY"),
+                    region_name="us-east-1",
+                    config=Config(
+                        max_pool_connections=MINIO_MAX_POOL_CONNECTIONS,
+                        connect_timeout=MINIO_CONNECT_TIMEOUT,
+                        read_timeout=MINIO_READ_TIMEOUT,
+                        retries={"max_attempts": MINIO_MAX_ATTEMPTS, "mode": "standard"},
+                        tcp_keepalive=True,
+                    ),
+                )
+    return _client
+
+
+class MinIOClientContext:
     def __enter__(self):
-        self.client = boto3.client(
-            "s3",
-            endpoint_url=self.endpoint,
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
-            region_name="us-east-1"
-        )
+        self.client = get_minio_client()
         return self.client
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -25,26 +79,351 @@ class MinIOClientContext:
         return False
 
 
-def get_file_from_minio(client: MinIOClientContext, s3_key: str, bucket: str = os.getenv("MINIO_BUCKET_NAME")) -> BytesIO:
+class ObjectDiskCache:
+    """
+    LRU of whole objects on local disk. Files are named <sha(s3_key)>-<sha(etag)> so every
+    version of a key can be found (and purged) by its prefix. Readers keep an open file handle,
+    so eviction never cuts off a read.
+
+    Worker processes may share the directory, so the index is rebuilt from it on first use and
+    again on every download before evicting: max_bytes bounds the directory, not each process.
+    Reads touch the file's mtime, which keeps the LRU order shared across processes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # file name -> size, oldest first
+        self._size = 0
+        self._loaded = False
+        self._lock = Lock()
+        self._stats = {"hits": 0, "misses": 0, "range_reads": 0, "evictions": 0, "bytes_downloaded": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def _key_prefix(s3_key: str) -> str:
+        return hashlib.sha256(s3_key.encode("utf-8")).hexdigest()[:32]
+
+    def _file_name(self, s3_key: str, etag: str) -> str:
+        return f"{self._key_prefix(s3_key)}-{hashlib.sha256(etag.encode('utf-8')).hexdigest()[:16]}"
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _record(self, **counts: int) -> None:
+        with self._lock:
+            for name, count in counts.items():
+                self._stats[name] += count
+
+    def _scan(self) -> None:
+        """ Rebuilds the index from the directory (oldest modification first); caller holds the lock """
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        stale_before = time.time() - STALE_DOWNLOAD_SECONDS
+        for entry in os.scandir(self.directory):
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                if ".tmp-" in entry.name:
+                    # Fresh ones are in-flight downloads, possibly of another worker
+                    if stat.st_mtime < stale_before:
+                        os.remove(entry.path)
+                    continue
+            except FileNotFoundError:  # removed by another worker meanwhile
+                continue
+            found.append((stat.st_mtime, entry.name, stat.st_size))
+        self._entries.clear()
+        self._size = 0
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self._size += size
+
+    def _load(self) -> None:
+        """ First use: index the directory and trim it to max_bytes; caller holds the lock """
+        self._scan()
+        self._loaded = True
+        self._evict()
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """ Drops least recently used files until the cache fits; caller holds the lock """
+        while self._size > self.max_bytes and self._entries:
+            name = next(iter(self._entries))
+            if name == keep:
+                if len(self._entries) == 1:
+                    break
+                self._entries.move_to_end(name)
+                continue
+            self._drop(name)
+            self._stats["evictions"] += 1
+
+    def _drop(self, name: str) -> None:
+        self._size -= self._entries.pop(name, 0)
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            pass
+
+    def _open_cached(self, name: str) -> Optional[BinaryIO]:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        try:
+            f = open(self._path(name), "rb")
+        except FileNotFoundError:
+            # Removed behind our back (e.g. by another worker process sharing the directory)
+            with self._lock:
+                self._size -= self._entries.pop(name, 0)
+            return None
+        os.utime(f.fileno())  # keeps the LRU order across restarts
+        return f
+
+    def _download(self, client, bucket: str, s3_key: str, etag: str, name: str) -> BinaryIO:
+        path = self._path(name)
+        tmp_path = f"{path}.tmp-{uuid.uuid4().hex}"
+        size = 0
+        try:
+            # IfMatch pins the download to the version the HEAD saw
+            body = client.get_object(Bucket=bucket, Key=s3_key, IfMatch=etag)["Body"]
+            with open(tmp_path, "wb") as f:
+                for chunk in body.iter_chunks(STREAM_CHUNK_SIZE):
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        f = open(path, "rb")
+        prefix = self._key_prefix(s3_key)
+        with self._lock:
+            self._stats["misses"] += 1
+            self._stats["bytes_downloaded"] += size
+            # Picks up what other workers added or evicted, so the budget holds for the directory
+            self._scan()
+            self._loaded = True
+            if name in self._entries:
+                self._entries.move_to_end(name)
+            # Older versions of the same key are dead weight
+            for stale in [entry for entry in self._entries if entry.startswith(prefix) and entry != name]:
+                self._drop(stale)
+            self._evict(keep=name)
+        return f
+
+    def open(self, client, s3_key: str, bucket: str, etag: Optional[str] = None) -> Tuple[BinaryIO, int]:
+        """ Read-through: (open local file, size) of the current version of the object (pass a fresh etag to skip the HEAD) """
+        etag = etag or client.head_object(Bucket=bucket, Key=s3_key)["ETag"]
+        name = self._file_name(s3_key, etag)
+        f = self._open_cached(name)
+        if f is not None:
+            self._record(hits=1)
+        else:
+            f = self._download(client, bucket, s3_key, etag, name)
+        return f, os.fstat(f.fileno()).st_size
+
+    def open_if_cached(self, client, s3_key: str, bucket: str, etag: Optional[str] = None) -> Optional[BinaryIO]:
+        """ Local file of the current version of the object, without downloading it """
+        etag = etag or client.head_object(Bucket=bucket, Key=s3_key)["ETag"]
+        f = self._open_cached(self._file_name(s3_key, etag))
+        if f is not None:
+            self._record(hits=1)
+        return f
+
+    def purge(self, s3_key: str) -> None:
+        """ Removes every cached version of a key """
+        prefix = self._key_prefix(s3_key)
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            for name in [entry for entry in self._entries if entry.startswith(prefix)]:
+                self._drop(name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["size_bytes"] = self._size
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+object_cache = ObjectDiskCache(MINIO_CACHE_DIR, MINIO_CACHE_MAX_BYTES)
+
+
+def _iter_file(f: BinaryIO, length: Optional[int] = None) -> Iterator[bytes]:
+    """ Streams (up to length bytes of) an open file in chunks, then closes it """
+    try:
+        remaining = length
+        while remaining is None or remaining > 0:
+            chunk = f.read(STREAM_CHUNK_SIZE if remaining is None else min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def _iter_range_body(body) -> Iterator[bytes]:
+    """ Streams a ranged GET's body in chunks, counting the bytes fetched, then closes it """
+    size = 0
+    try:
+        for chunk in body.iter_chunks(STREAM_CHUNK_SIZE):
+            size += len(chunk)
+            yield chunk
+    finally:
+        body.close()
+        object_cache._record(bytes_downloaded=size)
+
+
+def get_object_range(
+    client, s3_key: str, start: int, end: int, bucket: str = os.getenv("MINIO_BUCKET_NAME"), etag: Optional[str] = None
+) -> Iterator[bytes]:
+    """
+    Chunks of bytes [start, end] (inclusive, like the HTTP Range header) fetched from MinIO
+    with a Range request, streamed rather than read whole (a range can be the entire book)
+    """
     try:
-        obj = client.get_object(Bucket=bucket, Key=s3_key)
-        return obj["Body"]
+        kwargs = {"IfMatch": etag} if etag else {}
+        obj = client.get_object(Bucket=bucket, Key=s3_key, Range=f"bytes={start}-{end}", **kwargs)
+    except Exception as e:
+        raise RuntimeError(f"MinIO range fetch failed: {e}")
+    object_cache._record(range_reads=1)
+    return _iter_range_body(obj["Body"])
+
+
+def get_file_from_minio(
+    client: MinIOClientContext,
+    s3_key: str,
+    bucket: str = os.getenv("MINIO_BUCKET_NAME"),
+    byte_range: Optional[Tuple[int, int]] = None,
+    etag: Optional[str] = None,
+) -> Iterator[bytes]:
+    """
+    Chunks of the object for streaming responses; byte_range=(start, end) limits it to those
+    (inclusive) bytes. Served from the disk cache; a range of an uncached object is fetched
+    with a Range request instead of downloading the whole object first. Callers that already
+    did a HEAD pass its etag to skip the cache's own.
+    """
+    try:
+        if not object_cache.enabled:
+            kwargs = {"Range": f"bytes={byte_range[0]}-{byte_range[1]}"} if byte_range else {}
+            if etag:
+                kwargs["IfMatch"] = etag
+            return client.get_object(Bucket=bucket, Key=s3_key, **kwargs)["Body"].iter_chunks(STREAM_CHUNK_SIZE)
+
+        if byte_range is None:
+            f, _ = object_cache.open(client, s3_key, bucket, etag)
+            return _iter_file(f)
+
+        start, end = byte_range
+        f = object_cache.open_if_cached(client, s3_key, bucket, etag)
+        if f is None:
+            return get_object_range(client, s3_key, start, end, bucket, etag)
+        f.seek(start)
+        return _iter_file(f, end - start + 1)
     except Exception as e:
         raise RuntimeError(f"MinIO fetch failed: {e}")
-    
-    
+
+
+def get_object_info(client: MinIOClientContext, s3_key: str, bucket: str = os.getenv("MINIO_BUCKET_NAME")) -> dict:
+    """ ETag, size, last modification time and content type of an object (one HEAD request) """
+    head = client.head_object(Bucket=bucket, Key=s3_key)
+    return {
+        "etag": head["ETag"],
+        "size": head["ContentLength"],
+        "last_modified": head.get("LastModified"),
+        "content_type": head.get("ContentType"),
+    }
+
+
+def get_presigned_url(
+    client: MinIOClientContext,
+    s3_key: str,
+    expires_in: int,
+    bucket: str = os.getenv("MINIO_BUCKET_NAME"),
+    content_type: Optional[str] = None,
+) -> str:
+    """ Time-limited GET URL of an object; MinIO serves Range and conditional requests on it itself """
+    params = {"Bucket": bucket, "Key": s3_key}
+    if content_type:
+        params["ResponseContentType"] = content_type
+    return client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires_in)
+
+
+def get_object_bytes_from_minio(client: MinIOClientContext, s3_key: str, bucket: str = os.getenv("MINIO_BUCKET_NAME")) -> bytes:
+    """ Whole object as bytes, read through the disk cache """
+    if not object_cache.enabled:
+        return client.get_object(Bucket=bucket, Key=s3_key)["Body"].read()
+    f, _ = object_cache.open(client, s3_key, bucket)
+    with f:
+        return f.read()
+
 
 def get_pdf_bytes_from_minio(client: MinIOClientContext, s3_key: str, bucket: str = os.getenv("MINIO_BUCKET_NAME")) -> BytesIO:
     """
     For internal PDF parsing (e.g. PyMuPDF). Returns BytesIO stream.
     """
     try:
-        obj = client.get_object(Bucket=bucket, Key=s3_key)
-        byte_stream = obj["Body"].read()  # read() returns full bytes
-        return BytesIO(byte_stream)
+        return BytesIO(get_object_bytes_from_minio(client, s3_key, bucket))
     except Exception as e:
         raise RuntimeError(f"MinIO PDF bytes fetch failed: {e}")
-    
+
+
+@contextmanager
+def open_pdf_from_minio(client: MinIOClientContext, s3_key: str, bucket: str = os.getenv("MINIO_BUCKET_NAME")):
+    """
+    (fitz.Document, size in bytes) of a PDF, opened on a memory map of the cached file so
+    pages are read from disk on demand. PyMuPDF does not pin the buffer it reads, so the
+    document is closed here, before the mapping is released; do not keep it past the block.
+    """
+    if not object_cache.enabled:
+        data = get_object_bytes_from_minio(client, s3_key, bucket)
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            yield doc, len(data)
+        return
+
+    f, size = object_cache.open(client, s3_key, bucket)
+    with f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        try:
+            doc = fitz.open(stream=view, filetype="pdf")
+            try:
+                yield doc, size
+            finally:
+                doc.close()
+        finally:
+            view.release()
+            mapped.close()
+
+
+def is_missing_object_error(error: Exception) -> bool:
+    """ True for the errors boto3 raises when the key does not exist (GET or HEAD) """
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return code in ("404", "NoSuchKey", "NotFound")
+
+
+def evict_cached_object(s3_key: str) -> None:
+    """ Drops a deleted object from the local disk cache """
+    try:
+        object_cache.purge(s3_key)
+    except Exception as e:
+        logger.warning(f"Failed to evict {s3_key} from the MinIO disk cache: {e}")
+
+
+def get_object_cache_stats() -> dict:
+    return object_cache.stats()
+
 
 async def save_file_to_minio(client: MinIOClientContext, tmp_path, s3_key: str, bucket: str = os.getenv("MINIO_BUCKET_NAME")):
     try:
@@ -52,4 +431,3 @@ async def save_file_to_minio(client: MinIOClientContext, tmp_path, s3_key: str,
     except Exception as e:
         import traceback; traceback.print_exc();
         raise RuntimeError(f"MinIO upload failed: {e}")
-    
\ No newline at end of file
@@ -3,9 +3,8 @@ import os
 from itertools import cycle
 from threading import Lock
 from openai import OpenAI
-from app.cache.models import get_active_model_by_id_cached
-from app.database.connection import PostgresConnection
 from app.services.constants import SERVICE_CONFIG
+from app.services.http_clients import get_openai_client
 
 
 logger = logging.getLogger(__name__)
@@ -49,96 +48,41 @@ def get_next_api_key(service: str):
         return next(_api_key_cycles[service_prefix])
 
 
-def get_client_for_service(service: str = "groq") -> OpenAI:
-    try:
-        config = SERVICE_CONFIG[service.lower()]
-        base_url = config["base_url"]
-        
-        if config.get("use_key_rotation", False):
-            api_key = get_next_api_key(service)
-            logger.info(f"Using {service.upper()} API key: {api_key} (from cycle)")
-        else:
-            api_key = os.getenv(config["api_key_env_var"])
-
-        if not api_key:
-            logger.critical(
-                f"API key for service {service} not found in environment variables."
-            )
-            raise ValueError(
-                f"API key for service {service} not found in environment variables."
-            )
-
-        client = OpenAI(
-            api_key=api_key,
-            base_url=base_url,
-        )
-        return client
-    except KeyError as e:
-        logger.error(
-            f"Service configuration for '{service}' is missing: {e}", exc_info=True
+def get_service_credentials(service: str = "groq") -> tuple[str, str]:
+    """Resolve (api_key, base_url) for a service, rotating keys where configured."""
+    config = SERVICE_CONFIG[service.lower()]
+    base_url = config["base_url"]
+
+    if config.get("use_key_rotation", False):
+        api_key = get_next_api_key(service)
+        logger.info(f"Using {service.upper()} API key: {api_key} (from cycle)")
+    else:
+        api_key = os.getenv(config["api_key_env_var"])
+
+    if not api_key:
+        logger.critical(
+            f"API key for service {service} not found in environment variables."
         )
-        raise
-    except Exception as e:
-        logger.error(
-            f"Error creating client for service '{service}': {e}", exc_info=True
+        raise ValueError(
+            f"API key for service {service} not found in environment variables."
         )
-        raise
 
-def get_reply_from_model(model_id: str, chat: list[str]) -> str:
-    """
-    Main entrypoint to retrieve a reply from the specified model.
-
-    Args:
-        model_id (str): The ID of the model to use.
-        chat (list[str]): The chat history to use.
-        Example :
-            [
-                {"role": "system", "content": full_system_prompt},
-                {"role": "user", "content": user_message},
-            ]
-        
-    Returns:
-        str: The raw reply from the model.
-    """
-    try:
-        with PostgresConnection() as conn:
-            model_data = get_active_model_by_id_cached(conn, model_id)
-            service = model_data["service"]
-            model_name = model_data["model_name"]
-            logger.info(
-                f"Retrieved model info: model_name={model_name}, service={service}"
-            )
-    except Exception as e:
-        logger.error(
-            f"Database error or model lookup failure for model_id {model_id}: {e}",
-            exc_info=True,
-        )
-        raise
+    return api_key, base_url
 
+
+def get_client_for_service(service: str = "groq") -> OpenAI:
     try:
-        # Dynamically get the client based on service
-        client = get_client_for_service(service)
-    except Exception as e:
+        api_key, base_url = get_service_credentials(service)
+
+        # Reuses the service's keep-alive connection pool instead of a fresh client per call
+        return get_openai_client(service.lower(), api_key, base_url)
+    except KeyError as e:
         logger.error(
-            f"Failed to create client for service {service}: {e}", exc_info=True
+            f"Service configuration for '{service}' is missing: {e}", exc_info=True
         )
         raise
-
-    try:
-
-        response = client.chat.completions.create(model=model_name, messages=chat)
-        # Validate response structure before accessing
-        if not response.choices or not response.choices[0].message:
-            raise ValueError("Incomplete response received from LLM service.")
-
-        reply = response.choices[0].message.content
-        return reply
     except Exception as e:
-        import traceback
-
-        traceback.print_exc()
         logger.error(
-            f"Error during chat completion call for model {model_name}: {e}",
-            exc_info=True,
+            f"Error creating client for service '{service}': {e}", exc_info=True
         )
         raise
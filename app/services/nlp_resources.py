@@ -0,0 +1,151 @@
+"""
+Process-wide NLTK resources for the extraction pipeline.
+
+Resources are located (and downloaded if missing) once, on first use, instead of as
+an import side effect, and the extended stopword set and tokenizers are built once
+per process and shared by every extraction call.
+"""
+import logging
+from functools import lru_cache
+from threading import Lock
+from typing import List
+import nltk
+from nltk.tokenize import NLTKWordTokenizer, PunktTokenizer
+
+logger = logging.getLogger(__name__)
+
+# nltk.data path -> downloadable package name
+NLTK_RESOURCES = {
+    "tokenizers/punkt": "punkt",
+    "tokenizers/punkt_tab": "punkt_tab",
+    "corpora/stopwords": "stopwords",
+}
+
+# Additional academic and technical stopwords
+ACADEMIC_STOPWORDS = frozenset(
+    {
+        "however",
+        "therefore",
+        "furthermore",
+        "moreover",
+        "nevertheless",
+        "consequently",
+        "subsequently",
+        "accordingly",
+        "hence",
+        "thus",
+        "particularly",
+        "specifically",
+        "generally",
+        "typically",
+        "usually",
+        "often",
+        "sometimes",
+        "always",
+        "never",
+        "also",
+        "additionally",
+        "besides",
+        "likewise",
+        "similarly",
+        "conversely",
+        "instead",
+        "although",
+        "though",
+        "whereas",
+        "since",
+        "due",
+        "regarding",
+        "concerning",
+        "according",
+        "based",
+        "given",
+        "shown",
+        "described",
+        "presented",
+        "discussed",
+        "mentioned",
+        "noted",
+        "observed",
+        "found",
+        "seen",
+        "used",
+        "applied",
+        "following",
+        "previous",
+        "next",
+        "various",
+        "different",
+        "several",
+        "many",
+        "numerous",
+        "multiple",
+        "certain",
+        "particular",
+        "important",
+        "significant",
+        "possible",
+        "likely",
+        "probably",
+        "perhaps",
+        "maybe",
+        "clearly",
+        "obviously",
+    }
+)
+
+_resources_lock = Lock()
+_resources_ready = False
+
+
+def ensure_nltk_resources() -> None:
+    """Locate required NLTK resources, downloading any that are missing. Runs once per process."""
+    global _resources_ready
+    if _resources_ready:
+        return
+
+    with _resources_lock:
+        if _resources_ready:
+            return
+
+        for resource_path, package in NLTK_RESOURCES.items():
+            try:
+                nltk.data.find(resource_path)
+            except LookupError:
+                logger.info(f"Downloading NLTK resource: {package}")
+                nltk.download(package, quiet=True)
+
+        _resources_ready = True
+
+
+@lru_cache(maxsize=1)
+def get_extended_stopwords() -> frozenset:
+    """Comprehensive stopword set: NLTK English stopwords plus academic terms."""
+    ensure_nltk_resources()
+    from nltk.corpus import stopwords
+
+    return frozenset(stopwords.words("english")) | ACADEMIC_STOPWORDS
+
+
+@lru_cache(maxsize=1)
+def get_sentence_tokenizer() -> PunktTokenizer:
+    """Shared English Punkt sentence tokenizer."""
+    ensure_nltk_resources()
+    return PunktTokenizer("english")
+
+
+@lru_cache(maxsize=1)
+def get_word_tokenizer() -> NLTKWordTokenizer:
+    """Shared Treebank-style word tokenizer."""
+    return NLTKWordTokenizer()
+
+
+def sent_tokenize(text: str) -> List[str]:
+    """Same output as nltk.sent_tokenize(text) using the shared tokenizer."""
+    return get_sentence_tokenizer().tokenize(text)
+
+
+def word_tokenize(text: str) -> List[str]:
+    """Same output as nltk.word_tokenize(text) using the shared tokenizers."""
+    word_tokenizer = get_word_tokenizer()
+    return [token for sentence in sent_tokenize(text) for token in word_tokenizer.tokenize(sentence)]
@@ -1,8 +1,12 @@
+import asyncio
 import logging
 import os
+from app.cache.page_text import warm_page_text_cache
 from app.database.connection import PostgresConnection
 from app.database.notes_queries import create_note_query
 from app.services.minio_client import MinIOClientContext, save_file_to_minio
+from app.services.page_artifact import create_page_artifact
+from app.services.pdf_optimizer import optimize_pdf_file, save_pdf_optimization
 from app.services.pdf_converter import convert_to_pdf
 
 logger = logging.getLogger(__name__)
@@ -19,11 +23,21 @@ async def process_uploaded_notes(tmp_path: str, original_filename: str, user_id:
         pdf_filename = os.path.basename(pdf_path)
         s3_key = f"user_uploads/{user_id}/{pdf_filename}"
 
+        # Store a smaller, garbage-collected PDF so viewers fetch less before page 1
+        optimization = await asyncio.to_thread(optimize_pdf_file, pdf_path)
+
         with MinIOClientContext() as s3:
             await save_file_to_minio(s3, pdf_path, s3_key)
+            # Parse the PDF once: TOC, MCQ ingestion and study-mode chat read this artifact
+            artifact = await asyncio.to_thread(create_page_artifact, s3, pdf_path, s3_key, tmp_path)
+
+        # Study-mode chat reads pages from this cache instead of downloading the PDF
+        if artifact:
+            await asyncio.to_thread(warm_page_text_cache, artifact, s3_key)
 
 
-        with PostgresConnection() as conn:
+        async with PostgresConnection() as conn:
+            save_pdf_optimization(conn, s3_key, optimization)
             note_id = create_note_query(
                 conn=conn,
                 user_id=user_id,
@@ -0,0 +1,200 @@
+"""
+Per-document page artifact, built once at upload and stored next to the PDF.
+
+Downstream consumers (study-mode page text, TOC extraction, MCQ ingestion) read pages from
+the artifact instead of reopening the PDF with PyMuPDF. Layout:
+
+    MAGIC | uint32 header length | header JSON | page blobs
+
+The header holds the page count, the source PDF size, the outline ([level, title, page])
+and one [offset, length, image_count] entry per page. Each page blob is the zlib-compressed
+UTF-8 text of that page, so a single page can be read (or range-fetched) on its own.
+"""
+import json
+import logging
+import os
+import struct
+import zlib
+from typing import List, Optional
+
+import fitz
+
+from app.services.minio_client import evict_cached_object, get_object_bytes_from_minio, is_missing_object_error
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_MAGIC = b"PGART1\n"
+ARTIFACT_SUFFIX = ".pages"
+_HEADER_LENGTH = struct.Struct("<I")
+
+
+def page_artifact_key(s3_key: str) -> str:
+    """ MinIO key of the artifact of the PDF stored at s3_key """
+    return f"{s3_key}{ARTIFACT_SUFFIX}"
+
+
+def local_page_artifact_path(upload_path: str) -> str:
+    """ Where the upload pipeline keeps the artifact of a temp upload while it is processed """
+    return f"{upload_path}{ARTIFACT_SUFFIX}"
+
+
+class PageArtifact:
+    """ Random access to the pages of a serialized artifact """
+
+    def __init__(self, data: bytes) -> None:
+        if not data.startswith(ARTIFACT_MAGIC):
+            raise ValueError("Not a page artifact")
+        start = len(ARTIFACT_MAGIC)
+        (header_length,) = _HEADER_LENGTH.unpack_from(data, start)
+        start += _HEADER_LENGTH.size
+        self._header = json.loads(data[start:start + header_length])
+        self._body = memoryview(data)[start + header_length:]
+        self.size = len(data)
+
+    @property
+    def page_count(self) -> int:
+        return self._header["page_count"]
+
+    @property
+    def pdf_bytes(self) -> int:
+        return self._header["pdf_bytes"]
+
+    @property
+    def outline(self) -> List[list]:
+        return self._header["outline"]
+
+    def page_text(self, page_index: int) -> str:
+        """ Raw text of one page (0-based) """
+        if page_index < 0 or page_index >= self.page_count:
+            raise ValueError(f"Page number {page_index} out of bounds.")
+        offset, length, _ = self._header["pages"][page_index]
+        return zlib.decompress(self._body[offset:offset + length]).decode("utf-8")
+
+    def image_count(self, page_index: int) -> int:
+        return self._header["pages"][page_index][2]
+
+    def text_range(self, start: int, end: int) -> str:
+        """ Concatenated raw text of pages [start, end), as PyMuPDF would return it """
+        return "".join(self.page_text(page_index) for page_index in range(start, end))
+
+
+def build_page_artifact(doc: "fitz.Document", pdf_bytes: int) -> bytes:
+    blobs = []
+    pages = []
+    offset = 0
+    for page in doc:
+        blob = zlib.compress(page.get_text().encode("utf-8"), 6)
+        pages.append([offset, len(blob), len(page.get_images(full=False))])
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = json.dumps(
+        {
+            "version": 1,
+            "page_count": len(pages),
+            "pdf_bytes": pdf_bytes,
+            "outline": [[level, title, page] for level, title, page in doc.get_toc(simple=True)],
+            "pages": pages,
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+    return b"".join([ARTIFACT_MAGIC, _HEADER_LENGTH.pack(len(header)), header, *blobs])
+
+
+def build_page_artifact_from_file(pdf_path: str) -> bytes:
+    with fitz.open(pdf_path) as doc:
+        return build_page_artifact(doc, os.path.getsize(pdf_path))
+
+
+def build_page_artifact_from_bytes(pdf_bytes: bytes) -> bytes:
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return build_page_artifact(doc, len(pdf_bytes))
+
+
+def create_page_artifact(s3, pdf_path: str, s3_key: str, upload_path: str) -> Optional[PageArtifact]:
+    """
+    Upload stage: parses the PDF once, stores the artifact next to it in MinIO and keeps a
+    local copy for the rest of the upload pipeline. Failures only cost the fast path.
+    """
+    try:
+        data = build_page_artifact_from_file(pdf_path)
+        with open(local_page_artifact_path(upload_path), "wb") as f:
+            f.write(data)
+        store_page_artifact(s3, s3_key, data)
+        artifact = PageArtifact(data)
+        logger.info(f"Stored page artifact for {s3_key}: {artifact.page_count} pages, {len(data)} bytes")
+        return artifact
+    except Exception as e:
+        logger.error(f"Failed to create page artifact for {s3_key}: {e}")
+        return None
+
+
+def _read_header(f) -> Optional[dict]:
+    if f.read(len(ARTIFACT_MAGIC)) != ARTIFACT_MAGIC:
+        return None
+    (header_length,) = _HEADER_LENGTH.unpack(f.read(_HEADER_LENGTH.size))
+    return json.loads(f.read(header_length))
+
+
+def read_local_page_count(upload_path: str) -> Optional[int]:
+    """ Page count from an upload's local artifact, or None if the upload has no artifact """
+    path = local_page_artifact_path(upload_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        header = _read_header(f)
+    return header["page_count"] if header else None
+
+
+def read_local_page_range(upload_path: str, start: int, end: int) -> Optional[str]:
+    """
+    Raw text of pages [start, end) from an upload's local artifact, reading only the header
+    and those pages' blobs. None if the upload has no artifact.
+    """
+    path = local_page_artifact_path(upload_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        header = _read_header(f)
+        if header is None:
+            logger.warning(f"Ignoring unreadable page artifact {path}")
+            return None
+        body_start = f.tell()
+
+        if start < 0 or end > header["page_count"]:
+            raise ValueError(f"Pages {start}-{end} out of bounds.")
+        texts = []
+        for offset, length, _ in header["pages"][start:end]:
+            f.seek(body_start + offset)
+            texts.append(zlib.decompress(f.read(length)).decode("utf-8"))
+        return "".join(texts)
+
+
+def remove_local_page_artifact(upload_path: str) -> None:
+    try:
+        os.remove(local_page_artifact_path(upload_path))
+    except FileNotFoundError:
+        pass
+
+
+def load_page_artifact(s3, s3_key: str) -> Optional[PageArtifact]:
+    """ The stored artifact of a PDF (read through the disk cache), or None for documents uploaded before artifacts existed """
+    try:
+        return PageArtifact(get_object_bytes_from_minio(s3, page_artifact_key(s3_key)))
+    except Exception as e:
+        if is_missing_object_error(e):
+            return None
+        logger.warning(f"Failed to load page artifact for {s3_key}: {e}")
+        return None
+
+
+def store_page_artifact(s3, s3_key: str, data: bytes) -> None:
+    s3.put_object(Bucket=os.getenv("MINIO_BUCKET_NAME"), Key=page_artifact_key(s3_key), Body=data)
+
+
+def delete_page_artifact(s3, s3_key: str) -> None:
+    try:
+        s3.delete_object(Bucket=os.getenv("MINIO_BUCKET_NAME"), Key=page_artifact_key(s3_key))
+        evict_cached_object(page_artifact_key(s3_key))
+    except Exception as e:
+        logger.warning(f"Failed to delete page artifact for {s3_key}: {e}")
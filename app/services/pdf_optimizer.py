@@ -0,0 +1,122 @@
+"""
+Upload post-processing that rewrites PDFs into a smaller, stream-friendly form before they
+are stored: unused and duplicate objects are dropped (garbage=4), streams are deflated and
+small objects are packed into object streams. Image recompression is optional. With
+PDF_LINEARIZE the result is also linearized, if the installed MuPDF still supports it (newer
+releases dropped linearization; support is probed once at import); either way the stream endpoint serves Range requests, so viewers can fetch page 1 first.
+The optimized file only replaces the original when it is smaller.
+"""
+import logging
+import os
+import uuid
+from typing import Optional, Tuple
+
+import fitz
+
+from app.database.pdf_optimization_queries import record_pdf_optimization
+
+logger = logging.getLogger(__name__)
+
+PDF_OPTIMIZE_ON_UPLOAD = (os.getenv("PDF_OPTIMIZE_ON_UPLOAD") or "true").lower() == "true"
+PDF_LINEARIZE = (os.getenv("PDF_LINEARIZE") or "false").lower() == "true"
+PDF_RECOMPRESS_IMAGES = (os.getenv("PDF_RECOMPRESS_IMAGES") or "false").lower() == "true"
+PDF_IMAGE_DPI_THRESHOLD = int(os.getenv("PDF_IMAGE_DPI_THRESHOLD") or 200)  # only images above this DPI
+PDF_IMAGE_DPI_TARGET = int(os.getenv("PDF_IMAGE_DPI_TARGET") or 150)
+PDF_IMAGE_QUALITY = int(os.getenv("PDF_IMAGE_QUALITY") or 75)  # JPEG quality, 0-100
+
+_SAVE_OPTIONS = dict(garbage=4, deflate=True, deflate_images=True, deflate_fonts=True, use_objstms=1)
+_LINEAR_SAVE_OPTIONS = dict(_SAVE_OPTIONS, linear=True, use_objstms=0)
+
+
+def _linearization_supported() -> bool:
+    """ Probes the installed MuPDF once with a one-page document """
+    try:
+        with fitz.open() as doc:
+            doc.new_page()
+            doc.tobytes(**_LINEAR_SAVE_OPTIONS)
+        return True
+    except Exception as e:
+        logger.warning(f"PDF_LINEARIZE is set but this MuPDF cannot linearize ({e}); PDFs are saved without it")
+        return False
+
+
+_LINEARIZE = PDF_LINEARIZE and _linearization_supported()
+
+
+def _save(doc: "fitz.Document") -> Tuple[bytes, bool]:
+    """ (optimized bytes, whether they are linearized) """
+    if _LINEARIZE:
+        try:
+            return doc.tobytes(**_LINEAR_SAVE_OPTIONS), True
+        except Exception as e:
+            logger.warning(f"PDF linearization failed, saving without it: {e}")
+    return doc.tobytes(**_SAVE_OPTIONS), False
+
+
+def optimize_pdf_bytes(pdf_bytes: bytes) -> Optional[Tuple[bytes, dict]]:
+    """
+    (bytes to store, stats) for a PDF; the original bytes are kept when optimizing does not
+    shrink them. None for files that are left alone (encrypted or unreadable).
+    """
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        if doc.needs_pass or doc.is_encrypted:
+            return None
+        if PDF_RECOMPRESS_IMAGES:
+            doc.rewrite_images(
+                dpi_threshold=PDF_IMAGE_DPI_THRESHOLD,
+                dpi_target=PDF_IMAGE_DPI_TARGET,
+                quality=PDF_IMAGE_QUALITY,
+            )
+        optimized, linearized = _save(doc)
+
+    if len(optimized) >= len(pdf_bytes):
+        optimized, linearized = pdf_bytes, False
+    return optimized, {
+        "original_bytes": len(pdf_bytes),
+        "stored_bytes": len(optimized),
+        "linearized": linearized,
+    }
+
+
+def optimize_pdf_file(pdf_path: str) -> Optional[dict]:
+    """
+    Upload stage: rewrites the PDF at pdf_path in place before it is stored. Returns the size
+    stats to record, or None when optimization is disabled or failed (the upload continues
+    with the file as it was).
+    """
+    if not PDF_OPTIMIZE_ON_UPLOAD:
+        return None
+    try:
+        with open(pdf_path, "rb") as f:
+            pdf_bytes = f.read()
+        result = optimize_pdf_bytes(pdf_bytes)
+        if result is None:
+            return None
+
+        optimized, stats = result
+        if optimized is not pdf_bytes:
+            tmp_path = f"{pdf_path}.opt-{uuid.uuid4().hex}"
+            with open(tmp_path, "wb") as f:
+                f.write(optimized)
+            os.replace(tmp_path, pdf_path)
+
+        saved = stats["original_bytes"] - stats["stored_bytes"]
+        logger.info(
+            f"Optimized {os.path.basename(pdf_path)}: {stats['original_bytes']} -> {stats['stored_bytes']} bytes "
+            f"({saved} saved, linearized={stats['linearized']})"
+        )
+        return stats
+    except Exception as e:
+        logger.error(f"Failed to optimize PDF {pdf_path}: {e}")
+        return None
+
+
+def save_pdf_optimization(conn, s3_key: str, stats: Optional[dict]) -> None:
+    """ Records the size savings of an upload; never fails the upload """
+    if not stats:
+        return
+    try:
+        record_pdf_optimization(conn, s3_key, **stats)
+    except Exception as e:
+        conn.rollback()
+        logger.warning(f"Failed to record PDF optimization for {s3_key}: {e}")
@@ -2,7 +2,7 @@ import logging
 from typing import List
 from app.schemas.learning_profile import RatingAnswer, MCQAnswer
 from app.services.constants import LLAMA_3_70b
-from app.services.models import get_client_for_service
+from app.services.llm_gateway import chat_completion
 from app.services.prompts import (
     get_learniing_style_prompt,
     LEARNING_PROFILE_SYSTEM_PROMPT,
@@ -33,9 +33,8 @@ async def generate_learning_profile_description(
             behavioral_prefs=behavioral,
         )
 
-        client = get_client_for_service() # TODO ADD service var when implemented
-
-        response = client.chat.completions.create(
+        reply = await chat_completion(
+            "groq", # TODO ADD service var when implemented
             model= LLAMA_3_70b, # TODO which ever model is best for this choose that
             messages=[
                 {"role": "system", "content": LEARNING_PROFILE_SYSTEM_PROMPT},
@@ -44,7 +43,7 @@ async def generate_learning_profile_description(
             temperature=0.5,
         )
 
-        return response.choices[0].message.content.strip()
+        return reply.strip()
 
     except Exception as e:
         logger.error(f"[Learning Profile] Failed to generate description: {str(e)}")
@@ -0,0 +1,80 @@
+"""
+Application-lifetime Qdrant clients.
+
+Request handlers use one shared AsyncQdrantClient so vector searches and upserts
+never block the event loop. The async client's gRPC channel binds to the loop that
+first uses it, so it is opened on startup (or lazily inside the loop) and closed on
+shutdown. The synchronous client stays available for scripts and sync helpers.
+"""
+import logging
+import os
+from threading import Lock
+from typing import Optional
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+logger = logging.getLogger(__name__)
+
+QDRANT_URL = os.getenv("QDRANT_URL")
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+QDRANT_TIMEOUT = float(os.getenv("QDRANT_TIMEOUT") or 30)  # seconds
+QDRANT_PREFER_GRPC = (os.getenv("QDRANT_PREFER_GRPC") or "true").lower() == "true"
+
+GRPC_OPTIONS = {
+    "grpc.keepalive_time_ms": 30000,
+    "grpc.keepalive_timeout_ms": 5000,
+    "grpc.http2.max_pings_without_data": 0,
+    "grpc.http2.min_time_between_pings_ms": 10000,
+    "grpc.http2.min_ping_interval_without_data_ms": 300000,
+}
+
+_sync_client: Optional[QdrantClient] = None
+_async_client: Optional[AsyncQdrantClient] = None
+_lock = Lock()
+
+
+def _client_kwargs() -> dict:
+    return {
+        "url": QDRANT_URL,
+        "api_key": QDRANT_API_KEY,
+        "timeout": QDRANT_TIMEOUT,
+        "prefer_grpc": QDRANT_PREFER_GRPC,
+        "grpc_options": GRPC_OPTIONS,
+    }
+
+
+def get_qdrant_client() -> QdrantClient:
+    """ Shared synchronous client, for scripts and code running outside the event loop """
+    global _sync_client
+    with _lock:
+        if _sync_client is None:
+            _sync_client = QdrantClient(**_client_kwargs())
+        return _sync_client
+
+
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """ Shared async client for request handlers; must be used from the running event loop """
+    global _async_client
+    with _lock:
+        if _async_client is None:
+            _async_client = AsyncQdrantClient(**_client_kwargs())
+            logger.info("[Qdrant] Opened async client")
+        return _async_client
+
+
+async def open_qdrant_clients() -> None:
+    """ Opens the async client on the application's loop so the first search doesn't pay for it """
+    get_async_qdrant_client()
+
+
+async def close_qdrant_clients() -> None:
+    """ Closes the async client; the sync client lives for the whole process """
+    global _async_client
+    with _lock:
+        async_client, _async_client = _async_client, None
+
+    if async_client is not None:
+        try:
+            await async_client.close()
+            logger.info("[Qdrant] Closed async client")
+        except Exception as e:
+            logger.warning(f"[Qdrant] Failed to close async client: {e}")
@@ -1,10 +1,19 @@
 # app/services/query_expansion.py
 
+import asyncio
+from app.cache.query_results import (
+    QUERY_CACHE_ENABLED,
+    QUERY_CACHE_USES_EMBEDDING,
+    cache_query_result,
+    get_cached_query_result,
+    get_library_version,
+)
+from app.services.chunk_store import hydrate_chunk_texts
 from app.services.constants import DEFAULT_MODEL_ID
 from app.services.prompts import EXPANSION_SYSTEM_PROMPT
 from app.services.embeddings import embed_single_text  # Your existing embedding logic
 from app.services.vector_search import search_similar_chunks  # You already have this
-from app.services.models import get_reply_from_model  
+from app.services.llm_gateway import get_reply_from_model
 from typing import Optional
 import logging
 from typing import Optional,List,Union
@@ -34,6 +43,20 @@ async def expand_user_query_and_search(
     """
 
     try:
+        # Repeated (or near-identical) questions skip expansion, embedding and search
+        params = {"model_id": model_id, "top_k": top_k, "doc_ids": doc_ids}
+        if QUERY_CACHE_ENABLED:
+            version, query_embedding = await asyncio.gather(
+                asyncio.to_thread(get_library_version, user_id),
+                embed_single_text(user_query) if QUERY_CACHE_USES_EMBEDDING else asyncio.sleep(0),
+            )
+            cached, cache_info = await asyncio.to_thread(
+                get_cached_query_result, "retrieval", user_id, version, user_query, params, query_embedding
+            )
+            if cached is not None:
+                logger.info(f"Retrieval for user {user_id} served from cache ({cache_info['cache']})")
+                return cached
+
         # Build the message payload for the model
         chat = [
             {"role": "system", "content": EXPANSION_SYSTEM_PROMPT},
@@ -41,7 +64,7 @@ async def expand_user_query_and_search(
         ]
 
         # Step 1: Query Expansion
-        expanded_query = get_reply_from_model(model_id=model_id, chat=chat)
+        expanded_query = await get_reply_from_model(model_id=model_id, chat=chat)
         logger.info(f"Expanded Query: {expanded_query}")
                   
         # Step 2: Embed Expanded Query
@@ -55,10 +78,17 @@ async def expand_user_query_and_search(
             embedded_query=embedded_query,
             user_id=user_id,
             top_k=top_k,
-            doc_ids=doc_ids
+            doc_ids=doc_ids,
+            query_text=expanded_query,
         )
 
-        return search_results
+        # Step 4: Fetch the texts of the matched chunks
+        chunks = await asyncio.to_thread(hydrate_chunk_texts, search_results)
+        if chunks and QUERY_CACHE_ENABLED:
+            await asyncio.to_thread(
+                cache_query_result, "retrieval", user_id, version, user_query, params, chunks, query_embedding
+            )
+        return chunks
 
     except Exception as e:
         logger.error(f"Error in expand_user_query_and_search: {e}", exc_info=True)
@@ -4,7 +4,7 @@ from typing import List
 from pydantic import ValidationError
 from app.schemas.quiz import QuizQuestion
 from app.services.constants import KIMI_K2_INSTRUCT_ID
-from app.services.models import get_reply_from_model
+from app.services.llm_gateway import get_reply_from_model
 from app.services.prompts import QUIZ_GENERATION_SYSTEM_PROMPT, QUIZ_GENERATION_USER_PROMPT
 
 logger = logging.getLogger(__name__)
@@ -61,7 +61,7 @@ async def generate_quiz_questions(
     )
 
     try:
-        raw_response = get_reply_from_model(
+        raw_response = await get_reply_from_model(
             model_id=model_id,
             chat=[
                 {"role": "system", "content": QUIZ_GENERATION_SYSTEM_PROMPT},
@@ -1,83 +1,196 @@
 from typing import List, Dict, Optional
+import asyncio
 import logging
-from app.services.vector_search import search_similar_chunks
-from app.services.embeddings import embed_single_text
+import os
+import time
+from app.services.vector_search import (
+    search_similar_chunks,
+    search_similar_chunks_batch,
+    supports_hybrid_search,
+)
+from app.cache.query_results import (
+    QUERY_CACHE_ENABLED,
+    QUERY_CACHE_USES_EMBEDDING,
+    cache_query_result,
+    get_cached_query_result,
+    get_library_version,
+)
+from app.services.chunk_store import hydrate_chunk_texts
+from app.services.embeddings import embed_query_texts, embed_single_text
 from app.database.library_queries import get_documents_metadata_by_ids
 from app.database.connection import PostgresConnection
-from app.services.models import get_client_for_service
+from app.services.llm_gateway import chat_completion
 from app.services.constants import LLAMA_3_70b
 from app.services.prompts import RAG_SYSTEM_PROMPT, ASK_MY_LIBRARY_USER_PROMPT
 import json
 
 logger = logging.getLogger(__name__)
 
+RAG_SEARCH_LATENCY_BUDGET = float(os.getenv("RAG_SEARCH_LATENCY_BUDGET") or 2.0)  # seconds for secondary strategies
+RAG_ANSWER_FALLBACK = "I found relevant information but couldn't generate a proper response. Please try rephrasing your question."
+
+
+def plan_search_strategies(query: str, max_chunks: int, include_key_terms: bool = True) -> List[Dict]:
+    """
+    Decide every search to run for a query before any of them starts:
+    the full query, up to two "and" sub-queries and up to three key terms.
+    Key-term searches are skipped when the collection has a BM25 leg, which already
+    covers exact-term recall inside the fused full-query search (its top lexical hits are
+    exempt from the cosine score thresholds, see _passes_score_threshold).
+    """
+    strategies = [{"name": "full_query", "text": query, "top_k": max_chunks}]
+
+    # Split query by "and" and search separately
+    if " and " in query.lower():
+        sub_queries = [q.strip() for q in query.lower().split(" and ") if q.strip()]
+        for sub_query in sub_queries[:2]:  # Limit to 2 sub-queries
+            strategies.append(
+                {
+                    "name": "sub_query",
+                    "text": sub_query,
+                    "top_k": max_chunks // 2,  # Fewer per sub-query
+                    "tag": ("sub_query", sub_query),
+                }
+            )
+
+    # Extract key terms and search
+    key_terms = extract_key_terms(query)[:3] if include_key_terms else []
+    for term in key_terms:  # Top 3 key terms
+        strategies.append(
+            {"name": "key_term", "text": term, "top_k": 5, "tag": ("key_term", term)}
+        )
+
+    return strategies
+
+
+async def _timed_search(strategy: Dict, embedding: List[float], user_id: str) -> tuple:
+    started = time.perf_counter()
+    chunks = await search_similar_chunks(
+        embedded_query=embedding, user_id=user_id, top_k=strategy["top_k"], query_text=strategy["text"]
+    )
+    return [chunks], time.perf_counter() - started
+
+
+async def _timed_batch_search(strategies: List[Dict], embeddings: List[List[float]], user_id: str) -> tuple:
+    started = time.perf_counter()
+    chunk_lists = await search_similar_chunks_batch(
+        embedded_queries=embeddings,
+        user_id=user_id,
+        top_k=[strategy["top_k"] for strategy in strategies],
+        query_texts=[strategy["text"] for strategy in strategies],
+    )
+    return chunk_lists, time.perf_counter() - started
+
 
 async def multi_strategy_search(
-    query: str, user_id: str, max_chunks: int
+    query: str, user_id: str, max_chunks: int, debug: Optional[Dict] = None
 ) -> List[Dict]:
     """
-    Use multiple search strategies to find diverse results across different documents
+    Use multiple search strategies to find diverse results across different documents.
+
+    All strategy texts are embedded in one batch. The full-query search and a single batched
+    search for the secondary strategies run concurrently; if the secondary batch has not
+    returned after RAG_SEARCH_LATENCY_BUDGET it is dropped, the full-query search is always
+    awaited. Per-strategy timings are written into `debug`.
     """
+    debug = debug if debug is not None else {}
     try:
+        started = time.perf_counter()
+        hybrid = await supports_hybrid_search(user_id)
+        strategies = plan_search_strategies(query, max_chunks, include_key_terms=not hybrid)
+        logger.info(f"Planned {len(strategies)} search strategies: {[s['text'] for s in strategies]}")
+
+        embeddings = await embed_query_texts([strategy["text"] for strategy in strategies])
+        embed_seconds = time.perf_counter() - started
+
+        primary_index = 0  # plan_search_strategies always puts the full query first
+        secondary_indices = [
+            i for i, embedding in enumerate(embeddings) if embedding and i != primary_index
+        ]
+
+        # (strategy indices, task) per search call
+        searches = []
+        if embeddings[primary_index]:
+            searches.append(
+                ([primary_index], asyncio.ensure_future(
+                    _timed_search(strategies[primary_index], embeddings[primary_index], user_id)
+                ))
+            )
+        if secondary_indices:
+            searches.append(
+                (secondary_indices, asyncio.ensure_future(
+                    _timed_batch_search(
+                        [strategies[i] for i in secondary_indices],
+                        [embeddings[i] for i in secondary_indices],
+                        user_id,
+                    )
+                ))
+            )
+
+        pending = set()
+        if searches:
+            tasks = {task for _, task in searches}
+            _, pending = await asyncio.wait(tasks, timeout=RAG_SEARCH_LATENCY_BUDGET)
+            primary_task = searches[0][1] if searches[0][0] == [primary_index] else None
+            if primary_task in pending:
+                await asyncio.wait({primary_task})
+                pending.discard(primary_task)
+            for task in pending:
+                task.cancel()
+
+        # Strategy index -> (status, chunks, seconds)
+        outcomes = {}
+        for indices, task in searches:
+            if task in pending:
+                outcome = ("dropped_over_budget", None, None)
+                outcomes.update((i, outcome) for i in indices)
+            elif task.exception() is not None:
+                logger.error(f"Search for strategies {indices} failed: {task.exception()}")
+                outcomes.update((i, ("failed", None, None)) for i in indices)
+            else:
+                chunk_lists, seconds = task.result()
+                for i, chunks in zip(indices, chunk_lists):
+                    outcomes[i] = ("ok", chunks, seconds)
+
         all_chunks = []
         chunk_ids_seen = set()
+        strategy_debug = []
+        # Strategies are merged in plan order so the full query keeps priority on duplicates
+        for i, strategy in enumerate(strategies):
+            info = {"strategy": strategy["name"], "text": strategy["text"], "top_k": strategy["top_k"]}
+            strategy_debug.append(info)
+
+            status, chunks, seconds = outcomes.get(i, ("embedding_failed", None, None))
+            info["status"] = status
+            if status != "ok":
+                continue
 
-        # Full query search
-        logger.info("Strategy 1: Full query search")
-        full_query_embedding = await embed_single_text(query)
-        if full_query_embedding:
-            chunks1 = await search_similar_chunks(
-                embedded_query=full_query_embedding, user_id=user_id, top_k=max_chunks
-            )
-            for chunk in chunks1:
+            # Secondary strategies share one batched call, so they share its timing
+            info.update(search_ms=round(seconds * 1000, 1), results=len(chunks))
+            for chunk in chunks:
                 chunk_id = f"{chunk.get('doc_id')}_{chunk.get('chunk_index')}"
                 if chunk_id not in chunk_ids_seen:
                     chunk_ids_seen.add(chunk_id)
+                    if "tag" in strategy:
+                        # Add sub-query / key term info for debugging
+                        key, value = strategy["tag"]
+                        chunk[key] = value
                     all_chunks.append(chunk)
 
-        # Split query by "and" and search separately
-        if " and " in query.lower():
-            logger.info("Strategy 2: Split query by 'and'")
-            sub_queries = [q.strip() for q in query.lower().split(" and ") if q.strip()]
-
-            for i, sub_query in enumerate(sub_queries[:2]):  # Limit to 2 sub-queries
-                logger.info(f"Sub-query {i+1}: '{sub_query}'")
-                sub_embedding = await embed_single_text(sub_query)
-                if sub_embedding:
-                    sub_chunks = await search_similar_chunks(
-                        embedded_query=sub_embedding,
-                        user_id=user_id,
-                        top_k=max_chunks // 2,  # Fewer per sub-query
-                    )
-                    for chunk in sub_chunks:
-                        chunk_id = f"{chunk.get('doc_id')}_{chunk.get('chunk_index')}"
-                        if chunk_id not in chunk_ids_seen:
-                            chunk_ids_seen.add(chunk_id)
-                            # Add sub-query info for debugging
-                            chunk["sub_query"] = sub_query
-                            all_chunks.append(chunk)
-
-        # Extract key terms and search
-        key_terms = extract_key_terms(query)
-        if key_terms:
-            logger.info(f"Strategy 3: Key terms search: {key_terms}")
-            for term in key_terms[:3]:  # Top 3 key terms
-                term_embedding = await embed_single_text(term)
-                if term_embedding:
-                    term_chunks = await search_similar_chunks(
-                        embedded_query=term_embedding,
-                        user_id=user_id,
-                        top_k=5,  # Fewer per term
-                    )
-                    for chunk in term_chunks:
-                        chunk_id = f"{chunk.get('doc_id')}_{chunk.get('chunk_index')}"
-                        if chunk_id not in chunk_ids_seen:
-                            chunk_ids_seen.add(chunk_id)
-                            chunk["key_term"] = term
-                            all_chunks.append(chunk)
-
-        # Sort by score and limit total results
-        all_chunks.sort(key=lambda x: x.get("score", 0), reverse=True)
+        debug.update(
+            hybrid=hybrid,
+            strategies=strategy_debug,
+            embedding_ms=round(embed_seconds * 1000, 1),
+            total_ms=round((time.perf_counter() - started) * 1000, 1),
+            latency_budget_ms=round(RAG_SEARCH_LATENCY_BUDGET * 1000, 1),
+        )
+
+        # Sort and limit total results. Hybrid hits keep their fused (RRF) order, since their
+        # cosine score ignores the BM25 leg; the stable sort lets the full query win rank ties
+        if hybrid:
+            all_chunks.sort(key=lambda x: x.get("rank", 0))
+        else:
+            all_chunks.sort(key=lambda x: x.get("score", 0), reverse=True)
         limited_chunks = all_chunks[: max_chunks * 2]  # Allow more for diversity
 
         logger.info(
@@ -91,7 +204,7 @@ async def multi_strategy_search(
         query_embedding = await embed_single_text(query)
         if query_embedding:
             return await search_similar_chunks(
-                embedded_query=query_embedding, user_id=user_id, top_k=max_chunks
+                embedded_query=query_embedding, user_id=user_id, top_k=max_chunks, query_text=query
             )
         return []
 
@@ -140,6 +253,11 @@ def extract_key_terms(query: str) -> List[str]:
     return key_terms[:5]  # Return top 5 key terms
 
 
+def _passes_score_threshold(chunk: Dict, threshold: float) -> bool:
+    """ Cosine thresholds only cut dense-only hits; chunks in the BM25 leg's top results are kept """
+    return chunk.get("lexical_match", False) or chunk.get("score", 0) >= threshold
+
+
 def calculate_document_relevance_scores(chunks: List[Dict], query: str) -> Dict[str, float]:
     """
     Calculate relevance scores for each document based on their chunks
@@ -181,110 +299,161 @@ async def perform_library_search(
     min_score: float = 0.7,
 ) -> Dict:
     """
-    Perform RAG search across user's library
+    Perform RAG search across user's library.
+
+    Repeated queries are answered from the query-result cache: an exact match on the
+    normalized query, or a cached query whose embedding is close enough. Entries are keyed
+    by the user's doc-set version, so any upload or delete invalidates them.
     """
     try:
         logger.info(f"Starting library search for user {user_id}: '{query}'")
 
-        all_chunks = await multi_strategy_search(query, user_id, max_chunks)
-
-        logger.info(f"Multi-strategy search found {len(all_chunks)} chunks")
-        if all_chunks:
-            scores = [chunk.get("score", 0) for chunk in all_chunks]
-            logger.info(
-                f"Score range: min={min(scores):.3f}, max={max(scores):.3f}, avg={sum(scores)/len(scores):.3f}"
+        params = {"max_chunks": max_chunks, "document_types": document_types, "min_score": min_score}
+        cache_info = {"cache": "disabled"}
+        if QUERY_CACHE_ENABLED:
+            version, query_embedding = await asyncio.gather(
+                asyncio.to_thread(get_library_version, user_id),
+                embed_single_text(query) if QUERY_CACHE_USES_EMBEDDING else asyncio.sleep(0),
             )
+            cached, cache_info = await asyncio.to_thread(
+                get_cached_query_result, "library", user_id, version, query, params, query_embedding
+            )
+            if cached is not None:
+                logger.info(f"Library search for user {user_id} served from cache ({cache_info['cache']})")
+                return {**cached, "debug": cache_info}
+
+        response = await _search_library(query, user_id, max_chunks, document_types, min_score)
+        # A failed LLM call is not worth repeating
+        if QUERY_CACHE_ENABLED and response["answer"] != RAG_ANSWER_FALLBACK:
+            await asyncio.to_thread(
+                cache_query_result, "library", user_id, version, query, params, response, query_embedding
+            )
+        response["debug"] = {**response.get("debug", {}), **cache_info}
+        return response
 
-        if min_score > 0:
-            before_filter = len(all_chunks)
-            
-            # Dynamic thresholding: if we have multiple documents, use higher threshold
-            # to avoid weak connections between unrelated documents
-            doc_count = len(set(chunk.get('doc_id') for chunk in all_chunks))
-            
-            if doc_count > 1:
-                # Multiple documents found - use higher threshold to ensure relevance
-                dynamic_threshold = max(min_score, 0.15)  # At least 0.15 for multi-doc
-                logger.info(f"Multiple documents detected ({doc_count}), using higher threshold: {dynamic_threshold}")
-            else:
-                # Single document - use original threshold
-                dynamic_threshold = min_score
-                logger.info(f"Single document detected, using original threshold: {dynamic_threshold}")
+    except Exception as e:
+        logger.error(f"RAG search failed: {str(e)}")
+        return {
+            "answer": "I encountered an error while searching your library. Please try again or contact support if the issue persists.",
+            "sources": [],
+            "references": [],
+        }
+
+
+async def _search_library(
+    query: str,
+    user_id: str,
+    max_chunks: int,
+    document_types: Optional[List[str]],
+    min_score: float,
+) -> Dict:
+    """ The uncached library search; errors propagate to perform_library_search """
+    search_debug = {}
+    all_chunks = await multi_strategy_search(query, user_id, max_chunks, debug=search_debug)
+
+    logger.info(f"Multi-strategy search found {len(all_chunks)} chunks")
+    if all_chunks:
+        scores = [chunk.get("score", 0) for chunk in all_chunks]
+        logger.info(
+            f"Score range: min={min(scores):.3f}, max={max(scores):.3f}, avg={sum(scores)/len(scores):.3f}"
+        )
+
+    if min_score > 0:
+        before_filter = len(all_chunks)
+        
+        # Dynamic thresholding: if we have multiple documents, use higher threshold
+        # to avoid weak connections between unrelated documents
+        doc_count = len(set(chunk.get('doc_id') for chunk in all_chunks))
+        
+        if doc_count > 1:
+            # Multiple documents found - use higher threshold to ensure relevance
+            dynamic_threshold = max(min_score, 0.15)  # At least 0.15 for multi-doc
+            logger.info(f"Multiple documents detected ({doc_count}), using higher threshold: {dynamic_threshold}")
+        else:
+            # Single document - use original threshold
+            dynamic_threshold = min_score
+            logger.info(f"Single document detected, using original threshold: {dynamic_threshold}")
+        
+        similar_chunks = [
+            chunk for chunk in all_chunks if _passes_score_threshold(chunk, dynamic_threshold)
+        ]
+        
+        logger.info(
+            f"Score filter (>={dynamic_threshold}): {before_filter} -> {len(similar_chunks)} chunks"
+        )
+    else:
+        similar_chunks = all_chunks
+
+    # Additional quality filter for multi-document scenarios
+    if len(similar_chunks) > 0:
+        doc_count = len(set(chunk.get('doc_id') for chunk in similar_chunks))
+        
+        if doc_count > 1:
+            # Calculate score distribution
+            scores = [chunk.get("score", 0) for chunk in similar_chunks]
+            max_score = max(scores)
+            score_threshold = max_score * 0.7  # Keep chunks within 70% of max score
             
-            similar_chunks = [
-                chunk for chunk in all_chunks if chunk.get("score", 0) >= dynamic_threshold
+            # Filter out significantly weaker chunks
+            quality_filtered = [
+                chunk for chunk in similar_chunks 
+                if _passes_score_threshold(chunk, score_threshold)
             ]
             
-            logger.info(
-                f"Score filter (>={dynamic_threshold}): {before_filter} -> {len(similar_chunks)} chunks"
-            )
-        else:
-            similar_chunks = all_chunks
-
-        # Additional quality filter for multi-document scenarios
-        if len(similar_chunks) > 0:
-            doc_count = len(set(chunk.get('doc_id') for chunk in similar_chunks))
+            removed_count = len(similar_chunks) - len(quality_filtered)
+            if removed_count > 0:
+                logger.info(f"Removed {removed_count} low-quality chunks (score < {score_threshold:.3f})")
+                similar_chunks = quality_filtered
             
-            if doc_count > 1:
-                # Calculate score distribution
-                scores = [chunk.get("score", 0) for chunk in similar_chunks]
-                max_score = max(scores)
-                score_threshold = max_score * 0.7  # Keep chunks within 70% of max score
+            # Additional document relevance filtering
+            if len(set(chunk.get('doc_id') for chunk in similar_chunks)) > 1:
+                doc_relevance = calculate_document_relevance_scores(similar_chunks, query)
                 
-                # Filter out significantly weaker chunks
-                quality_filtered = [
-                    chunk for chunk in similar_chunks 
-                    if chunk.get("score", 0) >= score_threshold
-                ]
-                
-                removed_count = len(similar_chunks) - len(quality_filtered)
-                if removed_count > 0:
-                    logger.info(f"Removed {removed_count} low-quality chunks (score < {score_threshold:.3f})")
-                    similar_chunks = quality_filtered
-                
-                # Additional document relevance filtering
-                if len(set(chunk.get('doc_id') for chunk in similar_chunks)) > 1:
-                    doc_relevance = calculate_document_relevance_scores(similar_chunks, query)
+                # If we have documents with very different relevance scores, filter out the weakest
+                if len(doc_relevance) > 1:
+                    max_relevance = max(doc_relevance.values())
+                    relevance_threshold = max_relevance * 0.6  # Keep docs within 60% of best
                     
-                    # If we have documents with very different relevance scores, filter out the weakest
-                    if len(doc_relevance) > 1:
-                        max_relevance = max(doc_relevance.values())
-                        relevance_threshold = max_relevance * 0.6  # Keep docs within 60% of best
-                        
-                        relevant_docs = {
-                            doc_id for doc_id, relevance in doc_relevance.items() 
-                            if relevance >= relevance_threshold
-                        }
+                    relevant_docs = {
+                        doc_id for doc_id, relevance in doc_relevance.items() 
+                        if relevance >= relevance_threshold
+                    }
+                    
+                    if len(relevant_docs) < len(doc_relevance):
+                        filtered_chunks = [
+                            chunk for chunk in similar_chunks 
+                            if chunk.get('doc_id') in relevant_docs
+                        ]
                         
-                        if len(relevant_docs) < len(doc_relevance):
-                            filtered_chunks = [
-                                chunk for chunk in similar_chunks 
-                                if chunk.get('doc_id') in relevant_docs
-                            ]
-                            
-                            removed_docs = len(doc_relevance) - len(relevant_docs)
-                            logger.info(f"Filtered out {removed_docs} irrelevant documents based on relevance scores")
-                            similar_chunks = filtered_chunks
-
-        if not similar_chunks:
-            return {
-                "answer": "I couldn't find any relevant information in your library for this query. Try using different keywords or check if you have documents uploaded.",
-                "sources": [],
-                "references": [],
-            }
-        
-        # TODO FIlter by doc if needed in future
-        similar_chunks = ensure_document_diversity(similar_chunks, max_per_doc=4)
+                        removed_docs = len(doc_relevance) - len(relevant_docs)
+                        logger.info(f"Filtered out {removed_docs} irrelevant documents based on relevance scores")
+                        similar_chunks = filtered_chunks
 
-        if document_types:
-            similar_chunks = filter_chunks_by_type(similar_chunks, document_types)
+    if not similar_chunks:
+        return {
+            "answer": "I couldn't find any relevant information in your library for this query. Try using different keywords or check if you have documents uploaded.",
+            "sources": [],
+            "references": [],
+            "debug": search_debug,
+        }
+    
+    # TODO FIlter by doc if needed in future
+    similar_chunks = ensure_document_diversity(similar_chunks, max_per_doc=4)
 
-        if not similar_chunks:
-            return {
-                "answer": f"I found some documents but none match the requested document types: {', '.join(document_types)}.",
-                "sources": [],
-                "references": [],
-            }
+    if document_types:
+        similar_chunks = filter_chunks_by_type(similar_chunks, document_types)
+
+    if not similar_chunks:
+        return {
+            "answer": f"I found some documents but none match the requested document types: {', '.join(document_types)}.",
+            "sources": [],
+            "references": [],
+            "debug": search_debug,
+        }
+
+    async with PostgresConnection() as conn:
+        # Texts are only fetched for the chunks that survived ranking and filtering
+        similar_chunks = hydrate_chunk_texts(similar_chunks, conn)
 
         doc_ids = list(
             set(chunk["doc_id"] for chunk in similar_chunks if chunk["doc_id"])
@@ -296,25 +465,18 @@ async def perform_library_search(
                 f"Chunk {i}: doc_id='{chunk.get('doc_id')}', text_length={len(chunk.get('text', ''))}, score={chunk.get('score')}"
             )
 
-        with PostgresConnection() as conn:
-            documents_metadata = get_documents_metadata_by_ids(conn, doc_ids, user_id)
+        documents_metadata = get_documents_metadata_by_ids(conn, doc_ids, user_id)
 
-        logger.info(
-            f"Retrieved metadata for {len(documents_metadata)} documents: {list(documents_metadata.keys())}"
-        )
-
-        answer = await generate_rag_answer(query, similar_chunks, documents_metadata)
+    logger.info(
+        f"Retrieved metadata for {len(documents_metadata)} documents: {list(documents_metadata.keys())}"
+    )
 
-        # Format response
-        return format_search_response(answer, similar_chunks, documents_metadata)
+    answer = await generate_rag_answer(query, similar_chunks, documents_metadata)
 
-    except Exception as e:
-        logger.error(f"RAG search failed: {str(e)}")
-        return {
-            "answer": "I encountered an error while searching your library. Please try again or contact support if the issue persists.",
-            "sources": [],
-            "references": [],
-        }
+    # Format response
+    response = format_search_response(answer, similar_chunks, documents_metadata)
+    response["debug"] = search_debug
+    return response
 
 
 def filter_chunks_by_type(chunks: List[Dict], document_types: List[str]) -> List[Dict]:
@@ -388,8 +550,8 @@ async def generate_rag_answer(
         # Use prompts from prompts.py for clean organization
         prompt = ASK_MY_LIBRARY_USER_PROMPT.format(query=query, context=context)
 
-        client = get_client_for_service()
-        response = client.chat.completions.create(
+        answer = await chat_completion(
+            "groq",
             model=LLAMA_3_70b,
             messages=[
                 {"role": "system", "content": RAG_SYSTEM_PROMPT},
@@ -399,11 +561,11 @@ async def generate_rag_answer(
             max_tokens=250,
         )
 
-        return response.choices[0].message.content.strip()
+        return answer.strip()
 
     except Exception as e:
         logger.error(f"Failed to generate RAG answer: {str(e)}")
-        return "I found relevant information but couldn't generate a proper response. Please try rephrasing your question."
+        return RAG_ANSWER_FALLBACK
 
 
 def format_search_response(
@@ -0,0 +1,67 @@
+"""
+BM25-style sparse vectors for the lexical leg of hybrid search.
+
+Terms are hashed into the sparse index space (no vocabulary to store or ship), document
+vectors carry BM25 term-frequency saturation with length normalisation, and query
+vectors mark each query term with weight 1. The IDF part of BM25 is computed by Qdrant
+itself from the collection statistics (sparse vector modifier "idf"), so the weights
+stay correct as libraries grow without re-encoding anything.
+"""
+import re
+import zlib
+from collections import Counter
+from typing import List, Tuple
+from qdrant_client.http.models import SparseVector
+from app.services.nlp_resources import get_extended_stopwords
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+BM25_AVG_DOC_LENGTH = 180  # typical content terms in a ~1500 character chunk
+
+_TOKEN_PATTERN = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """ Lowercased word tokens without stopwords or single characters """
+    stopwords = get_extended_stopwords()
+    return [
+        token
+        for token in _TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and token not in stopwords
+    ]
+
+
+def _term_index(term: str) -> int:
+    return zlib.crc32(term.encode("utf-8"))
+
+
+def _to_sparse(weights: dict) -> SparseVector:
+    # Two terms can hash to the same index; their weights are summed
+    merged = {}
+    for term, weight in weights.items():
+        index = _term_index(term)
+        merged[index] = merged.get(index, 0.0) + weight
+    indices, values = zip(*sorted(merged.items())) if merged else ((), ())
+    return SparseVector(indices=list(indices), values=list(values))
+
+
+def encode_document(text: str) -> SparseVector:
+    """ BM25 term weights (without IDF) for one chunk """
+    counts = Counter(tokenize(text or ""))
+    length_norm = 1 - BM25_B + BM25_B * (sum(counts.values()) / BM25_AVG_DOC_LENGTH)
+    return _to_sparse(
+        {
+            term: tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm)
+            for term, tf in counts.items()
+        }
+    )
+
+
+def encode_documents(texts: List[str]) -> List[SparseVector]:
+    return [encode_document(text) for text in texts]
+
+
+def encode_query(text: str) -> Tuple[SparseVector, int]:
+    """ Sparse query vector and its number of distinct terms (0 means no lexical leg) """
+    terms = set(tokenize(text or ""))
+    return _to_sparse({term: 1.0 for term in terms}), len(terms)
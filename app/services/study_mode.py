@@ -6,6 +6,7 @@ import logging
 from uuid import UUID, uuid4
 from app.cache.learning_profile import get_learning_profile_with_cache
 from app.cache.metadata import get_cached_doc_metadata
+from app.cache.page_text import get_cached_page, record_page_stats, warm_page_text_cache
 from app.database.connection import PostgresConnection
 from app.database.study_mode_queries import get_last_chat_messages, insert_chat_messages, insert_tool_response
 from app.schemas.chat import ChatMessageCreate
@@ -13,18 +14,31 @@ from app.services.constants import KIMI_K2_INSTRUCT_ID
 from app.services.diagram_generator import generate_diagrams
 from app.services.flashcard_generator import generate_flashcards
 from app.services.game_generator import generate_game_stub
-from app.services.minio_client import MinIOClientContext, get_pdf_bytes_from_minio
-from app.services.models import get_reply_from_model
+from app.services.minio_client import MinIOClientContext, open_pdf_from_minio
+from app.services.llm_gateway import get_reply_from_model
+from app.services.page_artifact import (
+    PageArtifact,
+    build_page_artifact,
+    load_page_artifact,
+    store_page_artifact,
+)
 from app.services.prompts import build_chat_message_prompt
 from io import BytesIO
 import asyncio
 import fitz
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from threading import Lock
 
 from app.services.quiz_generator import generate_quiz_questions
 
 logger = logging.getLogger(__name__)
 
+# One background worker fills the page cache (and missing page artifacts) after a miss
+_backfill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="page-cache")
+_backfills_in_flight = set()
+_backfill_lock = Lock()
+
 LEARNING_TOOLS_WITH_PARAMS = {
     "diagram": lambda content, title, chapter_name, section_name, learning_profile: generate_diagrams(
         content, title, chapter_name, section_name, learning_profile
@@ -44,60 +58,129 @@ LEARNING_TOOLS_WITH_PARAMS = {
 def extract_text_from_page(pdf_stream: BytesIO, page_number: int, title: str = "") -> dict:
     """Extract text and metadata from a specific page of a PDF document."""
     try:
-        if page_number > 0:
-            page_number = page_number - 1 # MinIO starts at 1
-            
-        doc = fitz.open(stream=pdf_stream, filetype="pdf")
-        if page_number < 0 or page_number >= len(doc):
-            raise ValueError(f"Page number {page_number} out of bounds.")
-        
-        page = doc[page_number]
-        text = page.get_text()
-        images = page.get_images(full=False)
-        image_count = len(images)
-        
-        if image_count > 0 and not text.strip():
-            note = "This page contains one or more diagrams/images but no readable text."
-
-        doc.close()
-        return {
-            "title": title,
-            "text": text,
-            "image_count": image_count,
-        }
-
+        with fitz.open(stream=pdf_stream, filetype="pdf") as doc:
+            return extract_text_from_document(doc, page_number, title)
     except Exception as e:
         logger.error(f"PDF extraction error: {e}", exc_info=True)
         raise
 
 
+def extract_text_from_document(doc: "fitz.Document", page_number: int, title: str = "") -> dict:
+    """Extract text and metadata from a specific page of an open PDF document."""
+    if page_number > 0:
+        page_number = page_number - 1 # MinIO starts at 1
+
+    if page_number < 0 or page_number >= len(doc):
+        raise ValueError(f"Page number {page_number} out of bounds.")
+
+    page = doc[page_number]
+    text = page.get_text()
+    images = page.get_images(full=False)
+    image_count = len(images)
+
+    if image_count > 0 and not text.strip():
+        note = "This page contains one or more diagrams/images but no readable text."
+
+    return {
+        "title": title,
+        "text": text,
+        "image_count": image_count,
+    }
+
+
+def _backfill_page_artifact(s3_key: str) -> None:
+    """ Builds and stores the artifact of a document uploaded before artifacts existed, then caches its pages """
+    try:
+        with MinIOClientContext() as s3:
+            # The request that scheduled this just read the PDF, so it comes from the disk cache
+            with open_pdf_from_minio(s3, s3_key) as (doc, pdf_bytes):
+                data = build_page_artifact(doc, pdf_bytes)
+            store_page_artifact(s3, s3_key, data)
+        warm_page_text_cache(PageArtifact(data), s3_key)
+    except Exception as e:
+        logger.error(f"Failed to backfill page artifact for {s3_key}: {e}")
+
+
+def _schedule_page_cache_backfill(task, *args) -> None:
+    """ Fills the page cache (and the artifact, if missing) off the request path, once per object """
+    s3_key = args[-1]
+    with _backfill_lock:
+        if s3_key in _backfills_in_flight:
+            return
+        _backfills_in_flight.add(s3_key)
+
+    def backfill():
+        try:
+            task(*args)
+        finally:
+            with _backfill_lock:
+                _backfills_in_flight.discard(s3_key)
+
+    _backfill_executor.submit(backfill)
+
+
 def get_page_content(
     document_id: UUID, page_number: int, conn, document_type: str
 ) -> str:
-    """Retrieve the content of a specific page from a document."""
+    """
+    Retrieve the content of a specific page from a document.
+    Served from the page text cache, then from the document's page artifact; only documents
+    without an artifact still download and parse the PDF.
+    """
     try:
         metadata = get_cached_doc_metadata(conn, str(document_id), document_type)
         if not metadata or not metadata.get("s3_key"):
             raise ValueError("Missing document metadata or S3 key.")
+
+        s3_key = metadata["s3_key"]
+        title = metadata.get("title", "")
+        page_index = page_number - 1 if page_number > 0 else page_number  # same mapping as extract_text_from_page
+        page = get_cached_page(s3_key, page_index)
+        if page is not None:
+            return {"title": title, "text": page["text"], "image_count": page["image_count"]}
+
         with MinIOClientContext() as s3:
-            file_stream = get_pdf_bytes_from_minio(s3, metadata["s3_key"])
-            return extract_text_from_page(
-                file_stream, page_number, metadata.get("title", "")
-            )
+            artifact = load_page_artifact(s3, s3_key)
+            if artifact is None:
+                with open_pdf_from_minio(s3, s3_key) as (doc, pdf_bytes):
+                    content = extract_text_from_document(doc, page_number, title)
+
+        if artifact is not None:
+            record_page_stats(bytes_downloaded=artifact.size, bytes_avoided=max(0, artifact.pdf_bytes - artifact.size))
+            _schedule_page_cache_backfill(warm_page_text_cache, artifact, s3_key)
+            return {
+                "title": title,
+                "text": artifact.page_text(page_index),
+                "image_count": artifact.image_count(page_index),
+            }
+
+        record_page_stats(bytes_downloaded=pdf_bytes)
+        _schedule_page_cache_backfill(_backfill_page_artifact, s3_key)
+        return content
     except Exception as e:
         logger.error(f"Failed to get page content: {e}", exc_info=True)
         raise
 
 
+def _run_with_connection(task, *args):
+    """ Runs task(conn, *args) on its own pooled connection; called from worker threads """
+    with PostgresConnection() as conn:
+        return task(conn, *args)
+
+
 async def run_parallel_context_tasks(
-    conn, user_id: UUID, document_id: UUID, documnet_type: str, page_number: int, chat_session_id: UUID
+    user_id: UUID, document_id: UUID, documnet_type: str, page_number: int, chat_session_id: UUID
 ):
     """Run parallel tasks to fetch user learning profile, page content, and last chat messages."""
     try:
+        # Each worker checks out (and returns) its own connection, so none is held across awaits
         return await asyncio.gather(
-            asyncio.to_thread(get_learning_profile_with_cache, conn, user_id),
-            asyncio.to_thread(get_page_content, document_id, page_number, conn, documnet_type),
-            asyncio.to_thread(get_last_chat_messages, conn, chat_session_id),
+            asyncio.to_thread(_run_with_connection, get_learning_profile_with_cache, user_id),
+            asyncio.to_thread(
+                _run_with_connection,
+                lambda conn: get_page_content(document_id, page_number, conn, documnet_type),
+            ),
+            asyncio.to_thread(_run_with_connection, get_last_chat_messages, chat_session_id),
         )
     except Exception as e:
         logger.error(f"Parallel task execution failed: {e}", exc_info=True)
@@ -199,34 +282,32 @@ async def run_tool(tool_name: str, context: dict) -> Optional[Any]:  # TODO make
 async def handle_chat_message(payload: ChatMessageCreate, user_id: UUID) -> str:
     """Handle a chat message by fetching context, building a prompt, getting a reply from the mode and running tools."""
     try:
-        with PostgresConnection() as conn:
-            try:
-                learning_profile, title_and_page_content, previous_messages = (
-                    await run_parallel_context_tasks(
-                        conn,
-                        user_id,
-                        payload.document_id,
-                        payload.document_type,
-                        payload.current_page,
-                        payload.chat_session_id,
-                    )
-                )
-                logger.info("Parallel tasks completed successfully.")
-
-                context_for_tool = {
-                    "content": title_and_page_content["text"],
-                    "title": title_and_page_content.get("title", ""),
-                    "chapter_name": payload.chapter_name,
-                    "section_name": payload.section_name,
-                    "learning_profile": learning_profile,
-                }
-            except Exception as context_error:
-                logger.error(
-                    f"Error fetching context for chat: {context_error}", exc_info=True
-                )
-                raise HTTPException(
-                    status_code=500, detail="Failed to load user context or document."
+        try:
+            learning_profile, title_and_page_content, previous_messages = (
+                await run_parallel_context_tasks(
+                    user_id,
+                    payload.document_id,
+                    payload.document_type,
+                    payload.current_page,
+                    payload.chat_session_id,
                 )
+            )
+            logger.info("Parallel tasks completed successfully.")
+
+            context_for_tool = {
+                "content": title_and_page_content["text"],
+                "title": title_and_page_content.get("title", ""),
+                "chapter_name": payload.chapter_name,
+                "section_name": payload.section_name,
+                "learning_profile": learning_profile,
+            }
+        except Exception as context_error:
+            logger.error(
+                f"Error fetching context for chat: {context_error}", exc_info=True
+            )
+            raise HTTPException(
+                status_code=500, detail="Failed to load user context or document."
+            )
 
         try:
             initial_prompt = build_chat_message_prompt(
@@ -252,7 +333,7 @@ async def handle_chat_message(payload: ChatMessageCreate, user_id: UUID) -> str:
             )
 
         try:
-            reply = get_reply_from_model(str(payload.model_id), prompt) # TODO Un comment after testing 🚨🚨🚨
+            reply = await get_reply_from_model(str(payload.model_id), prompt) # TODO Un comment after testing 🚨🚨🚨
             # reply = "THIS IS A TEST REPLY xyz \n \n ..... TOOL_CALL: {\"tool\": \"quiz\"} ....."
 
             # Detect tool trigger and clean reply if found
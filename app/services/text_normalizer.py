@@ -0,0 +1,248 @@
+"""
+Compiled text normalization engine for the RAG preprocessing pipeline.
+
+Drop-in replacement for the regex-based cleaning stages in extraction.py
+(normalize_unicode -> ... -> filter_content_for_mcq). Each stage produces exactly
+the same output as its counterpart there, but patterns are compiled once at import,
+unicode/control-character handling is a single str.translate pass, stages are skipped
+when the text cannot contain what they look for, and the line-level passes share one
+split/join of the document.
+"""
+import re
+import unicodedata
+from collections import Counter
+from typing import List
+
+# Single-character ligature/punctuation fixes applied after NFKC
+_CHAR_REPLACEMENTS = {
+    "ﬁ": "fi",
+    "ﬂ": "fl",
+    "ﬀ": "ff",
+    "ﬃ": "ffi",
+    "ﬄ": "ffl",
+    "Œ": "OE",
+    "œ": "oe",
+    "æ": "ae",
+    "Æ": "AE",
+    "–": "-",
+    "—": "-",
+    "…": "...",
+}
+
+# Multi-character replacement that the original ligature map ends up containing
+_SEQUENCE_REPLACEMENTS = {': """, ': '"'}
+
+
+class _TranslationTable(dict):
+    """
+    str.translate table that applies _CHAR_REPLACEMENTS and deletes every unicode
+    "C*" (control/format/unassigned) character. Entries are memoized per code point.
+    """
+
+    def __missing__(self, codepoint: int):
+        value = None if unicodedata.category(chr(codepoint))[0] == "C" else codepoint
+        self[codepoint] = value
+        return value
+
+
+_TRANSLATION_TABLE = _TranslationTable(
+    {ord(char): replacement for char, replacement in _CHAR_REPLACEMENTS.items()}
+)
+
+# LaTeX remnants
+_LATEX_VERSION = re.compile(r'LATEX\s*2\\["\']')
+_LATEX_COMMAND = re.compile(r"\\([a-zA-Z]+)")
+_INLINE_MATH = re.compile(r"\$([^$]+)\$")
+_LATEX_ARGUMENT_COMMANDS = [
+    re.compile(r"\\textbf\{([^}]+)\}"),
+    re.compile(r"\\textit\{([^}]+)\}"),
+    re.compile(r"\\emph\{([^}]+)\}"),
+    re.compile(r"\\[a-zA-Z]+\{([^}]*)\}"),
+]
+
+# OCR fixes, fused into one alternation: D . -> =, rn -> m, vv -> w, II -> ll.
+# Replacements never change word boundaries, so one pass matches the sequential rules.
+# The original "1"/"0" before-lowercase rules can never match (there is no word
+# boundary between a digit and a letter), so they are omitted.
+_OCR_ERRORS = re.compile(r"\b(?:D\s*\.\s*|rn\b|vv\b|II\b)")
+_OCR_REPLACEMENTS = {"rn": "m", "vv": "w", "II": "ll"}
+
+# Noise patterns, in the order extraction.remove_noise_patterns applies them
+_NOISE_PATTERNS = [
+    re.compile(r"(?i)(Figure|Table|Fig\.?)\s*\d+(\.\d+)*\s*[:.\-–—]?\s*.*?(?=\n|$)"),
+    re.compile(r"\b\d{1,4}\b(?=\s*$)", re.MULTILINE),
+    re.compile(r"\b(?:page|p\.)\s*\d+\b", re.IGNORECASE),
+    re.compile(r"^\s*\d+(\.\d+)*\s*$", re.MULTILINE),
+    re.compile(r"[\d\s]{10,}"),
+    re.compile(r"\[\d+\]"),
+    re.compile(r"\([A-Z][a-z]+\s+\d{4}\)"),
+]
+
+# Line-level passes
+_TOC_PAGE_NUMBER_LINE = re.compile(r"^[.\s]*\d+\s*$")
+_ATTACHED_PAGE_NUMBER = re.compile(r"([a-z])(\d{3,})(\d+)")
+_LINE_END_PUNCTUATION = re.compile(r"[.!?:;]$")
+_NUMBERED_LIST_START = re.compile(r"^\d+\.")
+
+# Semantic breaks and whitespace
+_HEADING_BREAK = re.compile(
+    r"(\n|^)([A-Z][^.!?]*(?:Algorithm|Method|Approach|Definition|Theorem|Lemma|Proof))"
+)
+_LIST_BREAK = re.compile(r"(\n|^)(\d+\.|[a-z]\)|\([a-z]\))")
+_HORIZONTAL_WHITESPACE = re.compile(r"[ \t]+")
+_MULTI_BREAK = re.compile(r"\n\s*\n\s*\n+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+# MCQ content filter
+_MCQ_SKIP_LINE = re.compile(
+    r"^(acknowledgment|preface|bibliography|index|references)"
+    r"|^\s*(copyright|©|\(c\))"
+    r"|^\s*isbn"
+    r"|^\s*printed in"
+    r"|^\s*all rights reserved"
+)
+
+
+def normalize_unicode_and_controls(text: str) -> str:
+    """NFKC-normalize, fix ligatures/quotes/dashes and drop control characters in one pass."""
+    text = unicodedata.normalize("NFKC", text)
+    for wrong, right in _SEQUENCE_REPLACEMENTS.items():
+        if wrong in text:
+            text = text.replace(wrong, right)
+    return text.translate(_TRANSLATION_TABLE)
+
+
+def clean_latex_remnants(text: str) -> str:
+    """Clean up LaTeX formatting remnants and mathematical expressions."""
+    if "LATEX" in text:
+        text = _LATEX_VERSION.sub("LaTeX", text)
+    if "\\" in text:
+        text = _LATEX_COMMAND.sub(r"\1", text)
+    if "$" in text:
+        text = _INLINE_MATH.sub(r"\1", text)
+    if "\\" in text:
+        for pattern in _LATEX_ARGUMENT_COMMANDS:
+            text = pattern.sub(r"\1", text)
+    return text
+
+
+def fix_common_ocr_errors(text: str) -> str:
+    """Fix common OCR misreads and artifacts."""
+    return _OCR_ERRORS.sub(_replace_ocr_error, text)
+
+
+def _replace_ocr_error(match: re.Match) -> str:
+    token = match.group(0)
+    return "= " if token[0] == "D" else _OCR_REPLACEMENTS[token]
+
+
+def remove_noise_patterns(text: str) -> str:
+    """Remove various noise patterns that don't add semantic value."""
+    for pattern in _NOISE_PATTERNS:
+        text = pattern.sub("", text)
+    return text
+
+
+def _clean_table_of_contents_lines(lines: List[str]) -> List[str]:
+    cleaned_lines = []
+    for line in lines:
+        if _TOC_PAGE_NUMBER_LINE.match(line.strip()):
+            continue
+        if line.count(".") > len(line) // 4:
+            continue
+        cleaned_lines.append(_ATTACHED_PAGE_NUMBER.sub(r"\1. ", line))
+    return cleaned_lines
+
+
+def _remove_repeated_lines(lines: List[str], min_repeats: int = 3) -> List[str]:
+    stripped = [line.strip() for line in lines]
+    counts = Counter(s for s in stripped if s)
+    return [
+        line
+        for line, s in zip(lines, stripped)
+        if counts[s] < min_repeats or s == ""
+    ]
+
+
+def _merge_broken_lines(lines: List[str]) -> str:
+    stripped = [line.strip() for line in lines]
+    last = len(stripped) - 1
+    merged_lines = []
+
+    for i, line in enumerate(stripped):
+        if not line:
+            merged_lines.append("")
+            continue
+
+        next_line = stripped[i + 1] if i < last else ""
+        if (
+            next_line
+            and not _LINE_END_PUNCTUATION.search(line)
+            and not ("A" <= next_line[0] <= "Z")
+            and not _NUMBERED_LIST_START.match(next_line)
+        ):
+            merged_lines.append(line + " ")
+        else:
+            merged_lines.append(line)
+
+    return "".join(merged_lines)
+
+
+def clean_lines(text: str) -> str:
+    """
+    Fused equivalent of clean_table_of_contents -> remove_repeated_lines -> merge_broken_lines,
+    sharing a single split of the document.
+    """
+    lines = text.split("\n")
+    lines = _clean_table_of_contents_lines(lines)
+    lines = _remove_repeated_lines(lines)
+    return _merge_broken_lines(lines)
+
+
+def split_into_semantic_chunks(text: str) -> str:
+    """Add clear paragraph breaks at semantic boundaries for better chunking."""
+    text = _HEADING_BREAK.sub(r"\1\n\2", text)
+    return _LIST_BREAK.sub(r"\1\n\2", text)
+
+
+def normalize_whitespace(text: str) -> str:
+    """Normalize whitespace while preserving paragraph structure."""
+    text = _HORIZONTAL_WHITESPACE.sub(" ", text)
+    if "\n" in text:
+        text = _MULTI_BREAK.sub("\n\n", text)
+        text = _PARAGRAPH_BREAK.sub("\n\n", text)
+    return text.strip()
+
+
+def filter_content_for_mcq(text: str) -> str:
+    """Filter out content that's not suitable for MCQ generation."""
+    filtered_lines = []
+
+    for line in text.split("\n"):
+        if _MCQ_SKIP_LINE.match(line.lower().strip()):
+            continue
+        if len(line.strip()) < 20:
+            continue
+        special_chars = sum(1 for c in line if not c.isalnum() and c != " ")
+        if special_chars / max(len(line), 1) > 0.3:
+            continue
+        filtered_lines.append(line)
+
+    return "\n".join(filtered_lines)
+
+
+def normalize_text_for_vector_store(text: str) -> str:
+    """Basic cleaning stages shared by both preprocessing pipelines."""
+    text = normalize_unicode_and_controls(text)
+    text = clean_latex_remnants(text)
+    text = fix_common_ocr_errors(text)
+    text = remove_noise_patterns(text)
+    return clean_lines(text)
+
+
+def normalize_text_for_rag(text: str) -> str:
+    """All regex-based stages of preprocess_text_for_rag, up to the NLTK content filters."""
+    text = normalize_text_for_vector_store(text)
+    text = split_into_semantic_chunks(text)
+    text = normalize_whitespace(text)
+    return filter_content_for_mcq(text)
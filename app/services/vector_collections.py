@@ -0,0 +1,244 @@
+"""
+Where a user's vectors live.
+
+Per-user mode (the default) keeps one `user_docs_<user_id>` collection per user.
+Tenant mode (QDRANT_TENANT_MODE=true) stores every user's points in one shared
+collection, partitioned by a `user_id` keyword index flagged `is_tenant` so Qdrant
+co-locates each tenant's points and builds per-tenant HNSW graphs. Search, count and
+delete paths call user_filter so the same code works in either mode.
+
+New collections get the storage profile selected by QDRANT_STORAGE_PROFILE:
+"float32" keeps full vectors and HNSW in RAM (the original layout), "int8" adds scalar
+quantization and "binary" binary quantization, both keeping only the quantized vectors
+in RAM with the float32 originals on disk and rescoring the top candidates against them.
+
+With QDRANT_HYBRID_SEARCH, new collections also carry a BM25 sparse vector next to the
+dense one, so search can fuse a lexical and a semantic leg in one query.
+
+Which collections exist (and which have their payload indexes) is cached per process
+with a TTL, warmed from get_collections on startup and updated on create/delete, so
+steady-state uploads and deletes make no schema round trips.
+"""
+import logging
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+from qdrant_client.http.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Distance,
+    FieldCondition,
+    Filter,
+    HnswConfigDiff,
+    KeywordIndexParams,
+    MatchValue,
+    Modifier,
+    PayloadSchemaType,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    SparseVectorParams,
+    VectorParams,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLLECTION_PREFIX = "user_docs_"
+
+QDRANT_TENANT_MODE = (os.getenv("QDRANT_TENANT_MODE") or "false").lower() == "true"
+SHARED_COLLECTION_NAME = os.getenv("QDRANT_SHARED_COLLECTION") or "user_docs"
+
+QDRANT_HYBRID_SEARCH = (os.getenv("QDRANT_HYBRID_SEARCH") or "true").lower() == "true"
+SPARSE_VECTOR_NAME = "bm25"
+DENSE_VECTOR_NAME = ""  # the unnamed default vector
+
+QDRANT_STORAGE_PROFILE = (os.getenv("QDRANT_STORAGE_PROFILE") or "float32").lower()  # float32 | int8 | binary
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M") or 16)
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT") or 100)
+QDRANT_VECTORS_ON_DISK = (os.getenv("QDRANT_VECTORS_ON_DISK") or "auto").lower()  # auto: on disk when quantized
+QDRANT_RESCORE_OVERSAMPLING = float(os.getenv("QDRANT_RESCORE_OVERSAMPLING") or 2.0)
+
+STORAGE_PROFILES = ("float32", "int8", "binary")
+
+# Every search is scoped to one user, so the global graph is disabled (m=0) and only
+# per-tenant graphs are built (payload_m), as Qdrant recommends for multitenancy
+TENANT_HNSW_CONFIG = HnswConfigDiff(m=0, payload_m=QDRANT_HNSW_M, ef_construct=QDRANT_HNSW_EF_CONSTRUCT)
+
+
+def collection_for_user(user_id: str) -> str:
+    if QDRANT_TENANT_MODE:
+        return SHARED_COLLECTION_NAME
+    return f"{DEFAULT_COLLECTION_PREFIX}{user_id}"
+
+
+def user_filter(user_id: str, base: Optional[Filter] = None) -> Optional[Filter]:
+    """ Adds the tenant condition to `base` in tenant mode; per-user collections need none """
+    if not QDRANT_TENANT_MODE:
+        return base
+
+    tenant_condition = FieldCondition(key="user_id", match=MatchValue(value=str(user_id)))
+    if base is None:
+        return Filter(must=[tenant_condition])
+    return Filter(
+        must=[tenant_condition, *(base.must or [])],
+        should=base.should,
+        must_not=base.must_not,
+    )
+
+
+def payload_indexes() -> list[tuple]:
+    """ (field_name, field_schema) pairs every collection in the current mode should have """
+    # chunk_index backs the range count of the upsert visibility barrier
+    indexes = [("doc_id", PayloadSchemaType.KEYWORD), ("chunk_index", PayloadSchemaType.INTEGER)]
+    if QDRANT_TENANT_MODE:
+        indexes.insert(0, ("user_id", KeywordIndexParams(type="keyword", is_tenant=True)))
+    return indexes
+
+
+def _storage_profile(profile: Optional[str] = None) -> str:
+    profile = (profile or QDRANT_STORAGE_PROFILE).lower()
+    if profile not in STORAGE_PROFILES:
+        logger.warning(f"[Qdrant] Unknown storage profile {profile!r}, using float32")
+        return "float32"
+    return profile
+
+
+def vectors_on_disk(profile: Optional[str] = None) -> bool:
+    if QDRANT_VECTORS_ON_DISK in ("true", "false"):
+        return QDRANT_VECTORS_ON_DISK == "true"
+    return _storage_profile(profile) != "float32"
+
+
+def vector_params(size: int, profile: Optional[str] = None) -> VectorParams:
+    return VectorParams(size=size, distance=Distance.COSINE, on_disk=vectors_on_disk(profile))
+
+
+def hnsw_config() -> HnswConfigDiff:
+    if QDRANT_TENANT_MODE:
+        return TENANT_HNSW_CONFIG
+    return HnswConfigDiff(m=QDRANT_HNSW_M, ef_construct=QDRANT_HNSW_EF_CONSTRUCT)
+
+
+def quantization_config(profile: Optional[str] = None):
+    """ Quantized vectors are pinned in RAM (always_ram) while the originals may live on disk """
+    profile = _storage_profile(profile)
+    if profile == "int8":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if profile == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+def search_params(profile: Optional[str] = None) -> Optional[SearchParams]:
+    """ Quantized profiles oversample candidates and rescore them with the original vectors """
+    if _storage_profile(profile) == "float32":
+        return None
+    return SearchParams(
+        quantization=QuantizationSearchParams(
+            rescore=True, oversampling=QDRANT_RESCORE_OVERSAMPLING
+        )
+    )
+
+
+def collection_create_kwargs(vector_size: int, profile: Optional[str] = None) -> dict:
+    """ create_collection arguments for the configured storage profile """
+    kwargs = {"vectors_config": vector_params(vector_size, profile), "hnsw_config": hnsw_config()}
+    quantization = quantization_config(profile)
+    if quantization is not None:
+        kwargs["quantization_config"] = quantization
+    if QDRANT_HYBRID_SEARCH:
+        kwargs["sparse_vectors_config"] = sparse_vectors_config()
+    return kwargs
+
+
+def sparse_vectors_config() -> dict:
+    """ BM25 leg of hybrid search: Qdrant applies IDF from collection statistics at query time """
+    return {SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)}
+
+
+def has_sparse_vector(collection_info) -> bool:
+    return SPARSE_VECTOR_NAME in (collection_info.config.params.sparse_vectors or {})
+
+
+QDRANT_COLLECTION_CACHE_TTL = float(os.getenv("QDRANT_COLLECTION_CACHE_TTL") or 3600)  # seconds
+QDRANT_COLLECTION_CACHE_SIZE = int(os.getenv("QDRANT_COLLECTION_CACHE_SIZE") or 10000)
+
+# collection name -> (expires_at, indexes ensured, has the sparse vector or None if unknown)
+_collection_state: "OrderedDict[str, tuple]" = OrderedDict()
+_collection_state_lock = Lock()
+_collection_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _lookup(collection_name: str) -> Optional[tuple]:
+    """ None if unknown or expired, otherwise (indexes ensured, hybrid) """
+    with _collection_state_lock:
+        state = _collection_state.get(collection_name)
+        if state is None or state[0] < time.monotonic():
+            _collection_state.pop(collection_name, None)
+            _collection_cache_stats["misses"] += 1
+            return None
+        _collection_state.move_to_end(collection_name)
+        _collection_cache_stats["hits"] += 1
+        return state[1:]
+
+
+def is_collection_known(collection_name: str) -> bool:
+    """ True if the collection is known to exist (no round trip needed) """
+    return _lookup(collection_name) is not None
+
+
+def is_collection_ready(collection_name: str) -> bool:
+    """ True if the collection is known to exist with its payload indexes and vector layout """
+    state = _lookup(collection_name)
+    return bool(state and state[0] and state[1] is not None)
+
+
+def collection_supports_hybrid(collection_name: str) -> Optional[bool]:
+    """ Whether the collection has the sparse vector, None when not cached """
+    state = _lookup(collection_name)
+    return state[1] if state else None
+
+
+def mark_collection(collection_name: str, indexed: bool = False, hybrid: Optional[bool] = None) -> None:
+    with _collection_state_lock:
+        previous = _collection_state.get(collection_name)
+        if previous and previous[0] >= time.monotonic():
+            indexed = indexed or previous[1]
+            hybrid = previous[2] if hybrid is None else hybrid
+        _collection_state[collection_name] = (time.monotonic() + QDRANT_COLLECTION_CACHE_TTL, indexed, hybrid)
+        _collection_state.move_to_end(collection_name)
+        while len(_collection_state) > QDRANT_COLLECTION_CACHE_SIZE:
+            _collection_state.popitem(last=False)
+
+
+def invalidate_collection(collection_name: str) -> None:
+    """ Forget a collection, e.g. after deleting it or when Qdrant reports it missing """
+    with _collection_state_lock:
+        _collection_state.pop(collection_name, None)
+
+
+def clear_collection_cache() -> None:
+    with _collection_state_lock:
+        _collection_state.clear()
+
+
+def get_collection_cache_stats() -> dict:
+    with _collection_state_lock:
+        return {**_collection_cache_stats, "size": len(_collection_state)}
+
+
+async def warm_collection_cache() -> int:
+    """ Records every existing collection; indexes are ensured once per collection on first upload """
+    from app.services.qdrant_clients import get_async_qdrant_client
+
+    collections = (await get_async_qdrant_client().get_collections()).collections
+    for collection in collections:
+        mark_collection(collection.name)
+    logger.info(f"[Qdrant] Collection cache warmed with {len(collections)} collections")
+    return len(collections)
@@ -1,67 +1,49 @@
-from qdrant_client import QdrantClient
 from qdrant_client.http.exceptions import UnexpectedResponse
-from qdrant_client.http.models import Filter, SearchRequest, FieldCondition, MatchValue
+from qdrant_client.http.models import (
+    FieldCondition,
+    Filter,
+    Fusion,
+    FusionQuery,
+    MatchValue,
+    Prefetch,
+    QueryRequest,
+)
 from typing import List, Dict, Optional, Union
 import logging
-import os
-from functools import lru_cache
 import asyncio
-
-logger = logging.getLogger(__name__)
-
-QDRANT_URL = os.getenv("QDRANT_URL")
-QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
-
-# Enhanced client initialization with better configuration
-client = QdrantClient(
-    url=QDRANT_URL,
-    api_key=QDRANT_API_KEY,
-    timeout=30.0,  # Add timeout for better error handling
-    # Connection pooling for better performance
-    prefer_grpc=True,  # Use gRPC for better performance
-    grpc_options={
-        "grpc.keepalive_time_ms": 30000,
-        "grpc.keepalive_timeout_ms": 5000,
-        "grpc.http2.max_pings_without_data": 0,
-        "grpc.http2.min_time_between_pings_ms": 10000,
-        "grpc.http2.min_ping_interval_without_data_ms": 300000,
-    },
+import math
+from app.services.qdrant_clients import get_async_qdrant_client, get_qdrant_client
+from app.services.sparse_encoder import encode_query
+from app.services.vector_collections import (
+    DENSE_VECTOR_NAME,
+    QDRANT_HYBRID_SEARCH,
+    QDRANT_TENANT_MODE,
+    SPARSE_VECTOR_NAME,
+    clear_collection_cache,
+    collection_for_user,
+    collection_supports_hybrid,
+    has_sparse_vector,
+    invalidate_collection,
+    mark_collection,
+    search_params,
+    user_filter,
 )
 
-DEFAULT_COLLECTION_PREFIX = "user_docs_"
-
-
-# @lru_cache(maxsize=1000)
-# def _cached_collection_exists(collection_name: str) -> bool:
-#     """Cached collection existence check to avoid repeated API calls."""
-#     try:
-#         return client.collection_exists(collection_name)
-#     except Exception as e:
-#         logger.error(f"Error checking collection existence for {collection_name}: {e}")
-#         return False
-
+logger = logging.getLogger(__name__)
 
-# def _clear_collection_cache():
-#     """Clear the collection existence cache."""
-#     _cached_collection_exists.cache_clear()
+# Synchronous client for scripts and sync helpers; searches use the shared async client
+client = get_qdrant_client()
 
+HYBRID_PREFETCH_MULTIPLIER = 3  # candidates per leg, relative to the final limit
 
-async def _perform_search_with_retry(
-    collection_name: str, query_vector: List[float], limit: int, with_payload: bool, filter: Optional[Filter] = None
-) -> List:
-    """Perform search with retry logic for better reliability."""
+async def _call_with_retry(operation, *args, **kwargs):
+    """Await an async Qdrant call with retry logic for better reliability."""
     max_retries = 3
     base_delay = 1.0
 
     for attempt in range(max_retries):
         try:
-            return client.search(
-                collection_name=collection_name,
-                query_vector=query_vector,
-                limit=limit,
-                with_payload=with_payload,
-                query_filter=filter,
-            )
+            return await operation(*args, **kwargs)
         except (UnexpectedResponse, ConnectionError, TimeoutError) as e:
             if attempt == max_retries - 1:
                 raise e
@@ -76,6 +58,117 @@ async def _perform_search_with_retry(
             raise e
 
 
+async def _perform_search_with_retry(
+    collection_name: str, query_vector: List[float], limit: int, with_payload: bool, filter: Optional[Filter] = None
+) -> List:
+    """Perform search with retry logic for better reliability."""
+    return await _call_with_retry(
+        get_async_qdrant_client().search,
+        collection_name=collection_name,
+        query_vector=query_vector,
+        limit=limit,
+        with_payload=with_payload,
+        query_filter=filter,
+        search_params=search_params(),
+    )
+
+
+def _build_query_request(
+    query_vector: List[float], query_text: Optional[str], limit: int, filter: Optional[Filter], hybrid: bool
+) -> QueryRequest:
+    """
+    Dense-only query, or (for hybrid collections with a usable query text) a dense leg and a
+    BM25 leg fused with reciprocal rank fusion inside Qdrant.
+    """
+    sparse_query, term_count = encode_query(query_text) if hybrid and query_text else (None, 0)
+    if not term_count:
+        return QueryRequest(
+            query=query_vector, limit=limit, filter=filter, params=search_params(), with_payload=True
+        )
+
+    candidates = limit * HYBRID_PREFETCH_MULTIPLIER
+    return QueryRequest(
+        prefetch=[
+            Prefetch(query=query_vector, limit=candidates, filter=filter, params=search_params()),
+            Prefetch(query=sparse_query, using=SPARSE_VECTOR_NAME, limit=candidates, filter=filter),
+        ],
+        query=FusionQuery(fusion=Fusion.RRF),
+        limit=limit,
+        with_payload=True,
+        # Dense vectors of the fused top-k, to report cosine scores like dense search does
+        with_vector=[DENSE_VECTOR_NAME],
+    )
+
+
+def _build_lexical_request(query_text: Optional[str], limit: int, filter: Optional[Filter]) -> Optional[QueryRequest]:
+    """
+    The BM25 leg alone (IDF-weighted by Qdrant), cut at the final limit: only its top hits
+    count as lexical matches. None when the text has no usable terms.
+    """
+    sparse_query, term_count = encode_query(query_text) if query_text else (None, 0)
+    if not term_count:
+        return None
+    return QueryRequest(query=sparse_query, using=SPARSE_VECTOR_NAME, limit=limit, filter=filter, with_payload=False)
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return sum(x * y for x, y in zip(a, b)) / norm if norm else 0.0
+
+
+def _with_dense_scores(points: List, query_vector: List[float]) -> List:
+    """
+    RRF scores only encode rank, so fused hits get the cosine similarity to the query as their
+    score (what callers' score thresholds expect); the fused order is kept.
+    """
+    for point in points:
+        vector = point.vector.get(DENSE_VECTOR_NAME) if isinstance(point.vector, dict) else point.vector
+        if vector:
+            point.score = _cosine(query_vector, vector)
+    return points
+
+
+def _lexical_matches(points: List, lexical_hits: List) -> List[bool]:
+    """
+    Per fused hit, whether it ranked in the BM25 leg's own top hits. Such hits can have a low
+    cosine score and still be what the user asked for; sharing a common word is not enough.
+    """
+    lexical_ids = {hit.id for hit in lexical_hits}
+    return [point.id in lexical_ids for point in points]
+
+
+async def _perform_batch_search_with_retry(
+    collection_name: str, requests: List[QueryRequest]
+) -> List[List]:
+    """Run several queries in one call (a single gRPC round trip) with retry logic."""
+    responses = await _call_with_retry(
+        get_async_qdrant_client().query_batch_points, collection_name=collection_name, requests=requests
+    )
+    return [response.points for response in responses]
+
+
+async def _collection_is_hybrid(collection_name: str) -> bool:
+    """ Whether the collection has the BM25 sparse vector; one lookup per collection, then cached """
+    if not QDRANT_HYBRID_SEARCH:
+        return False
+    hybrid = collection_supports_hybrid(collection_name)
+    if hybrid is not None:
+        return hybrid
+    try:
+        info = await get_async_qdrant_client().get_collection(collection_name)
+    except Exception as e:
+        logger.warning(f"Could not inspect collection {collection_name}: {e}")
+        return False
+    hybrid = has_sparse_vector(info)
+    mark_collection(collection_name, hybrid=hybrid)
+    return hybrid
+
+
+async def supports_hybrid_search(user_id: str) -> bool:
+    """ True if the user's chunks can be searched with the fused dense + BM25 query """
+    return await _collection_is_hybrid(collection_for_user(str(user_id).strip()))
+
+
 def _validate_and_sanitize_inputs(
     embedded_query: List[float], user_id: str, top_k: int
 ) -> tuple:
@@ -143,8 +236,15 @@ def _create_document_filter(doc_ids: Optional[Union[str, List[str]]]) -> Optiona
         return Filter(should=conditions)
 
 
-def _process_and_validate_results(search_results: List, user_id: str) -> List[Dict]:
-    """Process and validate search results with better error handling."""
+def _process_and_validate_results(
+    search_results: List, user_id: str, lexical_matches: Optional[List[bool]] = None
+) -> List[Dict]:
+    """
+    Process and validate search results with better error handling.
+
+    Each chunk keeps its 1-based "rank" in the result list (the fused order for hybrid
+    searches) and a "lexical_match" flag for hits among the BM25 leg's own top results.
+    """
     if not search_results:
         return []
 
@@ -195,10 +295,13 @@ def _process_and_validate_results(search_results: List, user_id: str) -> List[Di
                 "score": float(score),
                 "doc_id": doc_id,
                 "chunk_index": chunk_index,
+                "rank": i + 1,
+                "lexical_match": bool(lexical_matches and lexical_matches[i]),
             }
 
-            # Only add chunks with actual content
-            if chunk_text:
+            # Points without chunk_text are kept when the chunk store can supply it
+            # (hydrate_chunk_texts); anything else without content is skipped
+            if chunk_text or (doc_id is not None and chunk_index is not None):
                 chunks.append(chunk_data)
             else:
                 logger.debug(f"Skipping empty chunk at index {i}")
@@ -214,7 +317,11 @@ def _process_and_validate_results(search_results: List, user_id: str) -> List[Di
 
 
 async def search_similar_chunks(
-    embedded_query: List[float], user_id: str, top_k: int = 3, doc_ids: Optional[Union[str, List[str]]] = None
+    embedded_query: List[float],
+    user_id: str,
+    top_k: int = 3,
+    doc_ids: Optional[Union[str, List[str]]] = None,
+    query_text: Optional[str] = None,
 ) -> List[Dict]:
     """
     Searches a user-specific Qdrant collection using a query embedding.
@@ -226,9 +333,12 @@ async def search_similar_chunks(
         top_k (int): Number of results to return.
         doc_ids (Optional[Union[str, List[str]]]): Document ID(s) to filter results by.
                                                   Can be a single string or list of strings.
+        query_text (Optional[str]): The text behind the embedding. When given and the collection
+                                    is hybrid, a BM25 leg is fused (RRF) with the dense search.
 
     Returns:
-        List[Dict]: List of matched chunks with text and metadata.
+        List[Dict]: List of matched chunks with text and metadata. "text" is empty for chunks
+                    whose text lives in the chunk store; see hydrate_chunk_texts.
     """
     try:
         # Validate and sanitize inputs
@@ -236,12 +346,7 @@ async def search_similar_chunks(
             embedded_query, user_id, top_k
         )
 
-        collection_name = f"{DEFAULT_COLLECTION_PREFIX}{user_id}"
-
-        # Check collection existence with caching
-        # if not _cached_collection_exists(collection_name):
-        #     logger.warning(f"Collection {collection_name} does not exist for user.")
-        #     return []
+        collection_name = collection_for_user(user_id)
 
         # Create document filter if doc_ids provided
         document_filter = _create_document_filter(doc_ids)
@@ -250,17 +355,28 @@ async def search_similar_chunks(
             logger.warning("Invalid doc_ids provided, returning empty results")
             return []
 
-        # Perform search with retry logic
-        search_results = await _perform_search_with_retry(
-            collection_name=collection_name,
-            query_vector=embedded_query,
-            limit=top_k,
-            with_payload=True,
-            filter=document_filter,
-        )
+        query_filter = user_filter(user_id, document_filter)
+        if query_text and await _collection_is_hybrid(collection_name):
+            requests = [_build_query_request(embedded_query, query_text, top_k, query_filter, hybrid=True)]
+            lexical_request = _build_lexical_request(query_text, top_k, query_filter)
+            if lexical_request is not None:
+                requests.append(lexical_request)
+            responses = await _perform_batch_search_with_retry(collection_name, requests)
+            search_results = _with_dense_scores(responses[0], embedded_query)
+            lexical_matches = _lexical_matches(search_results, responses[1] if lexical_request else [])
+        else:
+            lexical_matches = None
+            # Perform search with retry logic
+            search_results = await _perform_search_with_retry(
+                collection_name=collection_name,
+                query_vector=embedded_query,
+                limit=top_k,
+                with_payload=True,
+                filter=query_filter,
+            )
 
         # Process and validate results
-        chunks = _process_and_validate_results(search_results, user_id)
+        chunks = _process_and_validate_results(search_results, user_id, lexical_matches)
 
         return chunks
 
@@ -271,8 +387,8 @@ async def search_similar_chunks(
     except UnexpectedResponse as e:
         logger.error(f"Qdrant error: {str(e)}")
         # Clear cache in case collection was deleted
-        # _clear_collection_cache()
-        # return []
+        invalidate_collection(collection_for_user(user_id))
+        return []
 
     except (ConnectionError, TimeoutError) as e:
         logger.error(f"Connection/timeout error: {e}")
@@ -283,6 +399,97 @@ async def search_similar_chunks(
         return []
 
 
+async def search_similar_chunks_batch(
+    embedded_queries: List[List[float]],
+    user_id: str,
+    top_k: Union[int, List[int]] = 3,
+    doc_ids: Optional[List[Optional[Union[str, List[str]]]]] = None,
+    query_texts: Optional[List[Optional[str]]] = None,
+) -> List[List[Dict]]:
+    """
+    Batched form of search_similar_chunks: N query vectors against the user's collection
+    in one Qdrant round trip.
+
+    Args:
+        embedded_queries (List[List[float]]): Query vectors.
+        user_id (str): The user's ID (used for collection lookup).
+        top_k (Union[int, List[int]]): Results per query, one value for all or one per query.
+        doc_ids (Optional[List]): Per-query document filter (same forms as search_similar_chunks),
+                                  None for no filtering.
+        query_texts (Optional[List]): Per-query text for the fused BM25 leg on hybrid collections.
+
+    Returns:
+        List[List[Dict]]: One list of matched chunks per query, in input order. Queries that
+        are invalid (or whose doc_ids filter is invalid) get an empty list.
+    """
+    count = len(embedded_queries)
+    results: List[List[Dict]] = [[] for _ in range(count)]
+    if not count:
+        return results
+
+    top_ks = top_k if isinstance(top_k, list) else [top_k] * count
+    filters = doc_ids if doc_ids is not None else [None] * count
+    texts = query_texts if query_texts is not None else [None] * count
+    if len(top_ks) != count or len(filters) != count or len(texts) != count:
+        logger.error("top_k, doc_ids and query_texts must have one entry per query vector")
+        return results
+
+    collection_name = collection_for_user(str(user_id).strip())
+    hybrid = any(texts) and await _collection_is_hybrid(collection_name)
+
+    requests = []
+    lexical_requests = []  # per request, its BM25-only companion (None when there is none)
+    positions = []
+    vectors = []
+    for position, (vector, limit, query_doc_ids, text) in enumerate(zip(embedded_queries, top_ks, filters, texts)):
+        try:
+            vector, user_id, limit = _validate_and_sanitize_inputs(vector, user_id, limit)
+        except ValueError as e:
+            logger.error(f"Input validation error for query {position}: {e}")
+            continue
+
+        document_filter = _create_document_filter(query_doc_ids)
+        if query_doc_ids and document_filter is None:
+            logger.warning(f"Invalid doc_ids for query {position}, returning empty results")
+            continue
+
+        query_filter = user_filter(user_id, document_filter)
+        requests.append(_build_query_request(vector, text, limit, query_filter, hybrid))
+        lexical_requests.append(_build_lexical_request(text, limit, query_filter) if hybrid else None)
+        positions.append(position)
+        vectors.append(vector)
+
+    if not requests:
+        return results
+
+    try:
+        # BM25-only companions ride in the same round trip, after the main requests
+        companions = [request for request in lexical_requests if request is not None]
+        batch_results = await _perform_batch_search_with_retry(collection_name, requests + companions)
+        lexical_results = iter(batch_results[len(requests):])
+        for position, vector, search_results, lexical_request in zip(
+            positions, vectors, batch_results, lexical_requests
+        ):
+            lexical_matches = None
+            if hybrid:
+                search_results = _with_dense_scores(search_results, vector)
+                lexical_hits = next(lexical_results) if lexical_request is not None else []
+                lexical_matches = _lexical_matches(search_results, lexical_hits)
+            results[position] = _process_and_validate_results(search_results, user_id, lexical_matches)
+
+    except UnexpectedResponse as e:
+        logger.error(f"Qdrant error: {str(e)}")
+        invalidate_collection(collection_name)
+
+    except (ConnectionError, TimeoutError) as e:
+        logger.error(f"Connection/timeout error: {e}")
+
+    except Exception:
+        logger.exception("Unexpected error during batch similarity search")
+
+    return results
+
+
 def get_client_health() -> bool:
     """Check if the Qdrant client is healthy."""
     try:
@@ -295,11 +502,20 @@ def get_client_health() -> bool:
 
 def get_collection_stats(user_id: str) -> Dict:
     """Get basic statistics for a user's collection."""
-    collection_name = f"{DEFAULT_COLLECTION_PREFIX}{user_id}"
+    collection_name = collection_for_user(user_id)
 
     try:
-        # if not _cached_collection_exists(collection_name):
-        #     return {"exists": False}
+        if QDRANT_TENANT_MODE:
+            # Shared collection: only this user's slice is meaningful
+            user_points = client.count(
+                collection_name=collection_name, count_filter=user_filter(user_id), exact=True
+            ).count
+            return {
+                "exists": user_points > 0,
+                "points_count": user_points,
+                "vectors_count": user_points,
+                "indexed_vectors_count": None,
+            }
 
         collection_info = client.get_collection(collection_name)
         return {
@@ -315,7 +531,7 @@ def get_collection_stats(user_id: str) -> Dict:
         return {"exists": False, "error": str(e)}
 
 
-# def clear_caches():
-#     """Clear all internal caches."""
-#     _clear_collection_cache()
-#     logger.info("Cleared all caches")
\ No newline at end of file
+def clear_caches():
+    """Clear all internal caches."""
+    clear_collection_cache()
+    logger.info("Cleared all caches")
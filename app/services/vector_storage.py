@@ -1,18 +1,51 @@
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams, PointStruct, PayloadSchemaType
-from uuid import uuid4
+from qdrant_client.http.models import (
+    FieldCondition,
+    Filter,
+    MatchValue,
+    PayloadSchemaType,
+    PointStruct,
+    Range,
+)
+from uuid import NAMESPACE_URL, uuid5
+import asyncio
 import os
 import logging
+import time
+from app.cache.query_results import bump_library_version
+from app.services.chunk_store import CHUNK_TEXT_IN_PAYLOAD, fetch_chunk_texts
+from app.services.qdrant_clients import get_async_qdrant_client, get_qdrant_client
+from app.services.sparse_encoder import encode_document
+from app.services.vector_collections import (
+    DEFAULT_COLLECTION_PREFIX,
+    DENSE_VECTOR_NAME,
+    SPARSE_VECTOR_NAME,
+    collection_create_kwargs,
+    collection_for_user,
+    collection_supports_hybrid,
+    has_sparse_vector,
+    invalidate_collection,
+    is_collection_known,
+    is_collection_ready,
+    mark_collection,
+    payload_indexes,
+    user_filter,
+)
 
 logger = logging.getLogger(__name__)
 
-QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
-QDRANT_API_KEY = os.getenv("QDRANT_API_KEY", None)
-
-client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+client = get_qdrant_client()
 
 DEFAULT_VECTOR_SIZE = 384
-DEFAULT_COLLECTION_PREFIX = "user_docs_"
+
+QDRANT_UPSERT_BATCH_SIZE = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE") or 128)  # points per upsert request
+QDRANT_UPSERT_CONCURRENCY = int(os.getenv("QDRANT_UPSERT_CONCURRENCY") or 4)  # upsert requests in flight
+QDRANT_UPSERT_RETRIES = 3
+QDRANT_UPSERT_BARRIER_TIMEOUT = float(os.getenv("QDRANT_UPSERT_BARRIER_TIMEOUT") or 30)  # seconds
+
+
+def chunk_point_id(doc_id: str, chunk_index: int) -> str:
+    """ Deterministic point ID, so re-upserting the same chunk overwrites instead of duplicating """
+    return str(uuid5(NAMESPACE_URL, f"{doc_id}:{chunk_index}"))
 
 
 # def empty_collection(user_id: str) -> dict:
@@ -30,62 +63,279 @@ DEFAULT_COLLECTION_PREFIX = "user_docs_"
 #         return {"status": "error", "message": str(e)}
 
 
+def _missing_indexes(payload_schema: dict) -> list[tuple]:
+    existing = set(payload_schema or {})
+    return [(field, schema) for field, schema in payload_indexes() if field not in existing]
+
+
 def ensure_collection_exists(user_id: str, vector_size: int = DEFAULT_VECTOR_SIZE) -> str:
-    collection_name = f"{DEFAULT_COLLECTION_PREFIX}{user_id}"
+    """
+    The user's collection (or the shared tenant collection), created with its payload indexes
+    if missing. Served from the collection-state cache once the collection is known to be ready.
+    """
+    collection_name = collection_for_user(user_id)
+    if is_collection_ready(collection_name):
+        return collection_name
 
-    if not client.collection_exists(collection_name):
+    if not is_collection_known(collection_name) and not client.collection_exists(collection_name):
         client.create_collection(
             collection_name=collection_name,
-            vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
+            **collection_create_kwargs(vector_size),
         )
         logger.info(f"[Vector Storage] Created new collection: {collection_name}")
 
-    # ✅ Always try to create the index (safe if it already exists)
-    try:
+    info = client.get_collection(collection_name)
+    for field_name, field_schema in _missing_indexes(info.payload_schema):
         client.create_payload_index(
             collection_name=collection_name,
-            field_name="doc_id",
-            field_schema=PayloadSchemaType.KEYWORD,
+            field_name=field_name,
+            field_schema=field_schema,
         )
-        logger.info(f"[Vector Storage] Ensured doc_id index on {collection_name}")
-    except Exception as e:
-        logger.warning(f"[Vector Storage] Index may already exist on {collection_name}: {e}")
+        logger.info(f"[Vector Storage] Created {field_name} index on {collection_name}")
 
+    mark_collection(collection_name, indexed=True, hybrid=has_sparse_vector(info))
     return collection_name
 
 
-def store_embeddings_to_qdrant(embedded_data: list[dict]) -> dict:
-    if not embedded_data or not isinstance(embedded_data, list):
-        raise ValueError("No embedded data provided for vector storage.")
+async def ensure_collection_exists_async(user_id: str, vector_size: int = DEFAULT_VECTOR_SIZE) -> str:
+    """ Same as ensure_collection_exists, on the shared async client """
+    collection_name = collection_for_user(user_id)
+    if is_collection_ready(collection_name):
+        return collection_name
 
-    first_item = embedded_data[0]
-    user_id = first_item["metadata"].get("user_id")
-    embedding_dim = len(first_item["embedding"])
+    async_client = get_async_qdrant_client()
+    if not is_collection_known(collection_name) and not await async_client.collection_exists(collection_name):
+        await async_client.create_collection(
+            collection_name=collection_name,
+            **collection_create_kwargs(vector_size),
+        )
+        logger.info(f"[Vector Storage] Created new collection: {collection_name}")
+
+    info = await async_client.get_collection(collection_name)
+    for field_name, field_schema in _missing_indexes(info.payload_schema):
+        await async_client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=field_schema,
+        )
+        logger.info(f"[Vector Storage] Created {field_name} index on {collection_name}")
+
+    mark_collection(collection_name, indexed=True, hybrid=has_sparse_vector(info))
+    return collection_name
+
+
+def _point_vector(dense: list[float], chunk_text: str, hybrid: bool, sparse=None):
+    """ Dense vector alone, or dense plus BM25 sparse vector (`sparse` or encoded) for hybrid collections """
+    if not hybrid:
+        return dense
+    return {DENSE_VECTOR_NAME: dense, SPARSE_VECTOR_NAME: sparse or encode_document(chunk_text or "")}
 
-    collection_name = ensure_collection_exists(user_id, vector_size=embedding_dim)
 
+def _build_points(embedded_data: list[dict], hybrid: bool = False) -> list[PointStruct]:
     points = []
     for item in embedded_data:
         vector = item["embedding"]
         metadata = item["metadata"]
 
+        chunk_text = metadata.get("chunk_text", "")
+
+        # The text itself lives in the chunk store (see save_document_chunks)
         payload = {
             "user_id": metadata.get("user_id"),
             "doc_id": metadata.get("doc_id"),
             "chunk_index": metadata.get("chunk_index"),
-            "chunk_text": metadata.get("chunk_text"),
-            "chunk_length": metadata.get("chunk_length", len(metadata.get("chunk_text", ""))),
+            "chunk_length": metadata.get("chunk_length", len(chunk_text)),
         }
+        if CHUNK_TEXT_IN_PAYLOAD:
+            payload["chunk_text"] = chunk_text
+
+        point_id = chunk_point_id(payload["doc_id"], payload["chunk_index"])
+        points.append(
+            PointStruct(id=point_id, vector=_point_vector(vector, chunk_text, hybrid), payload=payload)
+        )
+    return points
 
-        points.append(PointStruct(id=str(uuid4()), vector=vector, payload=payload))
+
+def _dense_vector(vector) -> list[float]:
+    """ The dense part of a stored point vector (named-vector dict or plain list) """
+    return vector.get(DENSE_VECTOR_NAME) if isinstance(vector, dict) else vector
+
+
+def _sparse_vector(vector):
+    """ The stored BM25 vector of a point, or None for dense-only points """
+    return vector.get(SPARSE_VECTOR_NAME) if isinstance(vector, dict) else None
+
+
+def _batched(points: list[PointStruct], batch_size: int) -> list[list[PointStruct]]:
+    return [points[start:start + batch_size] for start in range(0, len(points), batch_size)]
+
+
+def _chunk_range_filter(user_id: str, doc_id: str, points: list[PointStruct]) -> Filter:
+    indices = [point.payload["chunk_index"] for point in points]
+    return user_filter(
+        user_id,
+        Filter(
+            must=[
+                FieldCondition(key="doc_id", match=MatchValue(value=doc_id)),
+                FieldCondition(key="chunk_index", range=Range(gte=min(indices), lte=max(indices))),
+            ]
+        ),
+    )
+
+
+async def _upsert_batch_with_retry(collection_name: str, batch: list[PointStruct]) -> None:
+    async_client = get_async_qdrant_client()
+    for attempt in range(QDRANT_UPSERT_RETRIES):
+        try:
+            # wait=False: acknowledged once written to the WAL, indexing continues in the background
+            await async_client.upsert(collection_name=collection_name, points=batch, wait=False)
+            return
+        except Exception as e:
+            if attempt == QDRANT_UPSERT_RETRIES - 1:
+                raise
+            delay = 2**attempt
+            logger.warning(
+                f"[Vector Storage] Upsert of {len(batch)} points failed ({e}), retrying in {delay}s"
+            )
+            await asyncio.sleep(delay)
+
+
+async def _wait_until_visible(collection_name: str, user_id: str, doc_id: str, points: list[PointStruct]) -> bool:
+    """ Consistency barrier: poll until every upserted chunk of this call is readable """
+    async_client = get_async_qdrant_client()
+    expected = len({point.id for point in points})
+    count_filter = _chunk_range_filter(user_id, doc_id, points)
+    deadline = time.monotonic() + QDRANT_UPSERT_BARRIER_TIMEOUT
+    delay = 0.05
+
+    while True:
+        result = await async_client.count(collection_name=collection_name, count_filter=count_filter, exact=True)
+        if result.count >= expected:
+            return True
+        if time.monotonic() >= deadline:
+            logger.warning(
+                f"[Vector Storage] Only {result.count}/{expected} points of {doc_id} visible "
+                f"after {QDRANT_UPSERT_BARRIER_TIMEOUT}s"
+            )
+            return False
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 1.0)
+
+
+async def store_embeddings_to_qdrant(
+    embedded_data: list[dict],
+    batch_size: int = QDRANT_UPSERT_BATCH_SIZE,
+    max_concurrent: int = QDRANT_UPSERT_CONCURRENCY,
+) -> dict:
+    """
+    Upserts embedded chunks into the user's collection without blocking the event loop.
+
+    Points are sent in batches of `batch_size` with up to `max_concurrent` requests in flight,
+    each retried on its own. Point IDs derive from (doc_id, chunk_index), so retrying a batch
+    (or the whole call) never duplicates chunks. Returns once every point is readable.
+    """
+    if not embedded_data or not isinstance(embedded_data, list):
+        raise ValueError("No embedded data provided for vector storage.")
+
+    first_item = embedded_data[0]
+    user_id = first_item["metadata"].get("user_id")
+    doc_id = first_item["metadata"].get("doc_id")
+    embedding_dim = len(first_item["embedding"])
 
     try:
-        client.upsert(collection_name=collection_name, points=points)
+        collection_name = await ensure_collection_exists_async(user_id, vector_size=embedding_dim)
+        points = _build_points(embedded_data, hybrid=bool(collection_supports_hybrid(collection_name)))
+        batches = _batched(points, max(1, batch_size))
+        semaphore = asyncio.Semaphore(max(1, max_concurrent))
+        stored = 0
+
+        async def upsert_with_semaphore(batch_number: int, batch: list[PointStruct]) -> None:
+            nonlocal stored
+            async with semaphore:
+                await _upsert_batch_with_retry(collection_name, batch)
+                stored += len(batch)
+                logger.info(
+                    f"[Vector Storage] {doc_id}: batch {batch_number}/{len(batches)} upserted "
+                    f"({stored}/{len(points)} points)"
+                )
+
+        results = await asyncio.gather(
+            *(upsert_with_semaphore(i, batch) for i, batch in enumerate(batches, start=1)),
+            return_exceptions=True,
+        )
+
+        failures = [result for result in results if isinstance(result, Exception)]
+        if failures:
+            # Batches stored before the failure are already searchable
+            await asyncio.to_thread(bump_library_version, user_id)
+            # The collection may have been dropped behind our back; re-check on the next call
+            invalidate_collection(collection_name)
+            logger.error(
+                f"[Vector Storage] {len(failures)}/{len(batches)} upsert batches failed for {doc_id}: {failures[0]}"
+            )
+            return {
+                "status": "error",
+                "message": str(failures[0]),
+                "collection_name": collection_name,
+                "stored_before_failure": stored,
+            }
+
+        try:
+            consistent = await _wait_until_visible(collection_name, user_id, doc_id, points)
+        finally:
+            # Cached search results of this user no longer reflect their library. Bumped only
+            # after the barrier, so a search racing the upsert cannot cache a partial view
+            # under the new version
+            await asyncio.to_thread(bump_library_version, user_id)
+        return {
+            "collection_name": collection_name,
+            "user_id": user_id,
+            "total_chunks_stored": len(points),
+            "embedding_dimension": embedding_dim,
+            "batches": len(batches),
+            "consistent": consistent,
+            "status": "success",
+        }
+    except Exception as e:
+        logger.exception("[Vector Storage] Failed to upsert points")
+        invalidate_collection(collection_for_user(user_id))
+        return {"status": "error", "message": str(e)}
+
+
+def _collection_exists_cached(collection_name: str) -> bool:
+    if is_collection_known(collection_name):
+        return True
+    if client.collection_exists(collection_name):
+        mark_collection(collection_name)
+        return True
+    return False
+
+
+def store_embeddings_to_qdrant_sync(
+    embedded_data: list[dict], batch_size: int = QDRANT_UPSERT_BATCH_SIZE
+) -> dict:
+    """ Blocking variant of store_embeddings_to_qdrant for scripts (sequential batches, wait=True) """
+    if not embedded_data or not isinstance(embedded_data, list):
+        raise ValueError("No embedded data provided for vector storage.")
+
+    first_item = embedded_data[0]
+    user_id = first_item["metadata"].get("user_id")
+    embedding_dim = len(first_item["embedding"])
+
+    collection_name = ensure_collection_exists(user_id, vector_size=embedding_dim)
+    points = _build_points(embedded_data, hybrid=bool(collection_supports_hybrid(collection_name)))
+    batches = _batched(points, max(1, batch_size))
+
+    try:
+        for batch in batches:
+            client.upsert(collection_name=collection_name, points=batch)
+        bump_library_version(user_id)
         return {
             "collection_name": collection_name,
             "user_id": user_id,
             "total_chunks_stored": len(points),
             "embedding_dimension": embedding_dim,
+            "batches": len(batches),
             "status": "success",
         }
     except Exception as e:
@@ -93,6 +343,99 @@ def store_embeddings_to_qdrant(embedded_data: list[dict]) -> dict:
         return {"status": "error", "message": str(e)}
 
 
+def copy_document_embeddings(
+    source_user_id: str,
+    source_doc_id: str,
+    target_user_id: str,
+    target_doc_id: str,
+    batch_size: int = 256,
+) -> dict:
+    """
+    Copy every point of a document into another user's collection under a new doc_id,
+    so a duplicate upload reuses the existing chunks and vectors instead of re-embedding.
+    """
+    source_collection = collection_for_user(source_user_id)
+    try:
+        if not _collection_exists_cached(source_collection):
+            return {"status": "error", "message": f"Collection {source_collection} does not exist"}
+
+        doc_filter = user_filter(
+            source_user_id,
+            Filter(must=[FieldCondition(key="doc_id", match=MatchValue(value=source_doc_id))]),
+        )
+        target_collection = None
+        embedding_dim = None
+        copied = 0
+        offset = None
+
+        while True:
+            records, offset = client.scroll(
+                collection_name=source_collection,
+                scroll_filter=doc_filter,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            if not records:
+                break
+
+            if target_collection is None:
+                embedding_dim = len(_dense_vector(records[0].vector))
+                target_collection = ensure_collection_exists(target_user_id, vector_size=embedding_dim)
+                target_hybrid = bool(collection_supports_hybrid(target_collection))
+
+            # Dense-only source points going into a hybrid collection need their text for BM25
+            texts = {}
+            if target_hybrid:
+                texts = fetch_chunk_texts(
+                    [
+                        (source_doc_id, record.payload.get("chunk_index"))
+                        for record in records
+                        if _sparse_vector(record.vector) is None and not record.payload.get("chunk_text")
+                    ]
+                )
+
+            points = [
+                PointStruct(
+                    id=chunk_point_id(target_doc_id, record.payload.get("chunk_index")),
+                    vector=_point_vector(
+                        _dense_vector(record.vector),
+                        record.payload.get("chunk_text") or texts.get((source_doc_id, record.payload.get("chunk_index"))),
+                        target_hybrid,
+                        sparse=_sparse_vector(record.vector),
+                    ),
+                    payload={**record.payload, "user_id": target_user_id, "doc_id": target_doc_id},
+                )
+                for record in records
+            ]
+            client.upsert(collection_name=target_collection, points=points)
+            copied += len(points)
+
+            if offset is None:
+                break
+
+        if not copied:
+            return {"status": "error", "message": f"No embeddings found for doc_id {source_doc_id}"}
+
+        bump_library_version(target_user_id)
+
+        logger.info(
+            f"[Vector Storage] Copied {copied} points for doc_id {source_doc_id} "
+            f"from {source_collection} to {target_collection} as {target_doc_id}"
+        )
+        return {
+            "collection_name": target_collection,
+            "user_id": target_user_id,
+            "total_chunks_stored": copied,
+            "embedding_dimension": embedding_dim,
+            "status": "success",
+        }
+    except Exception as e:
+        logger.exception(f"[Vector Storage] Failed to copy embeddings for doc_id {source_doc_id}")
+        return {"status": "error", "message": str(e)}
+
+
 def create_doc_id_index_for_existing_collections():
     try:
         collections = client.get_collections()
@@ -128,10 +471,10 @@ def delete_document_embeddings(user_id: str, document_id: str) -> dict:
         dict: Status and details of the deletion operation
     """
     try:
-        collection_name = f"{DEFAULT_COLLECTION_PREFIX}{user_id}"
+        collection_name = collection_for_user(user_id)
         
         # Check if collection exists
-        if not client.collection_exists(collection_name):
+        if not _collection_exists_cached(collection_name):
             logger.warning(f"[Vector Storage] Collection {collection_name} does not exist")
             return {
                 "status": "warning", 
@@ -139,22 +482,24 @@ def delete_document_embeddings(user_id: str, document_id: str) -> dict:
                 "deleted_count": 0
             }
         
-        # Delete points with matching doc_id
-        from qdrant_client.http.models import Filter, FieldCondition, MatchValue
-        
+        # Delete points with matching doc_id (and user_id in tenant mode)
         delete_result = client.delete(
             collection_name=collection_name,
-            points_selector=Filter(
-                must=[
-                    FieldCondition(
-                        key="doc_id",
-                        match=MatchValue(value=document_id)
-                    )
-                ]
+            points_selector=user_filter(
+                user_id,
+                Filter(
+                    must=[
+                        FieldCondition(
+                            key="doc_id",
+                            match=MatchValue(value=document_id)
+                        )
+                    ]
+                ),
             )
         )
         
         logger.info(f"[Vector Storage] Deleted embeddings for doc_id {document_id} from {collection_name}")
+        bump_library_version(user_id)
         
         return {
             "status": "success",
@@ -49,16 +49,83 @@ def read_root():
     return {"FYP Backend": "Online 👍"}
 
 
+@app.on_event("startup")
+async def open_connection_pool_event():
+    from app.database.connection import open_connection_pool
+    try:
+        open_connection_pool()
+    except Exception as e:
+        logging.error(f" Failed to open database connection pool: {e}")
+
+
 @app.on_event("startup")
 async def load_models_to_cache_event():
     from app.database.connection import PostgresConnection
     from app.cache.models import load_models_to_cache
-    with PostgresConnection() as conn:
+    async with PostgresConnection() as conn:
         try:
             load_models_to_cache(conn)
         except Exception as e:
             logging.error(f" Failed to load models to cache: {e}")
 
+
+@app.on_event("startup")
+async def open_http_clients_event():
+    from app.services.http_clients import open_http_clients
+    await open_http_clients()
+
+
+@app.on_event("startup")
+async def open_qdrant_clients_event():
+    from app.services.qdrant_clients import open_qdrant_clients
+    await open_qdrant_clients()
+
+
+@app.on_event("startup")
+async def warm_collection_cache_event():
+    from app.services.vector_collections import warm_collection_cache
+    try:
+        await warm_collection_cache()
+    except Exception as e:
+        logging.error(f" Failed to warm Qdrant collection cache: {e}")
+
+
+@app.on_event("shutdown")
+async def close_qdrant_clients_event():
+    from app.services.qdrant_clients import close_qdrant_clients
+    await close_qdrant_clients()
+
+
+@app.on_event("shutdown")
+async def close_http_clients_event():
+    from app.services.http_clients import close_http_clients
+    await close_http_clients()
+
+
+@app.on_event("shutdown")
+async def close_connection_pool_event():
+    from app.database.connection import close_connection_pool, get_pool_metrics
+    logging.info(f" Database pool metrics: {get_pool_metrics()}")
+    close_connection_pool()
+
+
+@app.on_event("shutdown")
+async def log_page_text_cache_stats_event():
+    from app.cache.page_text import get_page_text_cache_stats
+    logging.info(f" Page text cache stats: {get_page_text_cache_stats()}")
+
+
+@app.on_event("shutdown")
+async def log_object_cache_stats_event():
+    from app.services.minio_client import get_object_cache_stats
+    logging.info(f" MinIO disk cache stats: {get_object_cache_stats()}")
+
+
+@app.on_event("shutdown")
+async def shutdown_extraction_pool_event():
+    from app.services.extraction import shutdown_extraction_pool
+    shutdown_extraction_pool()
+
 app.include_router(file_router)
 app.include_router(auth_router)
 app.include_router(learning_profile_router)
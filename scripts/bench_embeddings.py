@@ -0,0 +1,151 @@
+"""
+Throughput benchmark for batched vs per-chunk embedding requests.
+
+Starts a local stub of the Hugging Face feature-extraction endpoint (stdlib
+http.server) that returns deterministic vectors and simulates network/model latency,
+points app/services/embeddings.py at it, and embeds the same synthetic chunks in
+both modes. Both modes must return identical vectors and metadata.
+
+The stub can reject batches above a size (413) or fail a fraction of requests (503)
+to exercise the split-and-retry path.
+
+Usage:
+  python -m scripts.bench_embeddings
+  python -m scripts.bench_embeddings --chunks 2000 --latency-ms 80 --per-item-ms 2
+  python -m scripts.bench_embeddings --reject-above 16 --fail-rate 0.05
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import struct
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.services import embeddings
+from app.services.http_clients import close_http_clients, get_http_client_metrics
+
+EMBEDDING_DIM = 384
+
+
+def stub_vector(text: str) -> list:
+    """Deterministic pseudo-embedding derived from the text."""
+    seed = hashlib.sha256(text.encode("utf-8")).digest()
+    values = []
+    counter = 0
+    while len(values) < EMBEDDING_DIM:
+        block = hashlib.sha256(seed + counter.to_bytes(4, "big")).digest()
+        values.extend(v / 2**31 for v in struct.unpack(">8i", block))
+        counter += 1
+    return values[:EMBEDDING_DIM]
+
+
+def make_handler(args, stats):
+    rng = random.Random(args.seed)
+    rng_lock = threading.Lock()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+        wbufsize = -1  # send headers and body in one write (avoids Nagle/delayed-ACK stalls)
+
+        def log_message(self, format, *log_args):
+            pass
+
+        def _send(self, status: int, payload) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            inputs = json.loads(self.rfile.read(length))["inputs"]
+            batch = inputs if isinstance(inputs, list) else [inputs]
+
+            with rng_lock:
+                stats["requests"] += 1
+                fail = rng.random() < args.fail_rate
+
+            if args.reject_above and len(batch) > args.reject_above:
+                return self._send(413, {"error": "Payload too large"})
+            if fail:
+                return self._send(503, {"error": "Model overloaded"})
+
+            time.sleep((args.latency_ms + args.per_item_ms * len(batch)) / 1000)
+            vectors = [stub_vector(text) for text in batch]
+            self._send(200, vectors if isinstance(inputs, list) else vectors[0])
+
+    return StubHandler
+
+
+def synthetic_chunks(rng: random.Random, count: int) -> list:
+    words = "the of algorithm data structure graph node value method system process model theory".split()
+    return [
+        " ".join(rng.choice(words) for _ in range(rng.randint(30, 300)))
+        for _ in range(count)
+    ]
+
+
+async def run_mode(chunks: list, batched: bool):
+    start = time.perf_counter()
+    try:
+        result = await embeddings.embed_texts(
+            chunks=chunks, user_id="bench", doc_id="bench", doc_type="book",
+            batched=batched, use_cache=False,
+        )
+    finally:
+        # Pooled connections belong to this event loop
+        await close_http_clients()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched embedding requests.")
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Fixed latency per request.")
+    parser.add_argument("--per-item-ms", type=float, default=1.0, help="Extra latency per input.")
+    parser.add_argument("--reject-above", type=int, default=0, help="Return 413 for batches larger than this.")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 503.")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    stats = {"requests": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args, stats))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    embeddings.HUGGINGFACE_API_URL = f"http://127.0.0.1:{server.server_address[1]}/embed"
+    os.environ.setdefault("HUGGINGFACE_API_KEY", "stub")
+
+    chunks = synthetic_chunks(random.Random(args.seed), args.chunks)
+    report = {}
+    try:
+        for label, batched in (("per-chunk", False), ("batched", True)):
+            stats["requests"] = 0
+            result, seconds = asyncio.run(run_mode(chunks, batched))
+            report[label] = (result, seconds, stats["requests"])
+    finally:
+        server.shutdown()
+
+    single, batched = report["per-chunk"][0], report["batched"][0]
+    if single != batched:
+        print(f"[MISMATCH] per-chunk returned {len(single)} results, batched returned {len(batched)}")
+        sys.exit(1)
+
+    print(f"Outputs identical ({len(batched)} embedded chunks)")
+    for label, (result, seconds, requests) in report.items():
+        print(
+            f"{label}: {seconds:.2f}s | {requests} requests | "
+            f"{len(result) / seconds:.1f} chunks/s"
+        )
+    print(f"Speedup x{report['per-chunk'][1] / report['batched'][1]:.2f}")
+    print(f"Connection pool: {get_http_client_metrics()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Microbenchmark for the shared NLTK resources in app/services/nlp_resources.py.
+
+Runs the tokenization-heavy extraction stages (enhance_meaningful_content,
+remove_stopwords_from_text, extract_key_concepts) over a synthetic 500-page
+book, comparing:
+  - legacy: stopword set rebuilt from the NLTK corpus on every call / paragraph
+  - shared: frozen stopword set and tokenizers loaded once per process
+Both variants must produce identical output.
+
+Usage:
+  python -m scripts.bench_nlp_resources
+  python -m scripts.bench_nlp_resources --pages 500 --paragraphs-per-page 6
+"""
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+
+import nltk
+
+from app.services import extraction
+from app.services.nlp_resources import ensure_nltk_resources, get_extended_stopwords, word_tokenize
+
+build_stopwords = get_extended_stopwords.__wrapped__  # uncached builder
+
+
+def legacy_enhance_meaningful_content(text: str) -> str:
+    """enhance_meaningful_content as it was before the shared registry."""
+    meaningful_paragraphs = []
+    for paragraph in text.split("\n\n"):
+        paragraph = paragraph.strip()
+        if not paragraph or len(paragraph) < 50:
+            continue
+        words = nltk.word_tokenize(paragraph.lower())
+        stop_words = build_stopwords()
+        meaningful_word_count = sum(1 for word in words if word not in stop_words and len(word) > 2)
+        if len(words) > 0 and meaningful_word_count / len(words) > 0.3:
+            meaningful_paragraphs.append(paragraph)
+    return "\n\n".join(meaningful_paragraphs)
+
+
+def legacy_remove_stopwords_from_text(text: str) -> str:
+    stop_words = build_stopwords()
+    cleaned_paragraphs = []
+    for paragraph in text.split("\n\n"):
+        if not paragraph.strip():
+            cleaned_paragraphs.append("")
+            continue
+        cleaned_sentences = []
+        for sentence in nltk.sent_tokenize(paragraph):
+            meaningful_words = [
+                word for word in nltk.word_tokenize(sentence)
+                if word.lower() not in stop_words and len(word) > 2 and word.isalpha()
+            ]
+            if len(meaningful_words) >= 3:
+                cleaned_sentences.append(" ".join(meaningful_words))
+        if cleaned_sentences:
+            cleaned_paragraphs.append(". ".join(cleaned_sentences) + ".")
+    return "\n\n".join(cleaned_paragraphs)
+
+
+def legacy_key_concept_words(text: str) -> Counter:
+    stop_words = build_stopwords()
+    words = nltk.word_tokenize(text.lower())
+    return Counter(w for w in words if w not in stop_words and len(w) > 3 and w.isalpha())
+
+
+def shared_key_concept_words(text: str) -> Counter:
+    stop_words = get_extended_stopwords()
+    words = word_tokenize(text.lower())
+    return Counter(w for w in words if w not in stop_words and len(w) > 3 and w.isalpha())
+
+
+def synthetic_book(rng: random.Random, pages: int, paragraphs_per_page: int) -> str:
+    words = (
+        "the of and however algorithm data structure graph node value method system "
+        "process model theory therefore analysis function is a to in with"
+    ).split()
+    paragraphs = []
+    for _ in range(pages * paragraphs_per_page):
+        sentences = [
+            " ".join(rng.choice(words) for _ in range(rng.randint(8, 20))).capitalize() + "."
+            for _ in range(rng.randint(2, 5))
+        ]
+        paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+
+def timed(func, text):
+    start = time.perf_counter()
+    result = func(text)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark shared NLTK resources.")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--paragraphs-per-page", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    ensure_nltk_resources()
+    book = synthetic_book(random.Random(args.seed), args.pages, args.paragraphs_per_page)
+    print(f"Book: {args.pages} pages, {book.count(chr(10) * 2) + 1} paragraphs, {len(book) / 1_000_000:.2f} MB")
+
+    start = time.perf_counter()
+    build_stopwords()
+    print(f"One stopword set build: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    stages = [
+        ("enhance_meaningful_content", legacy_enhance_meaningful_content, extraction.enhance_meaningful_content),
+        ("remove_stopwords_from_text", legacy_remove_stopwords_from_text, extraction.remove_stopwords_from_text),
+        ("key concept counting", legacy_key_concept_words, shared_key_concept_words),
+    ]
+
+    total_legacy = total_shared = 0.0
+    for name, legacy, shared in stages:
+        expected, legacy_seconds = timed(legacy, book)
+        actual, shared_seconds = timed(shared, book)
+        if expected != actual:
+            print(f"[MISMATCH] {name}")
+            sys.exit(1)
+        total_legacy += legacy_seconds
+        total_shared += shared_seconds
+        print(f"{name}: legacy {legacy_seconds:.3f}s | shared {shared_seconds:.3f}s")
+
+    print(f"Total: legacy {total_legacy:.3f}s | shared {total_shared:.3f}s | speedup x{total_legacy / total_shared:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Concurrency benchmark for vector search from one event loop (one uvicorn worker).
+
+"blocking" reproduces the old path, where the synchronous QdrantClient is called
+straight from coroutines. "async" uses the shared AsyncQdrantClient the app now uses.
+Both modes run the same queries with the same number of concurrent requests
+against a temporary collection. They report searches per second, latency
+percentiles and event-loop lag (how late a 10 ms ticker wakes up while searches run).
+
+Point QDRANT_URL (or --url) at a real Qdrant server for meaningful numbers. --url :memory:
+runs against the in-process local mode, which only smoke-tests the script.
+
+Usage:
+  python -m scripts.bench_qdrant_search
+  python -m scripts.bench_qdrant_search --url http://localhost:6333 --concurrency 64 --requests 5000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+import uuid
+
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+from app.services.qdrant_clients import GRPC_OPTIONS
+
+
+def random_vectors(rng: random.Random, count: int, dim: int) -> list:
+    return [[rng.uniform(-1, 1) for _ in range(dim)] for _ in range(count)]
+
+
+def make_clients(args):
+    if args.url == ":memory:":
+        return QdrantClient(location=":memory:"), AsyncQdrantClient(location=":memory:")
+    kwargs = {
+        "url": args.url,
+        "api_key": os.getenv("QDRANT_API_KEY"),
+        "timeout": 30,
+        "prefer_grpc": not args.http,
+        "grpc_options": GRPC_OPTIONS,
+    }
+    return QdrantClient(**kwargs), AsyncQdrantClient(**kwargs)
+
+
+async def seed(args, sync_client, async_client, collection: str, rng: random.Random) -> None:
+    vectors = random_vectors(rng, args.points, args.dim)
+    points = [
+        PointStruct(id=i, vector=vector, payload={"doc_id": f"doc-{i % 20}", "chunk_index": i, "chunk_text": f"chunk {i}"})
+        for i, vector in enumerate(vectors)
+    ]
+    # Local mode keeps a separate store per client object
+    targets = [sync_client]
+    if args.url == ":memory:":
+        targets.append(async_client)
+
+    for target in targets:
+        create = target.create_collection(
+            collection_name=collection,
+            vectors_config=VectorParams(size=args.dim, distance=Distance.COSINE),
+        )
+        if asyncio.iscoroutine(create):
+            await create
+        for start in range(0, len(points), 256):
+            upsert = target.upsert(collection_name=collection, points=points[start:start + 256], wait=True)
+            if asyncio.iscoroutine(upsert):
+                await upsert
+
+
+async def measure_loop_lag(stop: asyncio.Event, lags: list, interval: float = 0.01) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - started - interval))
+
+
+async def run_mode(mode: str, args, sync_client, async_client, collection: str, queries: list) -> dict:
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def one_search(vector):
+        async with semaphore:
+            started = time.perf_counter()
+            if mode == "blocking":
+                sync_client.search(collection_name=collection, query_vector=vector, limit=args.top_k, with_payload=True)
+            else:
+                await async_client.search(collection_name=collection, query_vector=vector, limit=args.top_k, with_payload=True)
+            latencies.append(time.perf_counter() - started)
+
+    stop = asyncio.Event()
+    lags = []
+    ticker = asyncio.create_task(measure_loop_lag(stop, lags))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_search(vector) for vector in queries))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await ticker
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "searches_per_s": len(queries) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "loop_lag_max_ms": max(lags, default=0.0) * 1000,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=os.getenv("QDRANT_URL") or ":memory:")
+    parser.add_argument("--http", action="store_true", help="use REST instead of gRPC")
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sync_client, async_client = make_clients(args)
+    collection = f"bench_search_{uuid.uuid4().hex[:8]}"
+
+    print(f"Seeding {args.points} x {args.dim}d points into {collection} at {args.url} ...")
+    await seed(args, sync_client, async_client, collection, rng)
+    queries = random_vectors(rng, args.requests, args.dim)
+
+    try:
+        # Warm both clients (channel setup, collection caches) before timing
+        await run_mode("blocking", args, sync_client, async_client, collection, queries[:20])
+        await run_mode("async", args, sync_client, async_client, collection, queries[:20])
+
+        results = [
+            await run_mode(mode, args, sync_client, async_client, collection, queries)
+            for mode in ("blocking", "async")
+        ]
+    finally:
+        try:
+            sync_client.delete_collection(collection)
+        except Exception as e:
+            print(f"Failed to delete {collection}: {e}")
+        await async_client.close()
+        sync_client.close()
+
+    print(f"\n{args.requests} searches, concurrency {args.concurrency}, top_k {args.top_k}, one event loop")
+    print(f"{'mode':<10}{'searches/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'loop lag max ms':>18}")
+    for result in results:
+        print(
+            f"{result['mode']:<10}{result['searches_per_s']:>12.1f}{result['p50_ms']:>10.2f}"
+            f"{result['p95_ms']:>10.2f}{result['loop_lag_max_ms']:>18.1f}"
+        )
+    blocking, async_ = results
+    print(f"\nspeedup: {async_['searches_per_s'] / blocking['searches_per_s']:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,159 @@
+"""
+Equivalence check and throughput benchmark for app/services/text_normalizer.py.
+
+- Runs every compiled stage and the full regex pipeline against the original
+  functions in app/services/extraction.py on a synthetic corpus (plus randomized
+  fuzz documents and any PDFs given on the command line) and fails on the first
+  mismatch.
+- Reports per-MB throughput of the original chain vs the compiled engine.
+
+Usage:
+  python -m scripts.bench_text_normalizer
+  python -m scripts.bench_text_normalizer --pdf book.pdf --mb 8 --fuzz 2000
+"""
+import argparse
+import random
+import sys
+import time
+
+import fitz  # PyMuPDF
+
+from app.services import extraction as reference
+from app.services import text_normalizer as compiled
+
+FRAGMENTS = [
+    "The ﬁrst algorithm", "ﬂow", "Œuvre", "æther", "Æsir", "well – known", "long — dash",
+    "wait…", 'quote: """, here', "tab\tseparated", "\x00", "\x0c", "​", "­",
+    "LATEX 2\\\"", "LATEX2\\'", "\\textbf{bold}", "\\emph{x}", "$x^2$", "\\$ab${x}", "\\alpha",
+    "Figure 3.2: A caption", "Table 1 - values", "Fig. 4 shows", "page 12", "p. 7", "[12]",
+    "(Smith 2020)", "1234567890 12", "D . x", "rn", "vv", "II", "1a", "0o", "Chapter 1",
+    "1. First item", "a) option", "(b) option", ". . . . . . 42", "isbn 978", "Copyright 2020",
+    "All rights reserved", "Preface", "Definition of the Method", "Theorem proof", "Lemma",
+    "The running header", "42", "3.1.4", "abc12345", "Ｆｕｌｌｗｉｄｔｈ", "①", "x²", "ﬀﬃﬄ",
+    "normal sentence with enough words to pass the length filter.",
+]
+SEPARATORS = [" ", " ", " ", "\n", "\n\n", "\n \n\n", ". ", "\t", "\n\n\n"]
+
+
+def reference_rag_regex_stages(text: str) -> str:
+    text = reference.normalize_unicode(text)
+    text = reference.remove_control_characters(text)
+    text = reference.clean_latex_remnants(text)
+    text = reference.fix_common_ocr_errors(text)
+    text = reference.remove_noise_patterns(text)
+    text = reference.clean_table_of_contents(text)
+    text = reference.remove_repeated_lines(text)
+    text = reference.merge_broken_lines(text)
+    text = reference.split_into_semantic_chunks(text)
+    text = reference.normalize_whitespace(text)
+    return reference.filter_content_for_mcq(text)
+
+
+def reference_line_stages(text: str) -> str:
+    text = reference.clean_table_of_contents(text)
+    text = reference.remove_repeated_lines(text)
+    return reference.merge_broken_lines(text)
+
+
+def reference_unicode_stages(text: str) -> str:
+    return reference.remove_control_characters(reference.normalize_unicode(text))
+
+
+STAGE_PAIRS = [
+    ("unicode+controls", reference_unicode_stages, compiled.normalize_unicode_and_controls),
+    ("latex", reference.clean_latex_remnants, compiled.clean_latex_remnants),
+    ("ocr", reference.fix_common_ocr_errors, compiled.fix_common_ocr_errors),
+    ("noise", reference.remove_noise_patterns, compiled.remove_noise_patterns),
+    ("lines", reference_line_stages, compiled.clean_lines),
+    ("semantic breaks", reference.split_into_semantic_chunks, compiled.split_into_semantic_chunks),
+    ("whitespace", reference.normalize_whitespace, compiled.normalize_whitespace),
+    ("mcq filter", reference.filter_content_for_mcq, compiled.filter_content_for_mcq),
+    ("full pipeline", reference_rag_regex_stages, compiled.normalize_text_for_rag),
+]
+
+
+def random_document(rng: random.Random, pieces: int) -> str:
+    return "".join(rng.choice(FRAGMENTS) + rng.choice(SEPARATORS) for _ in range(pieces))
+
+
+def synthetic_book(rng: random.Random, megabytes: float) -> str:
+    """Book-like text: running headers, page numbers, prose, and some noise."""
+    words = "the of algorithm data structure graph node value method system process model theory".split()
+    pages = []
+    size = 0
+    page_number = 1
+    while size < megabytes * 1_000_000:
+        lines = ["Introduction to Algorithms"]
+        for _ in range(40):
+            sentence = " ".join(rng.choice(words) for _ in range(rng.randint(6, 16)))
+            lines.append(sentence.capitalize() + rng.choice([".", ",", "", ":"]))
+            if rng.random() < 0.05:
+                lines.append(rng.choice(FRAGMENTS))
+        lines.append(str(page_number))
+        page = "\n".join(lines) + "\n"
+        pages.append(page)
+        size += len(page)
+        page_number += 1
+    return "".join(pages)
+
+
+def pdf_text(path: str) -> str:
+    with fitz.open(path) as doc:
+        return "".join(page.get_text() for page in doc)
+
+
+def check_equivalence(documents) -> int:
+    checked = 0
+    for doc_index, text in enumerate(documents):
+        for name, original, fast in STAGE_PAIRS:
+            expected, actual = original(text), fast(text)
+            if expected != actual:
+                print(f"[MISMATCH] stage={name} document={doc_index}")
+                print(f"  input:    {text[:300]!r}")
+                print(f"  expected: {expected[:300]!r}")
+                print(f"  actual:   {actual[:300]!r}")
+                sys.exit(1)
+            checked += 1
+    return checked
+
+
+def throughput(func, text: str, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return (len(text.encode("utf-8")) / 1_000_000) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compiled text normalizer.")
+    parser.add_argument("--pdf", action="append", default=[], help="PDF to include (repeatable).")
+    parser.add_argument("--mb", type=float, default=4.0, help="Size of the synthetic book in MB.")
+    parser.add_argument("--fuzz", type=int, default=1000, help="Number of randomized fuzz documents.")
+    parser.add_argument("--repeats", type=int, default=3, help="Timing repeats (best is reported).")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    book = synthetic_book(rng, args.mb)
+    documents = [random_document(rng, rng.randint(1, 60)) for _ in range(args.fuzz)]
+    documents.append(book)
+    for path in args.pdf:
+        documents.append(pdf_text(path))
+
+    checked = check_equivalence(documents)
+    print(f"Equivalence: OK ({checked} stage comparisons over {len(documents)} documents)")
+
+    corpora = [("synthetic book", book)] + [(path, documents[-len(args.pdf) + i]) for i, path in enumerate(args.pdf)]
+    for label, text in corpora:
+        before = throughput(reference_rag_regex_stages, text, args.repeats)
+        after = throughput(compiled.normalize_text_for_rag, text, args.repeats)
+        print(
+            f"{label}: {len(text) / 1_000_000:.1f} MB | original {before:.2f} MB/s | "
+            f"compiled {after:.2f} MB/s | speedup x{after / before:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
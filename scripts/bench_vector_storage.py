@@ -0,0 +1,168 @@
+"""
+Recall-vs-latency benchmark for the Qdrant storage profiles.
+
+Loads the same synthetic corpus into one temporary collection per profile
+(float32, int8 scalar and binary quantization), created with the settings
+ensure_collection_exists would use for that profile. The corpus is clustered
+vectors, so nearest neighbours are meaningful. Exact float32 search gives the
+ground truth. Each profile is then queried through the normal HNSW path, with
+and without rescoring for the quantized profiles, and the benchmark reports
+recall@k and p50/p95 latency.
+
+Needs a running Qdrant (QDRANT_URL or --url, e.g. docker run -p 6333:6333 -p 6334:6334
+qdrant/qdrant). Local :memory: mode ignores quantization and HNSW, so it only smoke-tests.
+
+Usage:
+  python -m scripts.bench_vector_storage --url http://localhost:6333
+  python -m scripts.bench_vector_storage --points 50000 --dim 768 --queries 500 --top-k 10
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+import uuid
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import (
+    CollectionStatus,
+    HnswConfigDiff,
+    PointStruct,
+    QuantizationSearchParams,
+    SearchParams,
+)
+
+from app.services.vector_collections import (
+    QDRANT_RESCORE_OVERSAMPLING,
+    STORAGE_PROFILES,
+    quantization_config,
+    vector_params,
+)
+
+
+def clustered_vectors(rng: random.Random, count: int, dim: int, clusters: int) -> list:
+    centers = [[rng.gauss(0, 1) for _ in range(dim)] for _ in range(clusters)]
+    vectors = []
+    for _ in range(count):
+        center = centers[rng.randrange(clusters)]
+        vectors.append([value + rng.gauss(0, 0.35) for value in center])
+    return vectors
+
+
+def wait_until_indexed(client: QdrantClient, collection: str, timeout: float = 600) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if client.get_collection(collection).status == CollectionStatus.GREEN:
+            return
+        time.sleep(0.5)
+    print(f"  warning: {collection} still optimizing after {timeout}s")
+
+
+def create_profile_collection(client: QdrantClient, name: str, profile: str, args, vectors: list) -> None:
+    client.create_collection(
+        collection_name=name,
+        vectors_config=vector_params(args.dim, profile),
+        hnsw_config=HnswConfigDiff(m=args.m, ef_construct=args.ef_construct),
+        quantization_config=quantization_config(profile),
+    )
+    for start in range(0, len(vectors), 512):
+        client.upsert(
+            collection_name=name,
+            points=[
+                PointStruct(id=start + i, vector=vector)
+                for i, vector in enumerate(vectors[start:start + 512])
+            ],
+            wait=True,
+        )
+    wait_until_indexed(client, name)
+
+
+def run_queries(client: QdrantClient, name: str, queries: list, top_k: int, params) -> tuple:
+    latencies = []
+    results = []
+    for query in queries:
+        started = time.perf_counter()
+        hits = client.query_points(
+            collection_name=name, query=query, limit=top_k, search_params=params, with_payload=False
+        ).points
+        latencies.append(time.perf_counter() - started)
+        results.append([hit.id for hit in hits])
+    return results, latencies
+
+
+def recall(results: list, truth: list, top_k: int) -> float:
+    return statistics.mean(len(set(found) & set(expected)) / top_k for found, expected in zip(results, truth))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=os.getenv("QDRANT_URL") or "http://localhost:6333")
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--ef-construct", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.url == ":memory:":
+        client = QdrantClient(location=":memory:")
+    else:
+        client = QdrantClient(url=args.url, api_key=os.getenv("QDRANT_API_KEY"), timeout=120)
+
+    rng = random.Random(args.seed)
+    vectors = clustered_vectors(rng, args.points, args.dim, args.clusters)
+    queries = clustered_vectors(rng, args.queries, args.dim, args.clusters)
+    suffix = uuid.uuid4().hex[:8]
+    names = {profile: f"bench_storage_{profile}_{suffix}" for profile in STORAGE_PROFILES}
+
+    try:
+        for profile, name in names.items():
+            print(f"Loading {args.points} x {args.dim}d points into {name} ...")
+            create_profile_collection(client, name, profile, args, vectors)
+
+        truth, _ = run_queries(client, names["float32"], queries, args.top_k, SearchParams(exact=True))
+
+        rows = []
+        for profile, name in names.items():
+            variants = [("hnsw", None)]
+            if profile != "float32":
+                variants = [
+                    ("no rescore", SearchParams(quantization=QuantizationSearchParams(rescore=False))),
+                    (
+                        f"rescore x{QDRANT_RESCORE_OVERSAMPLING:g}",
+                        SearchParams(
+                            quantization=QuantizationSearchParams(rescore=True, oversampling=QDRANT_RESCORE_OVERSAMPLING)
+                        ),
+                    ),
+                ]
+            for label, params in variants:
+                run_queries(client, name, queries[:20], args.top_k, params)  # warm caches
+                results, latencies = run_queries(client, name, queries, args.top_k, params)
+                latencies.sort()
+                rows.append(
+                    (
+                        profile,
+                        label,
+                        recall(results, truth, args.top_k),
+                        statistics.median(latencies) * 1000,
+                        latencies[int(len(latencies) * 0.95) - 1] * 1000,
+                    )
+                )
+    finally:
+        for name in names.values():
+            try:
+                client.delete_collection(name)
+            except Exception as e:
+                print(f"Failed to delete {name}: {e}")
+
+    print(f"\n{args.points} points, {args.dim}d, {args.queries} queries, recall@{args.top_k} vs exact float32")
+    print(f"{'profile':<10}{'search':<16}{'recall':>8}{'p50 ms':>10}{'p95 ms':>10}")
+    for profile, label, recall_value, p50, p95 in rows:
+        print(f"{profile:<10}{label:<16}{recall_value:>8.3f}{p50:>10.2f}{p95:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
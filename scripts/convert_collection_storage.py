@@ -0,0 +1,98 @@
+"""
+Apply a storage profile to existing Qdrant collections in place.
+
+New collections already get QDRANT_STORAGE_PROFILE at creation. This updates the
+collections created before it: quantization (int8 scalar / binary, or disabled
+for float32), on_disk originals and HNSW m / ef_construct. Qdrant rebuilds the quantized
+vectors and index in the background, and the collection stays searchable meanwhile.
+The BM25 sparse vector for hybrid search cannot be added in place. Collections created
+before it get hybrid search through scripts/migrate_to_tenant_collection.py or by
+re-uploading the documents.
+
+Env:
+  QDRANT_URL, QDRANT_API_KEY, QDRANT_HNSW_M, QDRANT_HNSW_EF_CONSTRUCT, QDRANT_VECTORS_ON_DISK
+
+Usage:
+  python -m scripts.convert_collection_storage --profile int8 --dry-run
+  python -m scripts.convert_collection_storage --profile binary
+  python -m scripts.convert_collection_storage --profile int8 --collections user_docs_<id>
+"""
+import argparse
+import sys
+
+from qdrant_client.http.models import Disabled, HnswConfigDiff, VectorParamsDiff
+
+from app.services.qdrant_clients import get_qdrant_client
+from app.services.vector_collections import (
+    DEFAULT_COLLECTION_PREFIX,
+    QDRANT_HNSW_EF_CONSTRUCT,
+    QDRANT_HNSW_M,
+    SHARED_COLLECTION_NAME,
+    STORAGE_PROFILES,
+    TENANT_HNSW_CONFIG,
+    quantization_config,
+    vectors_on_disk,
+)
+
+
+def describe(info) -> str:
+    params = info.config.params.vectors
+    quantization = info.config.quantization_config
+    kind = type(quantization).__name__ if quantization else "none"
+    return (
+        f"points={info.points_count} on_disk={getattr(params, 'on_disk', None)} "
+        f"quantization={kind} m={info.config.hnsw_config.m} ef_construct={info.config.hnsw_config.ef_construct}"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=STORAGE_PROFILES, required=True)
+    parser.add_argument("--collections", nargs="*", help="only convert these collections")
+    parser.add_argument("--dry-run", action="store_true", help="show current settings only")
+    args = parser.parse_args()
+
+    client = get_qdrant_client()
+    names = sorted(
+        collection.name
+        for collection in client.get_collections().collections
+        if collection.name.startswith(DEFAULT_COLLECTION_PREFIX) or collection.name == SHARED_COLLECTION_NAME
+    )
+    if args.collections:
+        names = [name for name in names if name in set(args.collections)]
+
+    if not names:
+        print("No collections to convert.")
+        return 0
+
+    quantization = quantization_config(args.profile) or Disabled.DISABLED
+    on_disk = vectors_on_disk(args.profile)
+    per_user_hnsw = HnswConfigDiff(m=QDRANT_HNSW_M, ef_construct=QDRANT_HNSW_EF_CONSTRUCT)
+    failures = 0
+
+    for name in names:
+        info = client.get_collection(name)
+        print(f"{name}: {describe(info)}")
+        if args.dry_run:
+            continue
+
+        try:
+            client.update_collection(
+                collection_name=name,
+                vectors_config={"": VectorParamsDiff(on_disk=on_disk)},
+                hnsw_config=TENANT_HNSW_CONFIG if name == SHARED_COLLECTION_NAME else per_user_hnsw,
+                quantization_config=quantization,
+            )
+            print(f"  -> {args.profile}: {describe(client.get_collection(name))}")
+        except Exception as e:
+            print(f"  FAILED: {e}")
+            failures += 1
+
+    if failures:
+        print(f"{failures} collection(s) failed")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
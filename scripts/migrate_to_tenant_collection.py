@@ -0,0 +1,210 @@
+"""
+Migrate per-user `user_docs_<user_id>` collections into the shared tenant collection.
+
+- Creates the shared collection (QDRANT_SHARED_COLLECTION, default "user_docs") if
+  missing, with per-tenant HNSW, the configured storage profile (QDRANT_STORAGE_PROFILE)
+  and a `user_id` keyword index flagged is_tenant.
+- Copies every point (same ID, vector and payload, user_id stamped from the collection name).
+  With QDRANT_HYBRID_SEARCH the shared collection gets the BM25 sparse vector (copied, or
+  computed from the chunk text in the payload or the chunk store), so migrated users also
+  get hybrid search.
+- Verifies the copied count per user, and only then (with --delete-source) drops the source.
+- Safe to re-run: point IDs are preserved, so already-copied points are overwritten.
+
+Set QDRANT_TENANT_MODE=true once every user has been migrated.
+
+Env:
+  QDRANT_URL, QDRANT_API_KEY, QDRANT_SHARED_COLLECTION (optional)
+
+Usage:
+  python -m scripts.migrate_to_tenant_collection --dry-run
+  python -m scripts.migrate_to_tenant_collection --users <id> <id>
+  python -m scripts.migrate_to_tenant_collection --delete-source
+"""
+import argparse
+import sys
+
+from qdrant_client.http.models import (
+    FieldCondition,
+    Filter,
+    KeywordIndexParams,
+    MatchValue,
+    PayloadSchemaType,
+    PointStruct,
+)
+
+from app.services.chunk_store import fetch_chunk_texts
+from app.services.qdrant_clients import get_qdrant_client
+from app.services.sparse_encoder import encode_document
+from app.services.vector_collections import (
+    DEFAULT_COLLECTION_PREFIX,
+    DENSE_VECTOR_NAME,
+    QDRANT_HYBRID_SEARCH,
+    SHARED_COLLECTION_NAME,
+    SPARSE_VECTOR_NAME,
+    TENANT_HNSW_CONFIG,
+    has_sparse_vector,
+    quantization_config,
+    sparse_vectors_config,
+    vector_params,
+)
+
+
+def ensure_shared_collection(client, vector_size: int) -> None:
+    if not client.collection_exists(SHARED_COLLECTION_NAME):
+        client.create_collection(
+            collection_name=SHARED_COLLECTION_NAME,
+            vectors_config=vector_params(vector_size),
+            hnsw_config=TENANT_HNSW_CONFIG,
+            quantization_config=quantization_config(),
+            sparse_vectors_config=sparse_vectors_config() if QDRANT_HYBRID_SEARCH else None,
+        )
+        print(f"Created shared collection {SHARED_COLLECTION_NAME} ({vector_size}d)")
+
+    client.create_payload_index(
+        collection_name=SHARED_COLLECTION_NAME,
+        field_name="user_id",
+        field_schema=KeywordIndexParams(type="keyword", is_tenant=True),
+    )
+    client.create_payload_index(
+        collection_name=SHARED_COLLECTION_NAME,
+        field_name="doc_id",
+        field_schema=PayloadSchemaType.KEYWORD,
+    )
+    client.create_payload_index(
+        collection_name=SHARED_COLLECTION_NAME,
+        field_name="chunk_index",
+        field_schema=PayloadSchemaType.INTEGER,
+    )
+
+
+def tenant_count(client, user_id: str) -> int:
+    return client.count(
+        collection_name=SHARED_COLLECTION_NAME,
+        count_filter=Filter(must=[FieldCondition(key="user_id", match=MatchValue(value=user_id))]),
+        exact=True,
+    ).count
+
+
+def target_vector(vector, chunk_text: str, hybrid: bool):
+    dense = vector.get(DENSE_VECTOR_NAME) if isinstance(vector, dict) else vector
+    if not hybrid:
+        return dense
+    sparse = vector.get(SPARSE_VECTOR_NAME) if isinstance(vector, dict) else None
+    return {DENSE_VECTOR_NAME: dense, SPARSE_VECTOR_NAME: sparse or encode_document(chunk_text or "")}
+
+
+def chunk_texts_for(records, hybrid: bool) -> dict:
+    """ Texts from the chunk store for dense-only points that no longer carry chunk_text """
+    if not hybrid:
+        return {}
+    return fetch_chunk_texts(
+        [
+            (str(record.payload.get("doc_id")), record.payload.get("chunk_index"))
+            for record in records
+            if not isinstance(record.vector, dict) and not (record.payload or {}).get("chunk_text")
+        ]
+    )
+
+
+def migrate_collection(client, source: str, user_id: str, batch_size: int, hybrid: bool) -> int:
+    copied = 0
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if records:
+            texts = chunk_texts_for(records, hybrid)
+            points = [
+                PointStruct(
+                    id=record.id,
+                    vector=target_vector(
+                        record.vector,
+                        (record.payload or {}).get("chunk_text")
+                        or texts.get((str(record.payload.get("doc_id")), record.payload.get("chunk_index"))),
+                        hybrid,
+                    ),
+                    payload={**(record.payload or {}), "user_id": user_id},
+                )
+                for record in records
+            ]
+            client.upsert(collection_name=SHARED_COLLECTION_NAME, points=points, wait=True)
+            copied += len(points)
+        if offset is None:
+            break
+    return copied
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", nargs="*", help="only migrate these user IDs")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--dry-run", action="store_true", help="list what would be migrated")
+    parser.add_argument("--delete-source", action="store_true", help="drop each per-user collection once verified")
+    args = parser.parse_args()
+
+    client = get_qdrant_client()
+    sources = sorted(
+        collection.name
+        for collection in client.get_collections().collections
+        if collection.name.startswith(DEFAULT_COLLECTION_PREFIX)
+    )
+    if args.users:
+        wanted = {f"{DEFAULT_COLLECTION_PREFIX}{user_id}" for user_id in args.users}
+        sources = [source for source in sources if source in wanted]
+
+    if not sources:
+        print("No per-user collections to migrate.")
+        return 0
+
+    print(f"{len(sources)} per-user collection(s) -> {SHARED_COLLECTION_NAME}")
+    failures = 0
+    shared_ready = False
+    hybrid = False
+
+    for source in sources:
+        user_id = source[len(DEFAULT_COLLECTION_PREFIX):]
+        source_count = client.count(collection_name=source, exact=True).count
+
+        if args.dry_run:
+            print(f"  {source}: {source_count} points")
+            continue
+
+        if not shared_ready:
+            vectors = client.get_collection(source).config.params.vectors
+            vectors = vectors.get(DENSE_VECTOR_NAME) if isinstance(vectors, dict) else vectors
+            ensure_shared_collection(client, vectors.size)
+            hybrid = has_sparse_vector(client.get_collection(SHARED_COLLECTION_NAME))
+            shared_ready = True
+
+        try:
+            copied = migrate_collection(client, source, user_id, args.batch_size, hybrid)
+        except Exception as e:
+            print(f"  {source}: FAILED ({e})")
+            failures += 1
+            continue
+
+        migrated = tenant_count(client, user_id)
+        if migrated < source_count:
+            print(f"  {source}: copied {copied}, but only {migrated}/{source_count} visible; keeping source")
+            failures += 1
+            continue
+
+        print(f"  {source}: {copied} points migrated")
+        if args.delete_source:
+            client.delete_collection(source)
+            print(f"  {source}: deleted")
+
+    if failures:
+        print(f"{failures} collection(s) failed; re-run to retry (copies are idempotent)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Move chunk_text out of existing Qdrant payloads into the Postgres chunk store.
+
+New uploads already write their texts to document_chunks and leave them out of the
+payload. For the points written before that, this script:
+- scrolls every user collection (per-user and the shared tenant collection),
+- upserts (doc_id, chunk_index, chunk_text) into document_chunks,
+- then removes chunk_text from those points' payloads (skipped with --keep-payload).
+Texts are committed to Postgres before the payload key is deleted, so searches always find
+the text in one of the two places. Safe to re-run.
+
+Run DB_schema_script.sql (document_chunks) first.
+
+Env:
+  QDRANT_URL, QDRANT_API_KEY, DB_* (see .env.example)
+
+Usage:
+  python -m scripts.move_chunk_text_to_store --dry-run
+  python -m scripts.move_chunk_text_to_store --collections user_docs_<id>
+  python -m scripts.move_chunk_text_to_store --keep-payload
+"""
+import argparse
+import sys
+
+from qdrant_client.http.models import FieldCondition, Filter, IsEmptyCondition, PayloadField
+
+from app.database.chunk_queries import upsert_document_chunks
+from app.database.connection import PostgresConnection
+from app.services.qdrant_clients import get_qdrant_client
+from app.services.vector_collections import DEFAULT_COLLECTION_PREFIX, SHARED_COLLECTION_NAME
+
+# Points that still carry a chunk_text payload
+HAS_CHUNK_TEXT = Filter(must_not=[IsEmptyCondition(is_empty=PayloadField(key="chunk_text"))])
+
+
+def move_collection(client, conn, name: str, batch_size: int, dry_run: bool, keep_payload: bool) -> int:
+    moved = 0
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=name,
+            scroll_filter=HAS_CHUNK_TEXT,
+            limit=batch_size,
+            offset=offset,
+            with_payload=["doc_id", "chunk_index", "chunk_text"],
+            with_vectors=False,
+        )
+        rows = [
+            (str(record.payload["doc_id"]), int(record.payload["chunk_index"]), record.payload["chunk_text"])
+            for record in records
+            if record.payload.get("doc_id") and record.payload.get("chunk_index") is not None
+            and record.payload.get("chunk_text")
+        ]
+        if rows and not dry_run:
+            upsert_document_chunks(conn, rows)
+            if not keep_payload:
+                client.delete_payload(
+                    collection_name=name,
+                    keys=["chunk_text"],
+                    points=[record.id for record in records],
+                    wait=True,
+                )
+        moved += len(rows)
+        # Deleting the key shrinks the filtered set under the cursor, so restart from the top
+        if not dry_run and not keep_payload:
+            offset = None
+            if not records:
+                break
+        elif offset is None:
+            break
+    return moved
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collections", nargs="*", help="only these collections")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--dry-run", action="store_true", help="count the chunks that would move")
+    parser.add_argument("--keep-payload", action="store_true", help="copy texts without removing them from Qdrant")
+    args = parser.parse_args()
+
+    client = get_qdrant_client()
+    names = sorted(
+        collection.name
+        for collection in client.get_collections().collections
+        if collection.name.startswith(DEFAULT_COLLECTION_PREFIX) or collection.name == SHARED_COLLECTION_NAME
+    )
+    if args.collections:
+        names = [name for name in names if name in set(args.collections)]
+
+    if not names:
+        print("No collections to process.")
+        return 0
+
+    failures = 0
+    with PostgresConnection() as conn:
+        for name in names:
+            try:
+                moved = move_collection(client, conn, name, args.batch_size, args.dry_run, args.keep_payload)
+            except Exception as e:
+                conn.rollback()
+                print(f"  {name}: FAILED ({e})")
+                failures += 1
+                continue
+            verb = "would move" if args.dry_run else "moved"
+            print(f"  {name}: {verb} {moved} chunk texts")
+
+    if failures:
+        print(f"{failures} collection(s) failed; re-run to retry")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
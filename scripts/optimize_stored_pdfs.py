@@ -0,0 +1,103 @@
+"""
+Optimize the PDFs of documents uploaded before upload-time optimization existed.
+
+For every stored object of books, notes and presentations that has no pdf_optimizations row,
+this script:
+- downloads the PDF from MinIO,
+- rewrites it like the upload pipeline does (app/services/pdf_optimizer.py),
+- overwrites the object when the result is smaller (its ETag changes, so viewers and the
+  local disk cache pick up the new file on their next revalidation),
+- records original and stored sizes in pdf_optimizations. Objects that did not shrink (or
+  are encrypted) are recorded too, so re-runs skip them.
+Page text is unchanged by the rewrite, so page artifacts and cached pages stay valid.
+Deduplicated documents share one object, which is processed once.
+
+Run DB_schema_script.sql (pdf_optimizations) first.
+
+Env:
+  MINIO_*, DB_*, PDF_LINEARIZE, PDF_RECOMPRESS_IMAGES, PDF_IMAGE_* (see .env.example)
+
+Usage:
+  python -m scripts.optimize_stored_pdfs --dry-run
+  python -m scripts.optimize_stored_pdfs --types books --limit 50
+  python -m scripts.optimize_stored_pdfs --force
+"""
+import argparse
+import os
+import sys
+
+from app.database.connection import PostgresConnection
+from app.database.pdf_optimization_queries import (
+    get_document_s3_keys,
+    get_optimized_s3_keys,
+    record_pdf_optimization,
+)
+from app.services.minio_client import MinIOClientContext, evict_cached_object
+from app.services.pdf_optimizer import optimize_pdf_bytes
+
+DOCUMENT_TABLES = ["books", "notes", "presentations"]
+
+
+def optimize_object(s3, bucket: str, s3_key: str, dry_run: bool) -> dict:
+    pdf_bytes = s3.get_object(Bucket=bucket, Key=s3_key)["Body"].read()
+    result = optimize_pdf_bytes(pdf_bytes)
+    if result is None:
+        return {"original_bytes": len(pdf_bytes), "stored_bytes": len(pdf_bytes), "linearized": False}
+
+    optimized, stats = result
+    if optimized is not pdf_bytes and not dry_run:
+        s3.put_object(Bucket=bucket, Key=s3_key, Body=optimized, ContentType="application/pdf")
+        evict_cached_object(s3_key)
+    return stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--types", nargs="*", choices=DOCUMENT_TABLES, default=DOCUMENT_TABLES)
+    parser.add_argument("--limit", type=int, help="process at most this many objects")
+    parser.add_argument("--dry-run", action="store_true", help="report the savings without writing anything")
+    parser.add_argument("--force", action="store_true", help="also re-process objects already recorded")
+    args = parser.parse_args()
+
+    bucket = os.getenv("MINIO_BUCKET_NAME")
+    with PostgresConnection() as conn:
+        s3_keys = get_document_s3_keys(conn, args.types)
+        if not args.force:
+            done = get_optimized_s3_keys(conn)
+            s3_keys = [s3_key for s3_key in s3_keys if s3_key not in done]
+        s3_keys = [s3_key for s3_key in s3_keys if s3_key.lower().endswith(".pdf")]
+        if args.limit:
+            s3_keys = s3_keys[:args.limit]
+
+        if not s3_keys:
+            print("No documents to optimize.")
+            return 0
+
+        failures = 0
+        original_total = stored_total = 0
+        with MinIOClientContext() as s3:
+            for s3_key in s3_keys:
+                try:
+                    stats = optimize_object(s3, bucket, s3_key, args.dry_run)
+                    if not args.dry_run:
+                        record_pdf_optimization(conn, s3_key, **stats)
+                except Exception as e:
+                    conn.rollback()
+                    print(f"  {s3_key}: FAILED ({e})")
+                    failures += 1
+                    continue
+
+                original_total += stats["original_bytes"]
+                stored_total += stats["stored_bytes"]
+                print(f"  {s3_key}: {stats['original_bytes']} -> {stats['stored_bytes']} bytes")
+
+    verb = "would save" if args.dry_run else "saved"
+    print(f"{len(s3_keys) - failures} object(s): {original_total} -> {stored_total} bytes, {verb} {original_total - stored_total}")
+    if failures:
+        print(f"{failures} object(s) failed; re-run to retry")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())